@@ -1,5 +1,27 @@
 """
 ASGI config for Central Rock Gym Route Tracking System.
+
+The public pages (home, areas, route detail, profile) are async views and
+every project middleware runs natively under ASGI, so a request to them
+never ties up a thread while it waits on the database. Serve with any ASGI
+server, e.g. uvicorn:
+
+    pip install uvicorn
+    python manage.py collectstatic
+    export CRT_DB_PROFILE=production
+    uvicorn central_rock_tracker.asgi:application --host 0.0.0.0 --port 8000
+
+Run a single worker process: the live feed's event bus (project.live_feed)
+and the write queue (project.database) live in the process, so a second
+worker would neither see the first one's live events nor queue its writes
+behind them. The production profile keeps the page cache, its version
+counters and the API ETags in the file cache, where the management
+commands (imports, freezes, counter rebuilds) bump them too.
+
+The remaining views are sync and Django runs them in a thread pool; the
+CSV and NDJSON downloads stream a chunk at a time from that pool instead of
+being read whole first. The WSGI entry point (wsgi.py) keeps working too;
+async views are then run one request at a time per worker thread.
 """
 
 import os
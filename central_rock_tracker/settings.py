@@ -35,11 +35,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'project.instrumentation.RequestMetricsMiddleware',  # First, so it measures everything below it
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'project.roles.GymRoleMiddleware',  # request.member / request.is_gym_admin
+    'project.replicas.ReplicaPinMiddleware',  # Read-your-writes for the replica views
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -68,13 +71,151 @@ WSGI_APPLICATION = 'central_rock_tracker.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Set CRT_DB_PROFILE=production to keep connections open between requests,
+# wait up to SQLITE_TIMEOUT seconds for a lock instead of failing with
+# "database is locked", and apply SQLITE_PRODUCTION_PRAGMAS to every new
+# connection (project.database).
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    # Read by the reporting and export views (project.replicas); never written or migrated.
+    # Refresh the local copy with `python manage.py snapshot_replica` (e.g. every 5 minutes from cron).
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('CRT_REPLICA_NAME', BASE_DIR / 'db-replica.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+DATABASE_ROUTERS = ['project.replicas.ReplicaRouter']
+
+# Reporting views fall back to the primary once the replica's snapshot is older than this many seconds
+REPLICA_MAX_LAG = 15 * 60
+
+SQLITE_TIMEOUT = 20
+
+SQLITE_PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',  # Readers and the writer no longer block each other
+    'synchronous': 'NORMAL',  # Safe with WAL; fsync at checkpoints instead of every commit
+    'temp_store': 'MEMORY',
+    'cache_size': -20000,  # 20 MB page cache per connection
+    'mmap_size': 128 * 1024 * 1024,
+}
+
+if os.environ.get('CRT_DB_PROFILE') == 'production':
+    for database in DATABASES.values():
+        database.update({
+            'CONN_MAX_AGE': 600,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {'timeout': SQLITE_TIMEOUT},
+        })
+    SQLITE_PRAGMAS = SQLITE_PRODUCTION_PRAGMAS
+else:
+    SQLITE_PRAGMAS = {}
+
+
+# Cache
+# Local memory in development. The production profile (or CRT_CACHE_BACKEND=file)
+# keeps the page cache and its version counters, which the API ETags are built
+# from, in files shared by the server and the management commands.
+
+CACHE_BACKEND = os.environ.get('CRT_CACHE_BACKEND', 'file' if os.environ.get('CRT_DB_PROFILE') == 'production' else 'locmem')
+
+if CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CRT_CACHE_LOCATION', BASE_DIR / 'cache'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'central-rock-tracker',
+        }
     }
+
+# Seconds a cached public page or template fragment may be served
+PAGE_CACHE_TIMEOUT = 10 * 60
+
+
+# Performance instrumentation (project.instrumentation)
+# Per-view budgets, keyed by URL name. Keys: queries, sql_ms, template_ms,
+# total_ms, bytes. A "<name> <METHOD>" entry overrides the view's budget for
+# that method. Overruns are logged; under the test runner they fail the test.
+
+VIEW_BUDGETS = {
+    # Public pages
+    'project:home': {'queries': 10},
+    'project:live_feed': {'queries': 2},
+    'project:area_list': {'queries': 3},
+    'project:area_detail': {'queries': 6},
+    'project:route_list': {'queries': 4},
+    'project:route_detail': {'queries': 8},
+    'project:route_detail POST': {'queries': 17},  # Logs a completion: counters, member stats, leaderboards
+    'project:route_search': {'queries': 4},
+    'project:log_session': {'queries': 3},  # As a member: session, user and member, routes marked sent
+    'project:log_session POST': {'queries': 16},  # A whole session: counters, member stats, leaderboards once
+    'project:leaderboards': {'queries': 6},
+    'project:member_list': {'queries': 3},
+    'project:profile': {'queries': 7},
+    'project:edit_profile': {'queries': 3},
+    # Admin pages
+    'project:admin_dashboard': {'queries': 14},
+    'project:add_route': {'queries': 4},
+    'project:import_routes': {'queries': 4},
+    'project:export_routes': {'queries': 3},
+    'project:manage_routes': {'queries': 5},
+    'project:archived_routes': {'queries': 8},  # Includes the cold storage listing
+    'project:bulk_archive_routes': {'queries': 16},  # Includes the area set history update; restoring from cold storage moves sends back
+    'project:reset_planner': {'queries': 5},
+    'project:admin_completions': {'queries': 6},
+    'project:admin_filter_options': {'queries': 3},
+    'project:export_completions': {'queries': 3},
+    'project:admin_members': {'queries': 5},
+    'project:delete_member': {'queries': 4},
+    'project:delete_member POST': {'queries': 30},  # The cascade uncounts each send: counters, member stats, leaderboards
+    # JSON API
+    'project:api_area_list': {'queries': 2},
+    'project:api_route_list': {'queries': 2},
+    'project:api_route_detail': {'queries': 3},
+    'project:api_completion_list': {'queries': 4},  # As a member: session, user and member
 }
 
+ENFORCE_VIEW_BUDGETS = False
+
+TEST_RUNNER = 'project.test_runner.BudgetTestRunner'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # INFO logs one JSON line per request; WARNING only the ones over budget
+        'project.performance': {
+            'handlers': ['console'],
+            'level': os.environ.get('CRT_PERFORMANCE_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+
+# Authentication
+# MemberBackend loads the member with the user; ModelBackend stays listed so
+# sessions created before it was added remain valid.
+
+AUTHENTICATION_BACKENDS = [
+    'project.roles.MemberBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -122,3 +263,12 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
+
+# Dashboards read the latest rollup snapshot while it is younger than this
+# many seconds, and fall back to live counts otherwise.
+# Refresh with `python manage.py rollup_dashboard` (e.g. every 5 minutes from cron).
+DASHBOARD_SNAPSHOT_MAX_AGE = 15 * 60
+
+# Routes archived more than this many days ago move to cold storage (project.cold_storage).
+# Run `python manage.py freeze_archived_routes` (e.g. nightly from cron).
+COLD_STORAGE_DAYS = 180
@@ -1,5 +1,8 @@
 """
 WSGI config for Central Rock Gym Route Tracking System.
+
+As under ASGI, run one worker process (as many threads as needed): the live
+feed's event bus and the write queue live in the process. See asgi.py.
 """
 
 import os
@@ -8,7 +8,7 @@ areas, routes, and completions.
 """
 
 from django.contrib import admin
-from .models import Member, Area, Route, Completion
+from .models import Member, Area, Route, Completion, MemberStats, RouteStats, AreaSetHistory, ColdRoute
 
 
 @admin.register(Member)
@@ -16,7 +16,7 @@ class MemberAdmin(admin.ModelAdmin):
     """
     Admin interface configuration for Member model.
     """
-    list_display = ['member_number', 'first_name', 'last_name', 'email', 'is_admin', 'date_joined']
+    list_display = ['member_number', 'first_name', 'last_name', 'email', 'is_admin', 'date_joined', 'send_count']
     list_filter = ['is_admin', 'date_joined']
     search_fields = ['first_name', 'last_name', 'email', 'member_number']
     ordering = ['member_number']
@@ -28,7 +28,7 @@ class AreaAdmin(admin.ModelAdmin):
     """
     Admin interface configuration for Area model.
     """
-    list_display = ['name', 'description']
+    list_display = ['name', 'description', 'send_count']
     search_fields = ['name', 'description']
     ordering = ['name']
 
@@ -38,7 +38,7 @@ class RouteAdmin(admin.ModelAdmin):
     """
     Admin interface configuration for Route model.
     """
-    list_display = ['name', 'grade', 'color', 'area', 'setter_name', 'date_set', 'is_active']
+    list_display = ['name', 'grade', 'color', 'area', 'setter_name', 'date_set', 'is_active', 'send_count']
     list_filter = ['grade', 'color', 'area', 'is_active', 'date_set']
     search_fields = ['name', 'setter_name', 'area__name']
     ordering = ['-date_set', 'area', 'grade']
@@ -66,4 +66,74 @@ class CompletionAdmin(admin.ModelAdmin):
         """
         Optimize queryset to reduce database queries.
         """
-        return super().get_queryset(request).select_related('member', 'route', 'route__area')
\ No newline at end of file
+        return super().get_queryset(request).select_related('member', 'route', 'route__area')
+
+
+@admin.register(MemberStats)
+class MemberStatsAdmin(admin.ModelAdmin):
+    """
+    Read-only view of the precomputed member statistics.
+    Rebuild with `manage.py rebuild_member_stats` instead of editing.
+    """
+    list_display = ['member', 'first_send', 'last_send']
+    search_fields = ['member__first_name', 'member__last_name']
+    readonly_fields = ['member', 'first_send', 'last_send', 'grade_counts', 'area_counts', 'daily_sends']
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(RouteStats)
+class RouteStatsAdmin(admin.ModelAdmin):
+    """
+    Read-only view of the batch route statistics.
+    Recompute with `manage.py compute_route_stats` instead of editing.
+    """
+    list_display = ['route', 'sends', 'sends_per_day', 'rating_mean', 'grade_feel', 'computed_at']
+    list_filter = ['grade_feel', 'route__area', 'route__grade']
+    search_fields = ['route__name', 'route__color']
+    readonly_fields = ['route', 'sends', 'sends_per_day', 'rating_mean', 'rating_variance', 'grade_feel', 'computed_at']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('route', 'route__area')
+
+
+@admin.register(AreaSetHistory)
+class AreaSetHistoryAdmin(admin.ModelAdmin):
+    """
+    Read-only view of the area set history kept by project.set_history.
+    """
+    list_display = ['area', 'day', 'active_routes', 'oldest_set', 'routes_set', 'routes_archived']
+    list_filter = ['area']
+    date_hierarchy = 'day'
+    readonly_fields = ['area', 'day', 'active_routes', 'grade_counts', 'oldest_set', 'routes_set', 'routes_archived']
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ColdRoute)
+class ColdRouteAdmin(admin.ModelAdmin):
+    """
+    Read-only view of the routes in cold storage (project.cold_storage).
+    Restore them from the archived routes page instead of editing.
+    """
+    list_display = ['__str__', 'area', 'setter_name', 'date_set', 'archived_on', 'send_count', 'frozen_at']
+    list_filter = ['area', 'grade']
+    search_fields = ['name', 'color', 'setter_name']
+    readonly_fields = [
+        'id', 'area', 'name', 'grade', 'color', 'date_set', 'setter_name', 'archived_on', 'frozen_at',
+        'send_count', 'rating_sum', 'first_send', 'last_send',
+    ]
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('area')
@@ -0,0 +1,127 @@
+"""
+project/analytics.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Popularity and difficulty statistics for every route, computed in one batch.
+The completions are read with a single query into parallel arrays (route
+id, rating, day), reduced to per-route totals in one pass, and each route's
+mean rating is compared with the other routes of the same grade in the
+same area to flag it soft or hard for its grade. The compute_route_stats
+command stores the results as RouteStats rows, which the route pages read
+with select_related('stats').
+"""
+
+from array import array
+from collections import defaultdict
+from datetime import date
+from django.db import transaction
+from django.utils import timezone
+from .models import Route, Completion, RouteStats
+
+# Rows fetched per database round trip while loading the columns
+CHUNK_SIZE = 5000
+
+# Ratings a route (and each of its peers) needs before it is compared
+MIN_RATINGS = 3
+
+# Mean rating this far above or below its peers' makes a route hard or soft for its grade
+FEEL_THRESHOLD = 0.75
+
+
+def load_columns():
+    """Every completion as three parallel arrays: route ids, ratings and day ordinals."""
+    rows = Completion.objects.order_by().values_list('route_id', 'difficulty_rating', 'date_completed')
+    route_ids, ratings, days = array('q'), array('b'), array('l')
+    chunk = []
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            _extend(route_ids, ratings, days, chunk)
+            chunk = []
+    _extend(route_ids, ratings, days, chunk)
+    return route_ids, ratings, days
+
+
+def _extend(route_ids, ratings, days, chunk):
+    if not chunk:
+        return
+    ids, values, dates = zip(*chunk)
+    route_ids.extend(ids)
+    ratings.extend(values)
+    days.extend(map(date.toordinal, dates))
+
+
+def route_totals(route_ids, ratings, days):
+    """{route id: [sends, rating sum, rating sum of squares, last day ordinal]} in one pass."""
+    totals = {}
+    for route_id, rating, day in zip(route_ids, ratings, days):
+        total = totals.get(route_id)
+        if total is None:
+            totals[route_id] = [1, rating, rating * rating, day]
+        else:
+            total[0] += 1
+            total[1] += rating
+            total[2] += rating * rating
+            if day > total[3]:
+                total[3] = day
+    return totals
+
+
+def grade_feel(mean, peer_mean):
+    """SOFT, HARD or '' for a route's mean rating against the mean of its peers' means."""
+    difference = mean - peer_mean
+    if difference >= FEEL_THRESHOLD:
+        return RouteStats.HARD
+    if difference <= -FEEL_THRESHOLD:
+        return RouteStats.SOFT
+    return ''
+
+
+def build_route_stats(totals, today=None):
+    """Unsaved RouteStats for every route, from route_totals() output."""
+    today = (today or timezone.localdate()).toordinal()
+    now = timezone.now()
+    stats = []
+    rated = []  # (RouteStats, peer group) of routes with enough ratings
+    peers = defaultdict(lambda: [0.0, 0])  # (area id, grade): [sum of mean ratings, routes]
+
+    routes = Route.objects.order_by().values_list('id', 'area_id', 'grade', 'date_set', 'is_active')
+    for route_id, area_id, grade, date_set, is_active in routes.iterator(chunk_size=CHUNK_SIZE):
+        sends, total, squares, last_day = totals.get(route_id, (0, 0, 0, None))
+        start = date_set.toordinal()
+        # Archived routes have no take-down date; their last send is the closest thing
+        end = today if is_active else (last_day or start)
+        mean = variance = None
+        if sends:
+            mean = total / sends
+            variance = max(squares / sends - mean * mean, 0.0)
+        route_stats = RouteStats(
+            route_id=route_id,
+            sends=sends,
+            sends_per_day=sends / max(end - start + 1, 1),
+            rating_mean=mean,
+            rating_variance=variance,
+            computed_at=now,
+        )
+        stats.append(route_stats)
+        if sends >= MIN_RATINGS:
+            rated.append((route_stats, (area_id, grade)))
+            peers[area_id, grade][0] += mean
+            peers[area_id, grade][1] += 1
+
+    # Each route against the mean of the other routes in its group
+    for route_stats, group in rated:
+        total, count = peers[group]
+        if count > 1:
+            peer_mean = (total - route_stats.rating_mean) / (count - 1)
+            route_stats.grade_feel = grade_feel(route_stats.rating_mean, peer_mean)
+    return stats
+
+
+@transaction.atomic
+def compute_route_stats(today=None):
+    """Recompute and store the stats of every route. Returns the number of routes."""
+    stats = build_route_stats(route_totals(*load_columns()), today)
+    RouteStats.objects.all().delete()
+    RouteStats.objects.bulk_create(stats, batch_size=1000)
+    return len(stats)
@@ -0,0 +1,245 @@
+"""
+project/api.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Read-only JSON API (v1) for the kiosks and the mobile app.
+Rows are serialized straight from values() dicts, with no model instances or
+templates. Every response carries an ETag and Last-Modified built from the
+cache versions in project.caching, so polling clients get 304 Not Modified
+until the data they asked for actually changes. The completion list carries
+member names and notes, so only signed-in members may read it.
+"""
+
+import hashlib
+import json
+from functools import wraps
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, F, Q
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+from .caching import ROUTES_SCOPE, area_scope, get_modified, route_scope, versions_key
+from .models import Area, Route, Completion
+from .pagination import paginate
+
+API_VERSION = 'v1'
+
+# Rows per page of the list endpoints
+API_PAGE_SIZE = 100
+
+# Public field name -> values() lookup, per resource
+AREA_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'description': 'description',
+    'route_count': 'route_count',
+    'send_count': 'send_count',
+}
+ROUTE_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'grade': 'grade',
+    'color': 'color',
+    'date_set': 'date_set',
+    'setter_name': 'setter_name',
+    'area_id': 'area_id',
+    'area_name': 'area__name',
+    'send_count': 'send_count',
+}
+COMPLETION_FIELDS = {
+    'id': 'id',
+    'route_id': 'route_id',
+    'member_first_name': 'member__first_name',
+    'member_last_name': 'member__last_name',
+    'date_completed': 'date_completed',
+    'difficulty_rating': 'difficulty_rating',
+    'notes': 'notes',
+}
+
+# Recent completions embedded in a route, as on the route page
+ROUTE_RECENT_COMPLETIONS = 10
+
+
+class BadRequest(ValueError):
+    """Raised for a query parameter the API can't use; answered with a 400."""
+
+
+def int_param(request, name):
+    """Integer query parameter, or None when it is missing."""
+    value = request.GET.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise BadRequest(f'"{name}" must be an integer.')
+
+
+def select_fields(request, available):
+    """Public field names requested with ?fields=a,b (all of them by default)."""
+    requested = request.GET.get('fields')
+    if not requested:
+        return list(available)
+    fields = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise BadRequest(f'Unknown field(s): {", ".join(unknown)}.')
+    return fields
+
+
+def values_for(queryset, fields, available, extra=()):
+    """
+    values() for the given public fields, renaming related lookups.
+    extra names model fields needed for pagination but not necessarily returned.
+    """
+    plain = [available[name] for name in fields if available[name] == name]
+    plain += [name for name in extra if name not in plain]
+    renamed = {name: F(available[name]) for name in fields if available[name] != name}
+    return queryset.values(*plain, **renamed)
+
+
+def serialize(request, rows, fields):
+    """
+    Rows as a list of objects, or with ?compact=1 as a list of arrays
+    in `fields` order (the field names are sent once alongside).
+    """
+    if request.GET.get('compact') == '1':
+        return {'fields': fields, 'results': [[row[name] for name in fields] for row in rows]}
+    return {'results': [{name: row[name] for name in fields} for row in rows]}
+
+
+def api_response(data):
+    """Compact JSON response."""
+    return HttpResponse(
+        json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':')),
+        content_type='application/json',
+    )
+
+
+def conditional(get_scopes):
+    """
+    Decorator for API views: answer 304 when the client's ETag or
+    Last-Modified still matches the cache versions of get_scopes(request, **kwargs),
+    and add both headers to full responses.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            scopes = get_scopes(request, **kwargs)
+            raw = f'{API_VERSION}|{request.get_full_path()}|{versions_key(scopes)}'
+            etag = quote_etag(hashlib.md5(raw.encode()).hexdigest())
+            last_modified = int(max(get_modified(scope) for scope in scopes))
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+                response['Last-Modified'] = http_date(last_modified)
+                response['Cache-Control'] = 'no-cache'
+            return response
+        return wrapped
+    return decorator
+
+
+def bad_requests(view):
+    """Turn a BadRequest into a 400 JSON response."""
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as e:
+            return JsonResponse({'error': str(e)}, status=400)
+    return wrapped
+
+
+def members_only(view):
+    """Answer 401 to anonymous clients, and keep responses out of shared caches."""
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Sign in to read completions.'}, status=401)
+        response = view(request, *args, **kwargs)
+        patch_cache_control(response, private=True)
+        return response
+    return wrapped
+
+
+def page_data(page):
+    """Cursor links for a keyset page."""
+    return {'next': page.next_url, 'previous': page.previous_url}
+
+
+@require_safe
+@bad_requests
+@conditional(lambda request: [ROUTES_SCOPE])
+def area_list(request):
+    """All areas with their active route counts, as on the area list page."""
+    fields = select_fields(request, AREA_FIELDS)
+    areas = Area.objects.annotate(route_count=Count('routes', filter=Q(routes__is_active=True))).order_by('name')
+    return api_response(serialize(request, values_for(areas, fields, AREA_FIELDS), fields))
+
+
+def _route_list_scopes(request):
+    area_id = int_param(request, 'area')
+    return [area_scope(area_id)] if area_id is not None else [ROUTES_SCOPE]
+
+
+@require_safe
+@bad_requests
+@conditional(_route_list_scopes)
+def route_list(request):
+    """Active routes, newest first; ?area= filters to one area."""
+    fields = select_fields(request, ROUTE_FIELDS)
+    routes = Route.objects.filter(is_active=True)
+    area_id = int_param(request, 'area')
+    if area_id is not None:
+        routes = routes.filter(area_id=area_id)
+    rows = values_for(routes, fields, ROUTE_FIELDS, extra=['date_set', 'id'])
+    page = paginate(request, rows, ('-date_set', '-id'), API_PAGE_SIZE)
+    return api_response({**serialize(request, page, fields), **page_data(page)})
+
+
+@require_safe
+@bad_requests
+@conditional(lambda request, pk: [route_scope(pk)])
+def route_detail(request, pk):
+    """One route (active or archived) with its most recent completions."""
+    fields = select_fields(request, ROUTE_FIELDS)
+    route = get_object_or_404(values_for(Route.objects.all(), fields, ROUTE_FIELDS), pk=pk)
+    completions = values_for(
+        Completion.objects.filter(route_id=pk).order_by('-date_completed', '-id'),
+        list(COMPLETION_FIELDS), COMPLETION_FIELDS,
+    )[:ROUTE_RECENT_COMPLETIONS]
+    data = {name: route[name] for name in fields}
+    data['recent_completions'] = list(completions)
+    return api_response(data)
+
+
+def _completion_list_scopes(request):
+    route_id, area_id = int_param(request, 'route'), int_param(request, 'area')
+    if route_id is not None:
+        return [route_scope(route_id)]
+    if area_id is not None:
+        return [area_scope(area_id)]
+    return [ROUTES_SCOPE]
+
+
+@require_safe
+@members_only
+@bad_requests
+@conditional(_completion_list_scopes)
+def completion_list(request):
+    """Completions, newest first; ?route= or ?area= narrow them down."""
+    fields = select_fields(request, COMPLETION_FIELDS)
+    completions = Completion.objects.all()
+    route_id, area_id = int_param(request, 'route'), int_param(request, 'area')
+    if route_id is not None:
+        completions = completions.filter(route_id=route_id)
+    if area_id is not None:
+        completions = completions.filter(route__area_id=area_id)
+    rows = values_for(completions, fields, COMPLETION_FIELDS, extra=['date_completed', 'id'])
+    page = paginate(request, rows, ('-date_completed', '-id'), API_PAGE_SIZE)
+    return api_response({**serialize(request, page, fields), **page_data(page)})
@@ -0,0 +1,293 @@
+"""
+project/benchmarks.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Benchmark harness for every URL in project/urls.py.
+Each view is requested repeatedly through the Django test client against a
+synthetic dataset (see project.synthetic), recording latency percentiles,
+query counts and peak Python memory. The report is plain, key-sorted JSON so
+two runs can be diffed between commits.
+WriteContention measures write throughput instead: concurrent sends racing
+bulk archives, under the default and the production SQLite profile.
+"""
+
+import statistics
+import threading
+import time
+import tracemalloc
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.db.models import Max
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+from .database import writes
+from .models import Member, Area, Route, Completion
+from . import urls
+
+ANONYMOUS, MEMBER, ADMIN = 'anonymous', 'member', 'admin'
+
+# Views that need a logged-in user; everything else is requested anonymously
+VIEW_ROLES = {
+    'admin_dashboard': ADMIN,
+    'add_route': ADMIN,
+    'import_routes': ADMIN,
+    'export_routes': ADMIN,
+    'manage_routes': ADMIN,
+    'toggle_route_status': ADMIN,
+    'admin_completions': ADMIN,
+    'admin_filter_options': ADMIN,
+    'export_completions': ADMIN,
+    'admin_members': ADMIN,
+    'delete_member': ADMIN,
+    'archived_routes': ADMIN,
+    'bulk_archive_routes': ADMIN,
+    'reset_planner': ADMIN,
+    'member_list': ADMIN,
+    'profile': MEMBER,
+    'edit_profile': MEMBER,
+    'log_session': MEMBER,
+    'api_completion_list': MEMBER,
+}
+
+# Views that would change the session under test
+SKIPPED_VIEWS = {'logout'}
+
+# Extra query strings, so views exercise their usual filters
+VIEW_QUERY = {
+    'admin_filter_options': '?q=a',
+    'admin_completions': '?date_range=all',
+}
+
+
+def sample_kwargs(name, samples):
+    """URL kwargs for a view, pointing at a representative object."""
+    if name == 'area_detail':
+        return {'pk': samples['area']}
+    if name in ('route_detail', 'toggle_route_status', 'api_route_detail'):
+        return {'pk': samples['route']}
+    if name == 'delete_member':
+        return {'pk': samples['member']}
+    if name == 'admin_filter_options':
+        return {'kind': 'route'}
+    return {}
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Benchmark:
+    """
+    Drive every project URL through the test client and collect timings.
+    Run it against a database already holding the synthetic dataset.
+    """
+
+    def __init__(self, iterations=20, warmup=2, cold_cache=False):
+        self.iterations = iterations
+        self.warmup = warmup
+        self.cold_cache = cold_cache
+        self.samples = self._pick_samples()
+        self.clients = self._make_clients()
+
+    def _pick_samples(self):
+        """The busiest area, route and member, so detail pages show realistic data."""
+        return {
+            'area': Area.objects.order_by('-send_count', 'pk').values_list('pk', flat=True).first(),
+            'route': Route.objects.filter(is_active=True).order_by('-send_count', 'pk').values_list('pk', flat=True).first(),
+            'member': Member.objects.order_by('-send_count', 'pk').values_list('pk', flat=True).first(),
+        }
+
+    def _make_clients(self):
+        admin = User.objects.create_user('benchmark-admin', 'bench-admin@example.com', 'pw', is_staff=True)
+        member_user = User.objects.create_user('benchmark-member', 'bench-member@example.com', 'pw')
+        member = Member.objects.get(pk=self.samples['member'])
+        member.user = member_user
+        member.save()
+
+        clients = {ANONYMOUS: Client(), MEMBER: Client(), ADMIN: Client()}
+        clients[MEMBER].force_login(member_user)
+        clients[ADMIN].force_login(admin)
+        return clients
+
+    def views(self):
+        """(url name, role, url) for every benchmarked pattern in project.urls."""
+        for pattern in urls.urlpatterns:
+            if not isinstance(pattern, URLPattern) or pattern.name in SKIPPED_VIEWS:
+                continue
+            url = reverse(f'{urls.app_name}:{pattern.name}', kwargs=sample_kwargs(pattern.name, self.samples))
+            yield pattern.name, VIEW_ROLES.get(pattern.name, ANONYMOUS), url + VIEW_QUERY.get(pattern.name, '')
+
+    def request(self, client, url):
+        """GET url, reading streamed bodies to the end so their queries count."""
+        response = client.get(url)
+        if response.streaming:
+            for chunk in response.streaming_content:
+                pass
+        return response
+
+    def measure(self, role, url):
+        client = self.clients[role]
+        cache.clear()
+        for i in range(self.warmup):
+            self.request(client, url)
+
+        latencies, queries = [], []
+        for i in range(self.iterations):
+            if self.cold_cache:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = self.request(client, url)
+                latencies.append((time.perf_counter() - start) * 1000)
+            queries.append(len(captured))
+
+        # One more request for memory, since tracing slows everything down
+        if self.cold_cache:
+            cache.clear()
+        tracemalloc.start()
+        try:
+            self.request(client, url)
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'role': role,
+            'url': url,
+            'status': response.status_code,
+            'p50_ms': round(percentile(latencies, 0.5), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'mean_ms': round(statistics.fmean(latencies), 2),
+            'queries': max(queries),
+            'peak_kb': round(peak / 1024, 1),
+        }
+
+    def run(self, only=None):
+        """Benchmark every view (or only the named ones) and return {url name: result}."""
+        results = {}
+        for name, role, url in self.views():
+            if only and name not in only:
+                continue
+            results[name] = self.measure(role, url)
+        return results
+
+
+def write_profiles():
+    """{name: (SQLite pragmas, lock timeout in seconds, writes through the write queue)}"""
+    return {
+        'default': ({'journal_mode': 'DELETE'}, 5, False),
+        'production': (settings.SQLITE_PRODUCTION_PRAGMAS, settings.SQLITE_TIMEOUT, True),
+    }
+
+
+class WriteContention:
+    """
+    Writer threads each log `sends` completions for their own new member
+    while another thread archives and restores one area's routes, as at a
+    busy evening with a route reset under way. Run it against a file
+    database (an in-memory one has no journal to tune) holding at least
+    `sends` active routes.
+    """
+
+    def __init__(self, threads=8, sends=25):
+        self.threads = threads
+        self.sends = sends
+
+    def _members(self, profile):
+        first_number = (Member.objects.aggregate(top=Max('member_number'))['top'] or 0) + 1
+        return Member.objects.bulk_create([
+            Member(
+                first_name='Contention', last_name=f'{profile} {i}',
+                member_number=first_number + i, email=f'contention{first_number + i}@example.com',
+            )
+            for i in range(self.threads)
+        ])
+
+    def _log_sends(self, member, routes, queued, result):
+        today = timezone.localdate()
+        try:
+            for route in routes:
+                completion = Completion(member=member, route=route, date_completed=today, difficulty_rating=3)
+                start = time.perf_counter()
+                try:
+                    if queued:
+                        writes.submit(completion.save)
+                    else:
+                        completion.save()
+                except OperationalError:  # "database is locked"
+                    result['errors'] += 1
+                else:
+                    result['latencies'].append((time.perf_counter() - start) * 1000)
+        finally:
+            connection.close()
+
+    def _archive(self, area, queued, stop, result):
+        try:
+            while not stop.is_set():
+                for is_active in (False, True):
+                    routes = Route.objects.filter(area=area)
+                    try:
+                        if queued:
+                            writes.submit(routes.set_active, is_active)
+                        else:
+                            routes.set_active(is_active)
+                    except OperationalError:
+                        result['errors'] += 1
+                    else:
+                        result['runs'] += 1
+        finally:
+            connection.close()
+
+    def run(self, profile):
+        """Throughput, lock errors and send latency under one of write_profiles()."""
+        pragmas, timeout, queued = write_profiles()[profile]
+        options = connection.settings_dict['OPTIONS']
+        connection.close()  # Reopen with the profile's pragmas
+        connection.settings_dict['OPTIONS'] = {**options, 'timeout': timeout}
+        try:
+            with override_settings(SQLITE_PRAGMAS=pragmas):
+                members = self._members(profile)
+                routes = list(Route.objects.filter(is_active=True).order_by('pk')[:self.sends])
+                area = Area.objects.order_by('pk').first()
+                connection.close()
+
+                sends = [{'errors': 0, 'latencies': []} for member in members]
+                archives = {'errors': 0, 'runs': 0}
+                stop = threading.Event()
+                archiver = threading.Thread(target=self._archive, args=(area, queued, stop, archives))
+                writers = [
+                    threading.Thread(target=self._log_sends, args=(member, routes, queued, result))
+                    for member, result in zip(members, sends)
+                ]
+                start = time.perf_counter()
+                archiver.start()
+                for writer in writers:
+                    writer.start()
+                for writer in writers:
+                    writer.join()
+                seconds = time.perf_counter() - start
+                stop.set()
+                archiver.join()
+        finally:
+            connection.close()
+            connection.settings_dict['OPTIONS'] = options
+
+        latencies = [latency for result in sends for latency in result['latencies']]
+        return {
+            'threads': self.threads,
+            'sends': len(latencies),
+            'send_errors': sum(result['errors'] for result in sends),
+            'archives': archives['runs'],
+            'archive_errors': archives['errors'],
+            'seconds': round(seconds, 3),
+            'sends_per_second': round(len(latencies) / seconds, 1),
+            'p50_ms': round(percentile(latencies, 0.5), 2) if latencies else None,
+            'p95_ms': round(percentile(latencies, 0.95), 2) if latencies else None,
+        }
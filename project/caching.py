@@ -0,0 +1,161 @@
+"""
+project/caching.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Version-keyed caching for the public, read-mostly pages.
+Every cache key includes the version numbers of the data it depends on
+(all routes, one area, one route). Signals bump those versions when the data
+changes, so stale entries are simply never read again and expire on their own.
+The a-prefixed helpers and AsyncVersionedPageCacheMixin serve async views.
+"""
+
+import hashlib
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import render
+
+VERSION_PREFIX = 'version'
+MODIFIED_PREFIX = 'modified'
+
+# Scope shared by every page that lists routes or route counts
+ROUTES_SCOPE = 'routes'
+
+
+def area_scope(area_id):
+    return f'area:{area_id}'
+
+
+def route_scope(route_id):
+    return f'route:{route_id}'
+
+
+def _initial_version():
+    """
+    Starting version for a scope with none in the cache.
+    Millisecond time, so versions never repeat after a cache flush and old
+    ETags built from them can't match again.
+    """
+    return int(time.time() * 1000)
+
+
+def get_version(scope):
+    """Current version number of a cache scope."""
+    return cache.get_or_set(f'{VERSION_PREFIX}:{scope}', _initial_version, None)
+
+
+async def aget_version(scope):
+    return await cache.aget_or_set(f'{VERSION_PREFIX}:{scope}', _initial_version, None)
+
+
+def get_modified(scope):
+    """Unix time the scope's data last changed (or was first seen, after a cache flush)."""
+    return cache.get_or_set(f'{MODIFIED_PREFIX}:{scope}', time.time, None)
+
+
+def bump_version(*scopes):
+    """Invalidate everything cached under the given scopes."""
+    now = time.time()
+    for scope in scopes:
+        key = f'{VERSION_PREFIX}:{scope}'
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), None)
+        cache.set(f'{MODIFIED_PREFIX}:{scope}', now, None)
+
+
+def versions_key(scopes):
+    """Compact string naming the current version of each scope, for cache keys."""
+    return '-'.join(f'{scope}.{get_version(scope)}' for scope in scopes)
+
+
+async def aversions_key(scopes):
+    return '-'.join([f'{scope}.{await aget_version(scope)}' for scope in scopes])
+
+
+def _page_key(request, versions):
+    raw = f'{request.get_full_path()}|{versions}'
+    return 'page:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def page_cache_key(request, scopes):
+    """Cache key for a full anonymous response to this URL at the current versions."""
+    return _page_key(request, versions_key(scopes))
+
+
+async def apage_cache_key(request, scopes):
+    return _page_key(request, await aversions_key(scopes))
+
+
+class VersionedPageCacheMixin:
+    """
+    Cache full GET responses for anonymous visitors and expose
+    `cache_version` to templates so authenticated requests can cache
+    fragments with {% cache %}. Views list their scopes in get_cache_scopes().
+    """
+
+    def get_cache_scopes(self):
+        return [ROUTES_SCOPE]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['cache_version'] = versions_key(self.get_cache_scopes())
+        context['fragment_timeout'] = settings.PAGE_CACHE_TIMEOUT
+        return context
+
+    def get(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().get(request, *args, **kwargs)
+
+        key = page_cache_key(request, self.get_cache_scopes())
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            def store(rendered):
+                cache.set(key, (rendered.content, rendered['Content-Type']), settings.PAGE_CACHE_TIMEOUT)
+            response.add_post_render_callback(store)
+        return response
+
+
+class AsyncVersionedPageCacheMixin:
+    """
+    VersionedPageCacheMixin for async class-based views. Subclasses set
+    template_name and build their context in an async get_context_data().
+    Templates still render synchronously, in a worker thread, so querysets
+    left lazy inside {% cache %} fragments only run on a fragment miss.
+    """
+    template_name = None
+
+    def get_cache_scopes(self):
+        return [ROUTES_SCOPE]
+
+    async def get_context_data(self, **kwargs):
+        kwargs['cache_version'] = await aversions_key(self.get_cache_scopes())
+        kwargs['fragment_timeout'] = settings.PAGE_CACHE_TIMEOUT
+        return kwargs
+
+    async def render_page(self, request):
+        context = await self.get_context_data()
+        return await sync_to_async(render)(request, self.template_name, context)
+
+    async def get(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return await self.render_page(request)
+
+        key = await apage_cache_key(request, self.get_cache_scopes())
+        cached = await cache.aget(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = await self.render_page(request)
+        if response.status_code == 200:
+            await cache.aset(key, (response.content, response['Content-Type']), settings.PAGE_CACHE_TIMEOUT)
+        return response
@@ -0,0 +1,142 @@
+"""
+project/cold_storage.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Cold storage for long-archived routes.
+freeze() moves routes archived more than settings.COLD_STORAGE_DAYS ago,
+with their completions, out of the Route and Completion tables into
+ColdRoute and ColdCompletion, so the hot tables (and their indexes) only
+hold the routes on the wall and the recently archived ones. Each ColdRoute
+keeps its sends' totals, so listing cold routes never reads their sends.
+thaw() moves routes back under their original ids, active again.
+
+Moving rows is not adding or removing sends: the member and area send
+counters, member stats and leaderboards keep counting frozen sends, and
+their rebuilds read both tables. Reports over individual completions (the
+admin completions page, exports, dashboard series) cover the hot table only.
+"""
+
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.utils import timezone
+from .models import Member, Area, Route, Completion, RouteStats, ColdRoute, ColdCompletion, routes_frozen
+from . import leaderboards, stats
+
+# Routes moved per transaction, so a large freeze never holds the write lock for long
+BATCH_SIZE = 500
+
+# Fields a route keeps in cold storage
+ROUTE_FIELDS = ['area_id', 'name', 'grade', 'color', 'date_set', 'setter_name']
+COMPLETION_FIELDS = ['id', 'member_id', 'route_id', 'date_completed', 'difficulty_rating', 'notes']
+
+
+def freeze_cutoff(days=None):
+    """Routes archived on or before this day are due for cold storage."""
+    days = settings.COLD_STORAGE_DAYS if days is None else days
+    return timezone.localdate() - timedelta(days=days)
+
+
+def _delete_rows(model, column, ids):
+    """
+    Delete rows by a column without the ORM's collector: no delete signals,
+    so the send counters and the other denormalized data stay as they are.
+    """
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {model._meta.db_table} WHERE {column} IN ({placeholders})', list(ids))
+
+
+def _freeze_batch(routes):
+    ids = [route.pk for route in routes]
+    completions = Completion.objects.filter(route_id__in=ids).order_by()
+    totals = {
+        row['route']: row for row in completions.values('route').annotate(
+            sends=Count('pk'), ratings=Sum('difficulty_rating'),
+            first=Min('date_completed'), last=Max('date_completed'),
+        )
+    }
+
+    cold_routes = []
+    for route in routes:
+        total = totals.get(route.pk, {})
+        cold_routes.append(ColdRoute(
+            id=route.pk,
+            archived_on=route.archived_on,
+            send_count=total.get('sends', 0),
+            rating_sum=total.get('ratings') or 0,
+            first_send=total.get('first'),
+            last_send=total.get('last'),
+            **{name: getattr(route, name) for name in ROUTE_FIELDS},
+        ))
+    ColdRoute.objects.bulk_create(cold_routes)
+    ColdCompletion.objects.bulk_create(
+        [ColdCompletion(**row) for row in completions.values(*COMPLETION_FIELDS).iterator()],
+        batch_size=1000,
+    )
+
+    _delete_rows(Completion, 'route_id', ids)
+    _delete_rows(RouteStats, 'route_id', ids)
+    _delete_rows(Route, 'id', ids)
+    routes_frozen.send(sender=Route, routes=[(route.pk, route.area_id) for route in routes])
+
+
+def freeze(days=None, batch_size=BATCH_SIZE):
+    """Move the routes archived more than `days` days ago to cold storage. Returns the number moved."""
+    due = Route.objects.filter(is_active=False, archived_on__lte=freeze_cutoff(days)).order_by('pk')
+    frozen = 0
+    while True:
+        with transaction.atomic():
+            routes = list(due.only('pk', 'archived_on', *ROUTE_FIELDS)[:batch_size])
+            if not routes:
+                return frozen
+            _freeze_batch(routes)
+        frozen += len(routes)
+
+
+def thaw(route_ids):
+    """
+    Move cold routes back to the Route table as active routes, with their
+    completions. Returns the number restored.
+    """
+    with transaction.atomic():
+        cold_routes = list(ColdRoute.objects.filter(pk__in=route_ids))
+        if not cold_routes:
+            return 0
+        ids = [cold.pk for cold in cold_routes]
+        Route.objects.create_many([
+            Route(
+                id=cold.pk,
+                is_active=True,
+                send_count=cold.send_count,
+                **{name: getattr(cold, name) for name in ROUTE_FIELDS},
+            )
+            for cold in cold_routes
+        ])
+        completions = ColdCompletion.objects.filter(route_id__in=ids).order_by()
+        Completion.objects.bulk_create(
+            [Completion(**row) for row in completions.values(*COMPLETION_FIELDS).iterator()],
+            batch_size=1000,
+        )
+        _delete_rows(ColdCompletion, 'route_id', ids)
+        _delete_rows(ColdRoute, 'id', ids)
+    return len(cold_routes)
+
+
+def completion_removed(completion):
+    """
+    Uncount a cold completion deleted with its member or area (cascade
+    deletes), as for a deleted Completion: send counters, member stats and
+    leaderboards. freeze() and thaw() move rows without this.
+    """
+    route = ColdRoute.objects.filter(pk=completion.route_id).values_list('grade', 'area_id').first()
+    if route is not None:
+        stats.record_completion(completion, -1, route=route)
+        leaderboards.record_completion(completion, -1, route=route)
+    Member.objects.filter(pk=completion.member_id).update(send_count=F('send_count') - 1)
+    Area.objects.filter(cold_routes__pk=completion.route_id).update(send_count=F('send_count') - 1)
+    ColdRoute.objects.filter(pk=completion.route_id).update(
+        send_count=F('send_count') - 1,
+        rating_sum=F('rating_sum') - completion.difficulty_rating,
+    )
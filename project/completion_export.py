@@ -0,0 +1,102 @@
+"""
+project/completion_export.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Streaming export of the completion history for analytics.
+Rows are fetched as values_list tuples through QuerySet.iterator(), which
+uses a server-side cursor where the database supports one, so memory stays
+flat no matter how many completions are exported.
+"""
+
+import csv
+import io
+import itertools
+import json
+from datetime import timedelta
+from django.utils import timezone
+from .models import Completion
+
+# Rows fetched from the database per round trip
+CHUNK_SIZE = 2000
+
+# Exported columns, in order
+COLUMNS = [
+    'completion_id', 'date_completed', 'difficulty_rating', 'notes',
+    'member_id', 'member_number', 'member_first_name', 'member_last_name',
+    'route_id', 'route_name', 'grade', 'color', 'route_is_active',
+    'area_id', 'area_name',
+]
+
+# values_list() lookups matching COLUMNS
+FIELDS = [
+    'id', 'date_completed', 'difficulty_rating', 'notes',
+    'member_id', 'member__member_number', 'member__first_name', 'member__last_name',
+    'route_id', 'route__name', 'route__grade', 'route__color', 'route__is_active',
+    'route__area_id', 'route__area__name',
+]
+
+
+def _number(name, value):
+    if not value.isdigit():
+        raise ValueError(f'Invalid {name} filter "{value}".')
+    return int(value)
+
+
+def parse_filters(route='', member='', area='', date_range='all'):
+    """
+    Validate the admin completions filters, as given in the query string.
+    Returns them for filter_completions(): ids and a number of days back
+    from today as ints, None when not filtering. Raises ValueError naming
+    the first invalid filter.
+    """
+    return {
+        'route': _number('route', route) if route else None,
+        'member': _number('member', member) if member else None,
+        'area': _number('area', area) if area else None,
+        'days': None if date_range == 'all' else _number('date_range', date_range),
+    }
+
+
+def filter_completions(completions, route=None, member=None, area=None, days=None):
+    """Apply the admin completions filters, as returned by parse_filters(), to a Completion queryset."""
+    if route is not None:
+        completions = completions.filter(route__id=route)
+
+    if member is not None:
+        completions = completions.filter(member__id=member)
+
+    if area is not None:
+        completions = completions.filter(route__area__id=area)
+
+    if days is not None:
+        cutoff_date = timezone.localdate() - timedelta(days=days)
+        completions = completions.filter(date_completed__gte=cutoff_date)
+
+    return completions
+
+
+def export_rows(file_format='csv', **filters):
+    """
+    Yield the filtered completions as CSV lines (header first) or NDJSON lines,
+    oldest first. filters are the parse_filters() result.
+    """
+    rows = (
+        filter_completions(Completion.objects.all(), **filters)
+        .order_by('date_completed', 'id')
+        .values_list(*FIELDS)
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+    if file_format == 'ndjson':
+        for row in rows:
+            yield json.dumps(dict(zip(COLUMNS, row)), default=str) + '\n'
+    elif file_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in itertools.chain([COLUMNS], rows):
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    else:
+        raise ValueError(f'Unsupported export format "{file_format}".')
@@ -0,0 +1,141 @@
+"""
+project/counters.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Denormalized send counters on Route, Member and Area.
+Each counter is adjusted with an F() expression whenever a Completion is
+created, edited or deleted, or its route moved to another area, so list
+pages read a column instead of counting rows.
+"""
+
+from collections import Counter, defaultdict
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from .models import Member, Area, Route, Completion, ColdCompletion
+
+
+# (model, path from the model to its completions, path to its cold completions) for every counted model.
+# Sends in cold storage (project.cold_storage) still count for their member and area.
+COUNTED_MODELS = [
+    (Route, 'route', None),
+    (Member, 'member', 'member'),
+    (Area, 'route__area', 'route__area'),
+]
+
+
+# Completion fields the counters, member stats and leaderboards depend on
+SEND_FIELDS = ['member_id', 'route_id', 'date_completed', 'difficulty_rating']
+
+# Stored for instances loaded without the send fields
+UNKNOWN = object()
+
+
+def send_entry(completion):
+    """
+    The completion's SEND_FIELDS values, or UNKNOWN when one was deferred
+    and reading it would query.
+    """
+    if completion.get_deferred_fields().intersection(SEND_FIELDS):
+        return UNKNOWN
+    return tuple(getattr(completion, name) for name in SEND_FIELDS)
+
+
+def stored_send_entry(pk):
+    """The send_entry() of a completion as stored, or None if it is gone."""
+    return Completion.objects.filter(pk=pk).values_list(*SEND_FIELDS).first()
+
+
+def as_completion(entry):
+    """An unsaved stand-in completion with a send_entry()'s values, e.g. to uncount the values before an edit."""
+    return Completion(**dict(zip(SEND_FIELDS, entry)))
+
+
+# Route fields the member stats and leaderboards count its sends under
+ROUTE_SEND_FIELDS = ['grade', 'area_id']
+
+
+def route_entry(route):
+    """(grade, area id) of a route, or UNKNOWN when one was deferred and reading it would query."""
+    if route.get_deferred_fields().intersection(ROUTE_SEND_FIELDS):
+        return UNKNOWN
+    return tuple(getattr(route, name) for name in ROUTE_SEND_FIELDS)
+
+
+def stored_route_entry(pk):
+    """The route_entry() of a route as stored, or None if it is gone."""
+    return Route.objects.filter(pk=pk).values_list(*ROUTE_SEND_FIELDS).first()
+
+
+def move_area_sends(route_id, old_area_id, new_area_id):
+    """Move a route's sends from one area's counter to another's, when the route is moved."""
+    sends = Completion.objects.filter(route_id=route_id).count()
+    if sends:
+        Area.objects.filter(pk=old_area_id).update(send_count=F('send_count') - sends)
+        Area.objects.filter(pk=new_area_id).update(send_count=F('send_count') + sends)
+
+
+def adjust_send_counts(route_id, member_id, delta):
+    """
+    Add delta to the send counters touched by one completion.
+    Must run in the same transaction as the Completion insert/delete.
+    """
+    Route.objects.filter(pk=route_id).update(send_count=F('send_count') + delta)
+    Member.objects.filter(pk=member_id).update(send_count=F('send_count') + delta)
+    Area.objects.filter(routes__pk=route_id).update(send_count=F('send_count') + delta)
+
+
+def adjust_send_counts_many(completions):
+    """
+    Count completions created together (CompletionQuerySet.create_many()):
+    one UPDATE per counted model and per number of sends added, rather
+    than three per completion. Each completion's route must be loaded.
+    """
+    for model, keys in [
+        (Route, [completion.route_id for completion in completions]),
+        (Member, [completion.member_id for completion in completions]),
+        (Area, [completion.route.area_id for completion in completions]),
+    ]:
+        by_count = defaultdict(list)
+        for pk, count in Counter(keys).items():
+            by_count[count].append(pk)
+        for count, pks in by_count.items():
+            model.objects.filter(pk__in=pks).update(send_count=F('send_count') + count)
+
+
+def _count_of(model, path):
+    completions = model.objects.filter(**{path: OuterRef('pk')}).order_by()
+    counts = completions.values(path).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts), Value(0))
+
+
+def _actual_count(path, cold_path=None):
+    """Correlated subquery counting the completions that belong to the outer row."""
+    if cold_path is None:
+        return _count_of(Completion, path)
+    return _count_of(Completion, path) + _count_of(ColdCompletion, cold_path)
+
+
+def find_drift():
+    """
+    Compare every stored counter with a fresh count.
+    Returns a list of (model name, pk, stored, actual) for rows that disagree.
+    """
+    drift = []
+    for model, path, cold_path in COUNTED_MODELS:
+        rows = model.objects.annotate(actual=_actual_count(path, cold_path)).exclude(
+            send_count=F('actual')
+        ).values_list('pk', 'send_count', 'actual')
+        for pk, stored, actual in rows:
+            drift.append((model.__name__, pk, stored, actual))
+    return drift
+
+
+def rebuild_send_counts():
+    """
+    Recompute every counter from the Completion and ColdCompletion tables.
+    Returns the number of rows updated per model name.
+    """
+    updated = {}
+    for model, path, cold_path in COUNTED_MODELS:
+        updated[model.__name__] = model.objects.update(send_count=_actual_count(path, cold_path))
+    return updated
@@ -0,0 +1,116 @@
+"""
+project/database.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+SQLite tuning for the production database profile (see settings.py).
+configure_connection() applies settings.SQLITE_PRAGMAS to every new
+connection. WriteQueue serializes this process's writes and coalesces the
+ones that arrive together: while one thread commits, the writes queued
+behind it wait, and the next thread to get the write lock commits all of
+them in one short transaction. Threads no longer race each other for
+SQLite's single write lock (the source of "database is locked" when a
+completion and a bulk archive collide), and a burst of sends costs one
+commit instead of one each. Writes from other processes still wait on the
+busy timeout.
+"""
+
+import threading
+from collections import deque
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+# Writes committed together at most
+MAX_BATCH = 50
+
+
+def configure_connection(connection):
+    """Apply settings.SQLITE_PRAGMAS to a newly opened SQLite connection."""
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        # On the raw connection, so connection setup never counts as a request's queries
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+class _Write:
+    """One submitted write and its outcome."""
+    __slots__ = ('func', 'args', 'kwargs', 'result', 'error', 'done')
+
+    def __init__(self, func, args, kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.result = None
+        self.error = None
+        self.done = False
+
+    def run(self):
+        self.result = self.func(*self.args, **self.kwargs)
+
+
+class WriteQueue:
+    """
+    Group commit for writes from many threads of one process. Whichever
+    waiting thread gets the write lock commits every queued write (up to
+    max_batch), each in its own savepoint, so a failing write (e.g. a
+    duplicate completion) is rolled back alone and raises in the thread
+    that submitted it.
+    """
+
+    def __init__(self, max_batch=MAX_BATCH, using=DEFAULT_DB_ALIAS):
+        self.max_batch = max_batch
+        self.using = using
+        self._queue = deque()
+        self._queue_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    @property
+    def pending(self):
+        """Writes queued and not yet taken into a batch."""
+        return len(self._queue)
+
+    def submit(self, func, *args, **kwargs):
+        """Run func(*args, **kwargs) in a write transaction and return its result."""
+        if transaction.get_connection(self.using).in_atomic_block:
+            # The caller's transaction decides when this commits; nothing to coalesce
+            return func(*args, **kwargs)
+
+        write = _Write(func, args, kwargs)
+        with self._queue_lock:
+            self._queue.append(write)
+        while not write.done:
+            with self._write_lock:
+                if not write.done:
+                    self._commit(self._take())
+        if write.error is not None:
+            raise write.error
+        return write.result
+
+    def _take(self):
+        with self._queue_lock:
+            return [self._queue.popleft() for i in range(min(self.max_batch, len(self._queue)))]
+
+    def _commit(self, batch):
+        """Commit a batch on this thread's connection, recording each write's result or error."""
+        try:
+            with transaction.atomic(using=self.using):
+                if len(batch) == 1:
+                    batch[0].run()
+                else:
+                    for write in batch:
+                        try:
+                            with transaction.atomic(using=self.using):
+                                write.run()
+                        except Exception as error:
+                            write.error = error
+        except Exception as error:
+            # The transaction rolled back: nothing in the batch was written
+            for write in batch:
+                write.result = None
+                write.error = write.error or error
+        finally:
+            for write in batch:
+                write.done = True
+
+
+writes = WriteQueue()
@@ -0,0 +1,96 @@
+"""
+project/filter_options.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Cached (id, label) options for the admin filter dropdowns.
+Each kind of option list is stored under a version number (see
+project.caching) that the model signals bump, so a change to a route,
+member or area invalidates only the lists that show it.
+"""
+
+from django.core.cache import cache
+from .models import Member, Area, Route
+from .caching import get_version, bump_version
+from .replicas import on_primary
+
+CACHE_PREFIX = 'filter-options'
+CACHE_TIMEOUT = 60 * 60 * 24
+
+# Number of matches returned by the typeahead endpoint
+TYPEAHEAD_LIMIT = 20
+
+
+def _route_options():
+    rows = Route.objects.order_by('name').values_list('id', 'name', 'color', 'grade', 'area__name')
+    return [
+        (pk, f"{name or color.title() + ' Route'} ({grade}) - {area_name}")
+        for pk, name, color, grade, area_name in rows
+    ]
+
+
+def _member_options():
+    rows = Member.objects.order_by('first_name', 'last_name').values_list(
+        'id', 'first_name', 'last_name', 'member_number'
+    )
+    return [(pk, f'{first} {last} (#{number})') for pk, first, last, number in rows]
+
+
+def _area_options():
+    return list(Area.objects.order_by('name').values_list('id', 'name'))
+
+
+BUILDERS = {
+    'route': _route_options,
+    'member': _member_options,
+    'area': _area_options,
+}
+
+
+def options_scope(kind):
+    return f'{CACHE_PREFIX}:{kind}'
+
+
+def invalidate(kind):
+    """Drop the cached option list of one kind."""
+    bump_version(options_scope(kind))
+
+
+def get_options(kind):
+    """Return the cached [(id, label), ...] list for 'route', 'member' or 'area'."""
+    key = f'{CACHE_PREFIX}:{kind}:{get_version(options_scope(kind))}'
+    options = cache.get(key)
+    if options is None:
+        with on_primary():  # Shared by every reader, so never built from a lagging replica
+            options = BUILDERS[kind]()
+        cache.set(key, options, CACHE_TIMEOUT)
+    return options
+
+
+def get_label(kind, pk):
+    """Label of one option, or None if the id is unknown or not a number."""
+    try:
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+    for option_id, label in get_options(kind):
+        if option_id == pk:
+            return label
+    return None
+
+
+def search_options(kind, query, limit=TYPEAHEAD_LIMIT):
+    """
+    Typeahead search over the cached labels.
+    Labels starting with the query rank ahead of labels that only contain it.
+    """
+    query = query.strip().lower()
+    if not query:
+        return get_options(kind)[:limit]
+    prefix, contains = [], []
+    for option in get_options(kind):
+        label = option[1].lower()
+        if label.startswith(query):
+            prefix.append(option)
+        elif query in label:
+            contains.append(option)
+    return (prefix + contains)[:limit]
@@ -10,6 +10,7 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from .models import Member, Route, Completion
+from . import setters
 
 
 class CustomUserCreationForm(UserCreationForm):
@@ -142,31 +143,8 @@ class RouteForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         
-        # Get all admin users (staff or members with is_admin=True)
-        admin_users = []
-        
-        # Get staff users
-        staff_users = User.objects.filter(is_staff=True).order_by('first_name', 'last_name')
-        for user in staff_users:
-            if user.first_name and user.last_name:
-                name = f"{user.first_name} {user.last_name}"
-            else:
-                name = user.username
-            admin_users.append((name, name))
-        
-        # Get members marked as admin
-        admin_members = Member.objects.filter(is_admin=True).order_by('first_name', 'last_name')
-        for member in admin_members:
-            name = f"{member.first_name} {member.last_name}"
-            # Avoid duplicates if they're already in staff
-            if (name, name) not in admin_users:
-                admin_users.append((name, name))
-        
-        # Remove duplicates and sort
-        admin_users = sorted(list(set(admin_users)), key=lambda x: x[1])
-        
         # Set the choices
-        self.fields['setter_name'].choices = [('', '-- Select Setter --')] + admin_users
+        self.fields['setter_name'].choices = [('', '-- Select Setter --')] + setters.get_choices()
         
         # Set today's date as default
         if not self.instance.pk:
@@ -178,6 +156,32 @@ class RouteForm(forms.ModelForm):
             self.fields['setter_name'].initial = self.instance.setter_name
 
 
+class RouteImportRowForm(forms.ModelForm):
+    """
+    Validates one row of a route import file.
+    The area is resolved by the importer, so no per-row queries run here.
+    """
+    class Meta:
+        model = Route
+        fields = ['name', 'grade', 'color', 'date_set', 'setter_name']
+
+
+class RouteImportForm(forms.Form):
+    """
+    Upload form for bulk route imports on reset days.
+    """
+    file = forms.FileField(
+        help_text="CSV with columns area, name, grade, color, date_set, setter_name (or JSON / JSON Lines)",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control'}),
+    )
+    reset_area = forms.BooleanField(
+        required=False,
+        label="Reset areas",
+        help_text="Archive the current routes of every area in the file before importing",
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+    )
+
+
 class RouteStatusForm(forms.ModelForm):
     """
     Form for updating route status (active/archived).
@@ -0,0 +1,207 @@
+"""
+project/instrumentation.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Per-request performance instrumentation.
+RequestMetricsMiddleware records query count, SQL time, template render time
+and response size for every request, reports them in a Server-Timing header
+and logs them as JSON on the "project.performance" logger. Views named in
+settings.VIEW_BUDGETS are checked against their budget; with
+settings.ENFORCE_VIEW_BUDGETS on (the test runner turns it on) an overrun
+raises BudgetExceeded, which fails the test that made the request.
+The middleware runs natively under both WSGI and ASGI. Queries are counted
+by a wrapper installed on every database connection as it opens, because
+under ASGI the async ORM queries from a worker thread with its own
+connection; the wrapper finds the request through a context variable.
+"""
+
+import contextvars
+import json
+import logging
+import time
+from dataclasses import dataclass
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger('project.performance')
+
+# Metrics of the request being handled in this thread/task, if any
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+# Budget keys and the RequestMetrics property each one limits
+BUDGET_LIMITS = {
+    'queries': 'queries',
+    'sql_ms': 'sql_ms',
+    'template_ms': 'template_ms',
+    'total_ms': 'total_ms',
+    'bytes': 'size',
+}
+
+
+class BudgetExceeded(AssertionError):
+    """A view went over its settings.VIEW_BUDGETS entry."""
+
+
+@dataclass
+class RequestMetrics:
+    """Measurements for one request. Times are in seconds."""
+    queries: int = 0
+    sql_time: float = 0.0
+    template_time: float = 0.0
+    total_time: float = 0.0
+    size: int = None  # None for streaming responses
+    rendering: bool = False
+
+    @property
+    def sql_ms(self):
+        return self.sql_time * 1000
+
+    @property
+    def template_ms(self):
+        return self.template_time * 1000
+
+    @property
+    def total_ms(self):
+        return self.total_time * 1000
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """connection.execute_wrapper() hook counting and timing every query."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.queries += 1
+
+    def server_timing(self):
+        """Server-Timing header value. Template time includes queries run while rendering."""
+        return ', '.join([
+            f'db;dur={self.sql_ms:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_ms:.1f}',
+            f'total;dur={self.total_ms:.1f}',
+        ])
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper passing each query to the current request's metrics, if any."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics.execute_wrapper(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection):
+    """Add record_query to a connection's execute wrappers (once)."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def _timed_render(render):
+    """Wrap Template.render so the outermost render of a request is timed."""
+    @wraps(render)
+    def wrapped(self, context):
+        metrics = _current.get()
+        if metrics is None or metrics.rendering:
+            return render(self, context)
+        metrics.rendering = True
+        start = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            metrics.template_time += time.perf_counter() - start
+            metrics.rendering = False
+    wrapped.timed = True
+    return wrapped
+
+
+def check_budget(view_name, method, metrics):
+    """
+    Return a description of every budget the view went over (empty if none).
+    A "<view name> <METHOD>" entry, e.g. for a form's POST, overrides the view's own.
+    """
+    budgets = settings.VIEW_BUDGETS
+    budget = budgets.get(f'{view_name} {method}', budgets.get(view_name, {}))
+    overruns = []
+    for key, limit in budget.items():
+        value = getattr(metrics, BUDGET_LIMITS[key])
+        if value is not None and value > limit:
+            overruns.append(f'{key} {value:g} > {limit:g}')
+    return overruns
+
+
+class RequestMetricsMiddleware:
+    """
+    Measure each request. Goes first in MIDDLEWARE so the numbers cover
+    the whole stack, including session and auth lookups.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        if not getattr(Template.render, 'timed', False):
+            Template.render = _timed_render(Template.render)
+        # Connections opened later get the recorder from project.signals
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.total_time = time.perf_counter() - start
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.total_time = time.perf_counter() - start
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        """Add the Server-Timing header, log the metrics and enforce the view's budget."""
+        if not response.streaming:
+            metrics.size = len(response.content)
+        response['Server-Timing'] = metrics.server_timing()
+
+        match = request.resolver_match
+        view_name = match.view_name if match else None
+        overruns = check_budget(view_name, request.method, metrics) if view_name else []
+        self.log(request, response, view_name, metrics, overruns)
+        if overruns and settings.ENFORCE_VIEW_BUDGETS:
+            raise BudgetExceeded(f'{view_name} ({request.method} {request.path}) over budget: {"; ".join(overruns)}')
+        return response
+
+    def log(self, request, response, view_name, metrics, overruns):
+        record = {
+            'view': view_name,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            'sql_ms': round(metrics.sql_ms, 2),
+            'template_ms': round(metrics.template_ms, 2),
+            'total_ms': round(metrics.total_ms, 2),
+            'bytes': metrics.size,
+        }
+        if overruns:
+            record['over_budget'] = overruns
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
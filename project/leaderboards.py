@@ -0,0 +1,263 @@
+"""
+project/leaderboards.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Monthly and all-time leaderboards, gym-wide and per area.
+Every send adds to four LeaderboardEntry rows of its member: all time and
+its month, each for the whole gym and for the route's area. The signals in
+project.signals apply each logged or removed completion, and the
+rebuild_leaderboards command recomputes everything. Each board has an index
+in its ranking order, so the top of a board is an index range read and a
+member's rank is one indexed count of the entries ahead of them.
+"""
+
+from collections import defaultdict
+from itertools import chain
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from .models import Route, Completion, ColdCompletion, LeaderboardEntry
+from .stats import GRADE_ORDER
+
+ALL_TIME = LeaderboardEntry.ALL_TIME
+GYM = LeaderboardEntry.GYM
+
+# Board name: (label, ranking order). Later fields break ties; equal scores share a rank.
+BOARDS = {
+    'sends': ('Most sends', ['sends']),
+    'grade': ('Hardest grade', ['top_grade', 'points']),
+    'points': ('Most points', ['points']),
+}
+
+# Points per send: harder grades are worth more
+GRADE_POINTS = {grade: 10 * (index + 1) for index, grade in enumerate(GRADE_ORDER)}
+
+UPSERT_SQL = (
+    'INSERT INTO {table} (member_id, period, scope, sends, points, top_grade) VALUES {rows} '
+    'ON CONFLICT (member_id, period, scope) DO UPDATE SET '
+    'sends = {table}.sends + excluded.sends, '
+    'points = {table}.points + excluded.points, '
+    'top_grade = {greatest}({table}.top_grade, excluded.top_grade)'
+)
+
+# Scalar "larger of two values" function of the databases with upserts
+GREATEST = {'sqlite': 'MAX', 'postgresql': 'GREATEST'}
+
+
+def grade_rank(grade):
+    """1 for the easiest grade and up; 0 for an unknown one."""
+    return GRADE_ORDER.index(grade) + 1 if grade in GRADE_ORDER else 0
+
+
+def month_of(day):
+    return day.strftime('%Y-%m')
+
+
+def entry_keys(date_completed, area_id):
+    """(period, scope) of every entry a send on this date in this area counts towards."""
+    return [(period, scope) for period in (ALL_TIME, month_of(date_completed)) for scope in (GYM, area_id)]
+
+
+def _route_of(completion):
+    """(grade, area id) of the completion's route, without a query when it is already loaded."""
+    if Completion.route.is_cached(completion):
+        return completion.route.grade, completion.route.area_id
+    return Route.objects.filter(pk=completion.route_id).values_list('grade', 'area_id').first()
+
+
+def _keys_filter(keys):
+    condition = Q()
+    for period, scope in keys:
+        condition |= Q(period=period, scope=scope)
+    return condition
+
+
+def record_completion(completion, delta, route=None):
+    """
+    Apply one logged (delta=1) or removed (delta=-1) completion to the leaderboards.
+    route is the (grade, area id) of the completion's route, as for
+    stats.record_completion(). Runs inside the transaction that saves or deletes the completion.
+    """
+    route = route or _route_of(completion)
+    if route is None:
+        return
+    grade, area_id = route
+    keys = entry_keys(completion.date_completed, area_id)
+    if delta > 0:
+        _add(completion.member_id, keys, GRADE_POINTS.get(grade, 0), grade_rank(grade))
+    else:
+        _remove([completion.member_id], keys, GRADE_POINTS.get(grade, 0), grade_rank(grade))
+
+
+def record_completions(completions):
+    """
+    Apply completions created together (CompletionQuerySet.create_many())
+    to the leaderboards in one statement. Each completion's route must be loaded.
+    """
+    _upsert(build_entries(
+        (completion.member_id, completion.date_completed, completion.route.grade, completion.route.area_id)
+        for completion in completions
+    ))
+
+
+def _add(member_id, keys, points, rank):
+    _upsert([
+        LeaderboardEntry(member_id=member_id, period=period, scope=scope, sends=1, points=points, top_grade=rank)
+        for period, scope in keys
+    ])
+
+
+def _upsert(entries):
+    """Add unsaved entries' sends and points to the stored ones, creating those missing."""
+    if not entries:
+        return
+    if connection.vendor in GREATEST:
+        # One statement for all the entries
+        rows = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(entries))
+        params = [
+            value for entry in entries
+            for value in (entry.member_id, entry.period, entry.scope, entry.sends, entry.points, entry.top_grade)
+        ]
+        sql = UPSERT_SQL.format(
+            table=LeaderboardEntry._meta.db_table, rows=rows, greatest=GREATEST[connection.vendor]
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+        return
+
+    with transaction.atomic():
+        for entry in entries:
+            updated = LeaderboardEntry.objects.filter(
+                member_id=entry.member_id, period=entry.period, scope=entry.scope
+            ).update(
+                sends=F('sends') + entry.sends, points=F('points') + entry.points,
+                top_grade=Greatest('top_grade', entry.top_grade),
+            )
+            if not updated:
+                entry.save()
+
+
+def _remove(member_ids, keys, points, rank):
+    """
+    Take one send off each member's entries. Only updates and deletes, so a
+    cascade deleting the member never recreates rows it already collected.
+    """
+    entries = LeaderboardEntry.objects.filter(_keys_filter(keys), member_id__in=member_ids)
+    entries.update(sends=F('sends') - 1, points=Greatest(F('points') - points, 0))
+    entries.filter(sends=0).delete()
+
+    # The hardest grade only changes when the removed send was at it
+    for entry in entries.filter(top_grade=rank).only('member_id', 'period', 'scope'):
+        entry.top_grade = _top_grade(entry.member_id, entry.period, entry.scope)
+        entry.save(update_fields=['top_grade'])
+
+
+def route_changed(route_id, before, after):
+    """
+    Move the sends of a route edited to another grade or area from the
+    entries of before, its (grade, area id) before the edit, to those of
+    after. Runs once the route is saved, so the hardest grades are recomputed
+    from its new values.
+    """
+    sends = list(Completion.objects.filter(route_id=route_id).values_list('member_id', 'date_completed'))
+    grade, area_id = before
+    by_month = defaultdict(list)
+    for member_id, date_completed in sends:
+        by_month[date_completed.replace(day=1)].append(member_id)
+    for month, member_ids in by_month.items():
+        _remove(member_ids, entry_keys(month, area_id), GRADE_POINTS.get(grade, 0), grade_rank(grade))
+
+    grade, area_id = after
+    _upsert(build_entries((member_id, date_completed, grade, area_id) for member_id, date_completed in sends))
+
+
+def _top_grade(member_id, period, scope):
+    """Hardest grade rank among the member's sends counted by one entry, including those in cold storage."""
+    grades = []
+    for model in (Completion, ColdCompletion):
+        completions = model.objects.filter(member_id=member_id)
+        if period != ALL_TIME:
+            year, month = map(int, period.split('-'))
+            completions = completions.filter(date_completed__year=year, date_completed__month=month)
+        if scope != GYM:
+            completions = completions.filter(route__area_id=scope)
+        grades.append(completions.values_list('route__grade', flat=True))
+    grades = grades[0].union(grades[1])  # Distinct grades of both tables, in one query
+    return max((grade_rank(grade) for grade in grades), default=0)
+
+
+def build_entries(rows):
+    """LeaderboardEntry rows for (member id, date completed, grade, area id) send rows."""
+    totals = defaultdict(lambda: [0, 0, 0])
+    for member_id, date_completed, grade, area_id in rows:
+        for period, scope in entry_keys(date_completed, area_id):
+            entry = totals[member_id, period, scope]
+            entry[0] += 1
+            entry[1] += GRADE_POINTS.get(grade, 0)
+            entry[2] = max(entry[2], grade_rank(grade))
+    return [
+        LeaderboardEntry(member_id=member_id, period=period, scope=scope, sends=sends, points=points, top_grade=top)
+        for (member_id, period, scope), (sends, points, top) in totals.items()
+    ]
+
+
+@transaction.atomic
+def rebuild():
+    """Recompute every leaderboard from the Completion and ColdCompletion tables. Returns the number of entries."""
+    fields = ['member_id', 'date_completed', 'route__grade', 'route__area_id']
+    rows = chain(
+        Completion.objects.values_list(*fields).iterator(chunk_size=2000),
+        ColdCompletion.objects.values_list(*fields).iterator(chunk_size=2000),
+    )
+    entries = build_entries(rows)
+    LeaderboardEntry.objects.all().delete()
+    LeaderboardEntry.objects.bulk_create(entries, batch_size=1000)
+    return len(entries)
+
+
+def _ordering(board):
+    fields = BOARDS[board][1]
+    return [f'-{field}' for field in fields] + ['member_id']
+
+
+def standings(board, period=ALL_TIME, scope=GYM):
+    """Every entry of one board, best first."""
+    return LeaderboardEntry.objects.filter(period=period, scope=scope).order_by(*_ordering(board))
+
+
+def top(board, period=ALL_TIME, scope=GYM, limit=10):
+    """
+    The best `limit` entries of a board with their members, as (rank, entry).
+    Equal scores share a rank (1, 2, 2, 4).
+    """
+    fields = BOARDS[board][1]
+    ranked = []
+    for position, entry in enumerate(standings(board, period, scope).select_related('member')[:limit]):
+        score = [getattr(entry, field) for field in fields]
+        if ranked and score == [getattr(ranked[-1][1], field) for field in fields]:
+            rank = ranked[-1][0]
+        else:
+            rank = position + 1
+        ranked.append((rank, entry))
+    return ranked
+
+
+def _ahead_of(entry, fields):
+    """Entries scoring better than entry on the board ranked by fields."""
+    condition = Q()
+    equal = Q()
+    for field in fields:
+        value = getattr(entry, field)
+        condition |= equal & Q(**{f'{field}__gt': value})
+        equal &= Q(**{field: value})
+    return condition
+
+
+def rank_of(member, board, period=ALL_TIME, scope=GYM):
+    """(rank, entry) of a member on a board, or None before their first send there."""
+    entry = LeaderboardEntry.objects.filter(member=member, period=period, scope=scope).first()
+    if entry is None:
+        return None
+    fields = BOARDS[board][1]
+    ahead = LeaderboardEntry.objects.filter(_ahead_of(entry, fields), period=period, scope=scope).count()
+    return ahead + 1, entry
@@ -0,0 +1,145 @@
+"""
+project/live_feed.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+In-process event bus behind the live "recent sends" feed.
+The signals in project.signals publish an event once a completion or route
+change commits. The bus keeps a short backlog and hands every event to the
+queue of each connected live_feed_view stream, so any number of lobby
+screens share one publish instead of each polling the database. The bus
+lives in one process, which is why the server runs a single worker process
+(see central_rock_tracker/asgi.py and wsgi.py): a second one would only
+see the writes it handled itself.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+# Events kept for clients reconnecting with Last-Event-ID
+BACKLOG_SIZE = 200
+
+# Events waiting for one slow client before it starts missing them
+QUEUE_SIZE = 100
+
+# Event types
+SEND = 'send'
+ROUTES = 'routes'
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    type: str
+    data: dict
+
+    def encode(self):
+        """The event in text/event-stream format."""
+        return f'id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data)}\n\n'
+
+
+class Subscription:
+    """One client's view of the bus: the backlog it missed, then new events."""
+
+    def __init__(self, bus, backlog):
+        self.bus = bus
+        self.backlog = deque(backlog)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+
+    def deliver(self, event):
+        """Queue an event; runs on the subscriber's event loop."""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass  # The client sees a gap in the ids and can reload
+
+    async def get(self, timeout):
+        """The next event, or None when nothing arrived within timeout seconds."""
+        if self.backlog:
+            return self.backlog.popleft()
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    """
+    Thread-safe fan-out of events to async subscribers. Publishers can be
+    any thread (sync views run in worker threads); each event is passed to
+    the subscriber's own event loop.
+    """
+
+    def __init__(self, backlog_size=BACKLOG_SIZE):
+        self._lock = threading.Lock()
+        self._events = deque(maxlen=backlog_size)
+        self._subscribers = set()
+        # Millisecond time, so ids keep increasing across restarts
+        self._next_id = int(time.time() * 1000)
+
+    def publish(self, event_type, data):
+        with self._lock:
+            event = Event(self._next_id, event_type, data)
+            self._next_id += 1
+            self._events.append(event)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                self.unsubscribe(subscription)  # Its event loop is gone
+        return event
+
+    def since(self, last_id):
+        """Backlog events newer than last_id, oldest first."""
+        with self._lock:
+            return [event for event in self._events if event.id > last_id]
+
+    def subscribe(self, last_id=None):
+        """
+        Start receiving events. With last_id, the backlog events after it
+        come first. Call from the event loop that will read them.
+        """
+        with self._lock:
+            backlog = [event for event in self._events if last_id is not None and event.id > last_id]
+            subscription = Subscription(self, backlog)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def last_id(self):
+        """Id of the newest event published so far."""
+        return self._next_id - 1
+
+
+bus = EventBus()
+
+
+def send_event(completion):
+    """Event data for a newly logged completion."""
+    return {
+        'id': completion.pk,
+        'member': str(completion.member),
+        'route': str(completion.route),
+        'route_id': completion.route_id,
+        'date_completed': str(completion.date_completed),
+    }
+
+
+def routes_event(action, routes):
+    """Event data for routes set, archived, restored or edited; routes is [(pk, area_id), ...]."""
+    return {
+        'action': action,
+        'routes': [{'id': pk, 'area_id': area_id} for pk, area_id in routes],
+    }
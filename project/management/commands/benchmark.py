@@ -0,0 +1,69 @@
+"""
+project/management/commands/benchmark.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Benchmark every view against a synthetic dataset in a throwaway test database.
+
+Usage:
+    python manage.py benchmark --output bench.json
+    python manage.py benchmark --members 5000 --iterations 50 --view route_list --view admin_completions
+    python manage.py benchmark --cold-cache       # clear the cache before every request
+
+Compare two runs with any JSON diff, e.g. `diff before.json after.json`.
+"""
+
+import json
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from project.benchmarks import Benchmark
+from project.synthetic import generate
+from .generate_gym_data import add_dataset_arguments, dataset_spec
+
+# Private cache for the run, so benchmarking never clears a shared cache
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'central-rock-tracker-benchmark',
+    }
+}
+
+
+class Command(BaseCommand):
+    help = 'Report p50/p95 latency, query counts and peak memory for every view as JSON.'
+
+    def add_arguments(self, parser):
+        add_dataset_arguments(parser)
+        parser.add_argument('--iterations', type=int, default=20, help='Measured requests per view (default 20).')
+        parser.add_argument('--warmup', type=int, default=2, help='Unmeasured requests per view first (default 2).')
+        parser.add_argument('--cold-cache', action='store_true', help='Clear the cache before every request.')
+        parser.add_argument('--view', action='append', help='Only benchmark this URL name (repeatable).')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        spec = dataset_spec(options)
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with override_settings(CACHES=BENCHMARK_CACHES):
+                created = generate(spec)
+                benchmark = Benchmark(options['iterations'], options['warmup'], options['cold_cache'])
+                results = benchmark.run(options['view'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'dataset': {**spec.as_dict(), 'created': created},
+            'iterations': options['iterations'],
+            'cold_cache': options['cold_cache'],
+            'views': results,
+        }
+        text = json.dumps(report, indent=2, sort_keys=True) + '\n'
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                stream.write(text)
+            self.stderr.write(f"Wrote {len(results)} view result(s) to {options['output']}.")
+        else:
+            self.stdout.write(text, ending='')
@@ -0,0 +1,61 @@
+"""
+project/management/commands/benchmark_writes.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Compare write throughput under contention for the default and production
+SQLite profiles, in a throwaway file database.
+
+Usage:
+    python manage.py benchmark_writes
+    python manage.py benchmark_writes --threads 16 --sends 50 --output writes.json
+"""
+
+import json
+import os
+import tempfile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from project.benchmarks import WriteContention, write_profiles
+from project.synthetic import DatasetSpec, generate
+from .benchmark import BENCHMARK_CACHES
+
+
+class Command(BaseCommand):
+    help = 'Report completion throughput and "database is locked" errors with and without the production SQLite profile.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent writer threads (default 8).')
+        parser.add_argument('--sends', type=int, default=25, help='Completions logged per thread (default 25).')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('benchmark_writes compares SQLite profiles; the default database is not SQLite.')
+        if options['threads'] < 1 or options['sends'] < 1:
+            raise CommandError('--threads and --sends must be at least 1.')
+        spec = DatasetSpec(active_routes=max(options['sends'], 50), archived_routes=0, members=50)
+
+        setup_test_environment()
+        with tempfile.TemporaryDirectory() as directory:
+            # A file database: an in-memory one has no journal or lock contention to measure
+            connection.settings_dict['TEST'] = {
+                **connection.settings_dict['TEST'], 'NAME': os.path.join(directory, 'contention.sqlite3'),
+            }
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                with override_settings(CACHES=BENCHMARK_CACHES):
+                    generate(spec)
+                    contention = WriteContention(options['threads'], options['sends'])
+                    results = {profile: contention.run(profile) for profile in write_profiles()}
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                teardown_test_environment()
+
+        text = json.dumps({'profiles': results}, indent=2, sort_keys=True) + '\n'
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                stream.write(text)
+            self.stderr.write(f"Wrote {len(results)} profile result(s) to {options['output']}.")
+        else:
+            self.stdout.write(text, ending='')
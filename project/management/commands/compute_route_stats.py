@@ -0,0 +1,27 @@
+"""
+project/management/commands/compute_route_stats.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Recompute the popularity and difficulty stats of every route in one batch.
+
+Usage:
+    python manage.py compute_route_stats
+
+The figures only move with new sends, so nightly is enough, e.g. from cron:
+    15 3 * * * cd /path/to/app && python manage.py compute_route_stats
+"""
+
+import time
+from django.core.management.base import BaseCommand
+from project.analytics import compute_route_stats
+
+
+class Command(BaseCommand):
+    help = 'Compute sends per day, rating mean/variance and soft/hard flags for every route.'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = compute_route_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'Computed stats for {count} route(s) in {time.perf_counter() - start:.2f}s.'
+        ))
@@ -0,0 +1,40 @@
+"""
+project/management/commands/export_completions.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Stream the completion history as CSV or NDJSON for analytics.
+
+Usage:
+    python manage.py export_completions > completions.csv
+    python manage.py export_completions --format ndjson --area 2 --days 90 --output dugout.ndjson
+"""
+
+from django.core.management.base import BaseCommand
+from project.completion_export import export_rows
+
+
+class Command(BaseCommand):
+    help = 'Stream completions (joined with member, route and area) as CSV or NDJSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv', help='Output format (default: csv).')
+        parser.add_argument('--route', type=int, help='Only export completions of this route id.')
+        parser.add_argument('--member', type=int, help='Only export completions by this member id.')
+        parser.add_argument('--area', type=int, help='Only export completions in this area id.')
+        parser.add_argument('--days', type=int, help='Only export the last N days (default: all time).')
+        parser.add_argument('--output', help='Write to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        lines = export_rows(
+            options['format'],
+            route=options['route'],
+            member=options['member'],
+            area=options['area'],
+            date_range=options['days'] if options['days'] is not None else 'all',
+        )
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as stream:
+                stream.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
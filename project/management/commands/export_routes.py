@@ -0,0 +1,31 @@
+"""
+project/management/commands/export_routes.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Export routes as CSV in the import_routes format.
+
+Usage:
+    python manage.py export_routes > routes.csv
+    python manage.py export_routes --area 2 --archived --output dugout.csv
+"""
+
+from django.core.management.base import BaseCommand
+from project.route_import import export_rows
+
+
+class Command(BaseCommand):
+    help = 'Export active (or all) routes as CSV in the import format.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--area', type=int, help='Only export routes in this area id.')
+        parser.add_argument('--archived', action='store_true', help='Include archived routes.')
+        parser.add_argument('--output', help='Write to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        lines = export_rows(options['area'], options['archived'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as stream:
+                stream.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,38 @@
+"""
+project/management/commands/freeze_archived_routes.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Move routes archived long ago, with their completions, to cold storage.
+
+Usage:
+    python manage.py freeze_archived_routes
+    python manage.py freeze_archived_routes --days 365
+
+Routes archived more than --days ago (default settings.COLD_STORAGE_DAYS)
+are moved. Restore them from the archived routes page. Nightly is enough, e.g. from cron:
+    45 3 * * * cd /path/to/app && python manage.py freeze_archived_routes
+"""
+
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from project.cold_storage import freeze
+
+
+class Command(BaseCommand):
+    help = 'Move routes archived more than COLD_STORAGE_DAYS days ago, with their completions, to cold storage.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.COLD_STORAGE_DAYS,
+            help=f'Minimum days since archiving (default: {settings.COLD_STORAGE_DAYS})',
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = freeze(options['days'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved {count} route(s) to cold storage in {time.perf_counter() - start:.2f}s.'
+        ))
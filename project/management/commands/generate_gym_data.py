@@ -0,0 +1,72 @@
+"""
+project/management/commands/generate_gym_data.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Fill the database with a deterministic synthetic gym.
+
+Usage:
+    python manage.py generate_gym_data                              # default size, seed 1
+    python manage.py generate_gym_data --members 5000 --archived-routes 20000 --seed 7
+    python manage.py generate_gym_data --clear                      # replace existing gym data
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from project.models import Area, Member
+from project.synthetic import DatasetSpec, clear, generate
+
+
+def add_dataset_arguments(parser):
+    """Dataset size options, shared with the benchmark command."""
+    defaults = DatasetSpec()
+    parser.add_argument('--seed', type=int, default=defaults.seed, help=f'Random seed (default {defaults.seed}).')
+    parser.add_argument('--areas', type=int, default=defaults.areas, help=f'Areas (default {defaults.areas}).')
+    parser.add_argument(
+        '--active-routes', type=int, default=defaults.active_routes,
+        help=f'Active routes (default {defaults.active_routes}).',
+    )
+    parser.add_argument(
+        '--archived-routes', type=int, default=defaults.archived_routes,
+        help=f'Archived routes (default {defaults.archived_routes}).',
+    )
+    parser.add_argument('--members', type=int, default=defaults.members, help=f'Members (default {defaults.members}).')
+    parser.add_argument(
+        '--mean-sends', type=float, default=defaults.mean_sends,
+        help=f'Mean completions per member (default {defaults.mean_sends:g}).',
+    )
+
+
+def dataset_spec(options):
+    """DatasetSpec from parsed add_dataset_arguments() options."""
+    if options['areas'] < 1 or options['mean_sends'] <= 0:
+        raise CommandError('--areas must be at least 1 and --mean-sends positive.')
+    return DatasetSpec(
+        seed=options['seed'],
+        areas=options['areas'],
+        active_routes=options['active_routes'],
+        archived_routes=options['archived_routes'],
+        members=options['members'],
+        mean_sends=options['mean_sends'],
+    )
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic synthetic dataset of areas, routes, members and completions.'
+
+    def add_arguments(self, parser):
+        add_dataset_arguments(parser)
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Delete all existing areas, routes, members and completions first.',
+        )
+
+    def handle(self, *args, **options):
+        spec = dataset_spec(options)
+        if options['clear']:
+            clear()
+        elif Area.objects.exists() or Member.objects.exists():
+            self.stderr.write('The database already has gym data; the result will not match the seed exactly.')
+
+        created = generate(spec)
+        self.stdout.write(self.style.SUCCESS(
+            'Created ' + ', '.join(f'{count} {name}' for name, count in created.items()) + '.'
+        ))
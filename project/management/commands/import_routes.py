@@ -0,0 +1,48 @@
+"""
+project/management/commands/import_routes.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Bulk-import a route set from CSV, JSON or JSON Lines.
+
+Usage:
+    python manage.py import_routes reset.csv
+    python manage.py import_routes reset.jsonl --reset-area   # archive the areas' current routes first
+"""
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from project.route_import import detect_format, import_routes
+
+
+class Command(BaseCommand):
+    help = 'Import routes from a CSV/JSON/JSON Lines file in one transaction.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import ("-" reads CSV from stdin).')
+        parser.add_argument(
+            '--format', choices=['csv', 'json', 'jsonl'],
+            help='File format (default: guessed from the extension).',
+        )
+        parser.add_argument(
+            '--reset-area', action='store_true',
+            help='Archive the current routes of every area in the file before inserting.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or detect_format(path)
+        try:
+            if path == '-':
+                result = import_routes(sys.stdin, file_format, options['reset_area'])
+            else:
+                with open(path, encoding='utf-8-sig', newline='') as stream:
+                    result = import_routes(stream, file_format, options['reset_area'])
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not import {path}: {e}')
+
+        for row_number, message in result.errors:
+            self.stderr.write(f'Row {row_number}: {message}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.created} route(s), archived {result.archived}, skipped {len(result.errors)} row(s).'
+        ))
@@ -0,0 +1,42 @@
+"""
+project/management/commands/rebuild_counters.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Rebuild or verify the denormalized send counters.
+
+Usage:
+    python manage.py rebuild_counters           # recompute every counter
+    python manage.py rebuild_counters --check   # only report drift
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from project.counters import find_drift, rebuild_send_counts
+
+
+class Command(BaseCommand):
+    help = 'Rebuild (or verify with --check) the send counters on Route, Member and Area.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Report counters that disagree with the Completion table without changing them.',
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            drift = find_drift()
+            for model_name, pk, stored, actual in drift:
+                self.stdout.write(f'{model_name} {pk}: stored {stored}, actual {actual}')
+            if drift:
+                raise CommandError(f'{len(drift)} counter(s) out of sync. Run rebuild_counters to fix.')
+            self.stdout.write(self.style.SUCCESS('All send counters are in sync.'))
+            return
+
+        with transaction.atomic():
+            updated = rebuild_send_counts()
+
+        for model_name, count in updated.items():
+            self.stdout.write(f'Rebuilt {count} {model_name} counter(s).')
+        self.stdout.write(self.style.SUCCESS('Send counters rebuilt.'))
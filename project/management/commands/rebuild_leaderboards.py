@@ -0,0 +1,20 @@
+"""
+project/management/commands/rebuild_leaderboards.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Rebuild every leaderboard from the Completion table.
+
+Usage:
+    python manage.py rebuild_leaderboards
+"""
+
+from django.core.management.base import BaseCommand
+from project import leaderboards
+
+
+class Command(BaseCommand):
+    help = 'Recompute the monthly and all-time leaderboards from the completions.'
+
+    def handle(self, *args, **options):
+        count = leaderboards.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} leaderboard entries.'))
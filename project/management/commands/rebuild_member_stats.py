@@ -0,0 +1,37 @@
+"""
+project/management/commands/rebuild_member_stats.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Rebuild the precomputed MemberStats rows from the Completion table.
+
+Usage:
+    python manage.py rebuild_member_stats
+    python manage.py rebuild_member_stats --member 1042   # one member number
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from project.models import Member
+from project.stats import rebuild_member_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the precomputed climbing statistics for every member (or one member).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--member', type=int, help='Only rebuild the member with this member number.')
+
+    def handle(self, *args, **options):
+        members = Member.objects.order_by('pk')
+        if options['member'] is not None:
+            members = members.filter(member_number=options['member'])
+            if not members.exists():
+                raise CommandError(f"No member with number {options['member']}.")
+
+        count = 0
+        for member in members.iterator():
+            with transaction.atomic():
+                rebuild_member_stats(member)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {count} member(s).'))
@@ -0,0 +1,26 @@
+"""
+project/management/commands/rebuild_search_index.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Refill the member and route full-text search tables.
+
+Usage:
+    python manage.py rebuild_search_index
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from project import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the FTS5 member and route search index from the model tables.'
+
+    def handle(self, *args, **options):
+        if not search.fts_available():
+            self.stdout.write('No FTS5 search tables in this database; searches use prefix filters instead.')
+            return
+
+        with transaction.atomic():
+            members, routes = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {members} member(s) and {routes} route(s).'))
@@ -0,0 +1,56 @@
+"""
+project/management/commands/rollup_dashboard.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Materialize the dashboard snapshot and the activity series.
+
+Usage:
+    python manage.py rollup_dashboard                 # snapshot + last 62 days of series
+    python manage.py rollup_dashboard --full          # rebuild the series from all history
+    python manage.py rollup_dashboard --interval 300  # keep running, every 5 minutes
+
+Schedule it more often than settings.DASHBOARD_SNAPSHOT_MAX_AGE, e.g. from cron:
+    */5 * * * * cd /path/to/app && python manage.py rollup_dashboard
+"""
+
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from project.models import DashboardSnapshot
+from project.rollups import DEFAULT_ROLLUP_DAYS, rollup_series, take_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Write a dashboard snapshot and refresh the time-bucketed activity series.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=DEFAULT_ROLLUP_DAYS,
+            help=f'Days of history to re-aggregate (default {DEFAULT_ROLLUP_DAYS}).',
+        )
+        parser.add_argument('--full', action='store_true', help='Re-aggregate the whole history.')
+        parser.add_argument(
+            '--keep-days', type=int, default=7,
+            help='Delete snapshots older than this many days (default 7).',
+        )
+        parser.add_argument(
+            '--interval', type=int,
+            help='Repeat every INTERVAL seconds instead of running once.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.run_once(options)
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def run_once(self, options):
+        snapshot = take_snapshot()
+        buckets = rollup_series(None if options['full'] else options['days'])
+        cutoff = timezone.now() - timedelta(days=options['keep_days'])
+        pruned, _ = DashboardSnapshot.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'{snapshot}: wrote {buckets} series bucket(s), pruned {pruned} old snapshot(s).'
+        ))
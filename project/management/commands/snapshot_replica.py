@@ -0,0 +1,45 @@
+"""
+project/management/commands/snapshot_replica.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Copy the primary SQLite database into the local read replica, so the
+reporting views can read from it (see project.replicas).
+
+Usage:
+    python manage.py snapshot_replica
+
+The reporting views use the copy while it is younger than REPLICA_MAX_LAG, e.g. from cron:
+    */5 * * * * cd /path/to/app && python manage.py snapshot_replica
+"""
+
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from project.replicas import REPLICA, configured, mark_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary database into the read replica with the SQLite online backup API.'
+
+    def handle(self, *args, **options):
+        if not configured():
+            raise CommandError(f'No "{REPLICA}" database is configured.')
+        primary, replica = connections[DEFAULT_DB_ALIAS], connections[REPLICA]
+        if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError('snapshot_replica copies SQLite files; a live replica keeps itself in sync.')
+        if primary.settings_dict['NAME'] == replica.settings_dict['NAME']:
+            raise CommandError('The replica is the primary database itself.')
+
+        # Taken before the copy starts, so writes that land during it count as newer
+        taken = time.time()
+        start = time.perf_counter()
+        primary.ensure_connection()
+        replica.ensure_connection()
+        # One read transaction on the primary (which, in WAL mode, does not block its writers);
+        # readers of the replica see the old copy until the new one is committed
+        primary.connection.backup(replica.connection)
+        mark_snapshot(taken)
+        self.stdout.write(self.style.SUCCESS(
+            f"Copied {primary.settings_dict['NAME']} to {replica.settings_dict['NAME']} "
+            f'in {time.perf_counter() - start:.2f}s.'
+        ))
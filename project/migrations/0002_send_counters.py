@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-17 16:16
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_send_counts(apps, schema_editor):
+    """Populate the new counters from existing completions."""
+    Completion = apps.get_model('project', 'Completion')
+    for model_name, path in [('Route', 'route'), ('Member', 'member'), ('Area', 'route__area')]:
+        model = apps.get_model('project', model_name)
+        counts = Completion.objects.filter(**{path: OuterRef('pk')}).order_by().values(path).annotate(
+            total=Count('pk')
+        ).values('total')
+        model.objects.update(send_count=Coalesce(Subquery(counts), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='area',
+            name='send_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='send_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='route',
+            name='send_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_send_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.30 on 2026-10-17 16:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0002_send_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='completion',
+            index=models.Index(fields=['date_completed'], name='completion_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='completion',
+            index=models.Index(fields=['route', 'date_completed'], name='completion_route_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='completion',
+            index=models.Index(fields=['member', 'date_completed'], name='completion_member_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['first_name', 'last_name'], name='member_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='route',
+            index=models.Index(fields=['is_active', 'date_set'], name='route_active_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='route',
+            index=models.Index(fields=['area', 'is_active', 'date_set'], name='route_area_active_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='route',
+            index=models.Index(fields=['date_set'], name='route_date_set_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='route',
+            index=models.Index(fields=['name'], name='route_name_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-17 16:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0003_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberStats',
+            fields=[
+                ('member', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='project.member')),
+                ('first_send', models.DateField(blank=True, null=True)),
+                ('last_send', models.DateField(blank=True, null=True)),
+                ('grade_counts', models.JSONField(default=dict)),
+                ('area_counts', models.JSONField(default=dict)),
+                ('daily_sends', models.JSONField(default=dict)),
+            ],
+            options={
+                'verbose_name_plural': 'member stats',
+            },
+        ),
+    ]
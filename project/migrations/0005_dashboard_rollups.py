@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-17 16:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0004_member_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('total_areas', models.PositiveIntegerField()),
+                ('total_routes', models.PositiveIntegerField()),
+                ('active_routes', models.PositiveIntegerField()),
+                ('archived_routes', models.PositiveIntegerField()),
+                ('total_members', models.PositiveIntegerField()),
+                ('total_completions', models.PositiveIntegerField()),
+            ],
+            options={
+                'get_latest_by': 'created_at',
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('series', models.CharField(choices=[('sends_per_day', 'Sends per day per area'), ('routes_set_per_week', 'Routes set per week'), ('active_members_per_month', 'Active members per month')], max_length=30)),
+                ('bucket', models.DateField()),
+                ('value', models.PositiveIntegerField()),
+                ('area', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='project.area')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['series', 'bucket'], name='rollup_series_bucket_idx')],
+                'unique_together': {('series', 'bucket', 'area')},
+            },
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Full-text search tables for project.search (SQLite FTS5 only)
+
+from django.db import migrations
+
+MEMBER_INDEX = 'project_member_search'
+ROUTE_INDEX = 'project_route_search'
+
+
+def fts5_supported(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        if cursor.fetchone()[0]:
+            return True
+        # Builds with FTS5 as a loadable/default module don't report the option
+        try:
+            cursor.execute('CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)')
+            cursor.execute('DROP TABLE temp.fts5_probe')
+        except Exception:
+            return False
+    return True
+
+
+def create_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if not fts5_supported(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE {MEMBER_INDEX} USING fts5("
+            "name, email, number, tokenize = 'unicode61', prefix = '1 2 3')"
+        )
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE {ROUTE_INDEX} USING fts5("
+            "name, setter, area, grade, color, tokenize = 'unicode61', prefix = '1 2 3')"
+        )
+        cursor.execute(
+            f"INSERT INTO {MEMBER_INDEX} (rowid, name, email, number) "
+            "SELECT id, first_name || ' ' || last_name, email, CAST(member_number AS TEXT) FROM project_member"
+        )
+        cursor.execute(
+            f"INSERT INTO {ROUTE_INDEX} (rowid, name, setter, area, grade, color) "
+            "SELECT r.id, r.name, r.setter_name, a.name, r.grade, r.color "
+            "FROM project_route r JOIN project_area a ON a.id = r.area_id"
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {MEMBER_INDEX}')
+        cursor.execute(f'DROP TABLE IF EXISTS {ROUTE_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0005_dashboard_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
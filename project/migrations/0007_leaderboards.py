@@ -0,0 +1,58 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:47
+
+from collections import defaultdict
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_leaderboards(apps, schema_editor):
+    """Build the leaderboards from existing completions (as project.leaderboards.rebuild does)."""
+    Completion = apps.get_model('project', 'Completion')
+    LeaderboardEntry = apps.get_model('project', 'LeaderboardEntry')
+    grades = ['VB', 'V0', 'V1', 'V2', 'V3', 'V4', 'V5']
+
+    totals = defaultdict(lambda: [0, 0, 0])
+    rows = Completion.objects.values_list('member_id', 'date_completed', 'route__grade', 'route__area_id')
+    for member_id, date_completed, grade, area_id in rows.iterator():
+        rank = grades.index(grade) + 1 if grade in grades else 0
+        for period in ('all', date_completed.strftime('%Y-%m')):
+            for scope in (0, area_id):
+                entry = totals[member_id, period, scope]
+                entry[0] += 1
+                entry[1] += 10 * rank
+                entry[2] = max(entry[2], rank)
+    LeaderboardEntry.objects.bulk_create([
+        LeaderboardEntry(member_id=member_id, period=period, scope=scope, sends=sends, points=points, top_grade=top)
+        for (member_id, period, scope), (sends, points, top) in totals.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0006_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(max_length=7)),
+                ('scope', models.PositiveIntegerField(default=0)),
+                ('sends', models.PositiveIntegerField(default=0)),
+                ('points', models.PositiveIntegerField(default=0)),
+                ('top_grade', models.PositiveSmallIntegerField(default=0)),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='project.member')),
+            ],
+            options={
+                'verbose_name_plural': 'leaderboard entries',
+                'indexes': [models.Index(fields=['period', 'scope', '-sends', 'member'], name='leaderboard_sends_idx'), models.Index(fields=['period', 'scope', '-points', 'member'], name='leaderboard_points_idx'), models.Index(fields=['period', 'scope', '-top_grade', '-points', 'member'], name='leaderboard_grade_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='leaderboardentry',
+            constraint=models.UniqueConstraint(fields=('member', 'period', 'scope'), name='unique_leaderboard_entry'),
+        ),
+        migrations.RunPython(backfill_leaderboards, migrations.RunPython.noop),
+    ]
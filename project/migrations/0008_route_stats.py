@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0007_leaderboards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteStats',
+            fields=[
+                ('route', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='project.route')),
+                ('sends', models.PositiveIntegerField(default=0)),
+                ('sends_per_day', models.FloatField(default=0)),
+                ('rating_mean', models.FloatField(blank=True, null=True)),
+                ('rating_variance', models.FloatField(blank=True, null=True)),
+                ('grade_feel', models.CharField(blank=True, choices=[('soft', 'Soft for the grade'), ('hard', 'Hard for the grade')], max_length=4)),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'route stats',
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.30 on 2026-10-17 18:04
+
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def backfill_set_history(apps, schema_editor):
+    """
+    Start every area's history with today's active routes (as
+    project.set_history.record_current does). Earlier days are unknown:
+    archiving never recorded when it happened.
+    """
+    Area = apps.get_model('project', 'Area')
+    Route = apps.get_model('project', 'Route')
+    AreaSetHistory = apps.get_model('project', 'AreaSetHistory')
+    today = timezone.localdate()
+
+    entries = {area_id: AreaSetHistory(area_id=area_id, day=today) for area_id in Area.objects.values_list('pk', flat=True)}
+    for area_id, grade, date_set in Route.objects.filter(is_active=True).values_list('area_id', 'grade', 'date_set').iterator():
+        entry = entries[area_id]
+        entry.active_routes += 1
+        entry.grade_counts[grade] = entry.grade_counts.get(grade, 0) + 1
+        entry.oldest_set = min(entry.oldest_set or date_set, date_set)
+    AreaSetHistory.objects.bulk_create(entries.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0008_route_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AreaSetHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('active_routes', models.PositiveIntegerField(default=0)),
+                ('grade_counts', models.JSONField(default=dict)),
+                ('oldest_set', models.DateField(blank=True, null=True)),
+                ('routes_set', models.PositiveIntegerField(default=0)),
+                ('routes_archived', models.PositiveIntegerField(default=0)),
+                ('area', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='set_history', to='project.area')),
+            ],
+            options={
+                'verbose_name_plural': 'area set history',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='areasethistory',
+            constraint=models.UniqueConstraint(fields=('area', 'day'), name='unique_area_set_day'),
+        ),
+        migrations.RunPython(backfill_set_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.30 on 2026-10-17 18:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def backfill_archived_on(apps, schema_editor):
+    """
+    Date the routes archived so far. When they were archived was never
+    recorded, so take their last day in use: the later of the set date
+    and the last send.
+    """
+    Route = apps.get_model('project', 'Route')
+    routes = Route.objects.filter(is_active=False).annotate(last_send=models.Max('completions__date_completed'))
+    changed = []
+    for route in routes.only('pk', 'date_set').iterator():
+        route.archived_on = max(filter(None, [route.date_set, route.last_send]))
+        changed.append(route)
+    Route.objects.bulk_update(changed, ['archived_on'], batch_size=1000)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0009_area_set_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='route',
+            name='archived_on',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='ColdRoute',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(blank=True, max_length=100)),
+                ('grade', models.CharField(choices=[('VB', 'VB'), ('V0', 'V0'), ('V1', 'V1'), ('V2', 'V2'), ('V3', 'V3'), ('V4', 'V4'), ('V5', 'V5')], max_length=10)),
+                ('color', models.CharField(choices=[('red', 'Red'), ('blue', 'Blue'), ('green', 'Green'), ('yellow', 'Yellow'), ('orange', 'Orange'), ('purple', 'Purple'), ('pink', 'Pink'), ('black', 'Black')], max_length=20)),
+                ('date_set', models.DateField()),
+                ('setter_name', models.CharField(max_length=100)),
+                ('archived_on', models.DateField()),
+                ('frozen_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('send_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('first_send', models.DateField(blank=True, null=True)),
+                ('last_send', models.DateField(blank=True, null=True)),
+                ('area', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cold_routes', to='project.area')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ColdCompletion',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('date_completed', models.DateField()),
+                ('difficulty_rating', models.PositiveSmallIntegerField()),
+                ('notes', models.TextField(blank=True)),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cold_completions', to='project.member')),
+                ('route', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='completions', to='project.coldroute')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='coldroute',
+            index=models.Index(fields=['area', 'archived_on'], name='cold_route_area_archived_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='coldroute',
+            index=models.Index(fields=['archived_on'], name='cold_route_archived_idx'),
+        ),
+        migrations.RunPython(backfill_archived_on, migrations.RunPython.noop),
+    ]
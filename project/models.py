@@ -5,11 +5,30 @@ CS412 Final Project - Central Rock Gym Route Tracking System
 Basic models for the Central Rock Gym route tracking application.
 """
 
-from django.db import models
+from django.db import models, transaction
+from django.dispatch import Signal
 from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 
+# Sent by RouteQuerySet.set_active() with routes=[(pk, area_id), ...] and is_active,
+# because QuerySet.update() skips post_save.
+routes_status_changed = Signal()
+
+# Sent by RouteQuerySet.create_many() with routes=[(pk, area_id), ...],
+# because bulk_create() skips post_save.
+routes_bulk_created = Signal()
+
+# Sent by project.cold_storage with routes=[(pk, area_id), ...] after moving
+# archived routes out of the Route table without deleting them one by one.
+routes_frozen = Signal()
+
+# Sent by CompletionQuerySet.create_many() with the created completions,
+# because bulk_create() skips post_save.
+completions_bulk_created = Signal()
+
+
 class Member(models.Model):
     """
     Represents a gym member.
@@ -24,6 +43,13 @@ class Member(models.Model):
     email = models.EmailField()
     is_admin = models.BooleanField(default=False)
     date_joined = models.DateField(auto_now_add=True)
+    send_count = models.PositiveIntegerField(default=0, editable=False)  # Maintained by project.counters
+    
+    class Meta:
+        indexes = [
+            # Member lists are always sorted by name
+            models.Index(fields=['first_name', 'last_name'], name='member_name_idx'),
+        ]
     
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
@@ -41,6 +67,7 @@ class Area(models.Model):
     """
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
+    send_count = models.PositiveIntegerField(default=0, editable=False)  # Maintained by project.counters
     
     def __str__(self):
         return self.name
@@ -49,6 +76,32 @@ class Area(models.Model):
         return reverse('project:area_detail', kwargs={'pk': self.pk})
 
 
+class RouteQuerySet(models.QuerySet):
+    """QuerySet for routes with a bulk archive/restore that notifies listeners."""
+    
+    def set_active(self, is_active):
+        """
+        Archive (False) or restore (True) every route in the queryset whose
+        status differs, in one UPDATE. Returns the number of routes changed.
+        """
+        with transaction.atomic():
+            changing = self.exclude(is_active=is_active)
+            routes = list(changing.values_list('pk', 'area_id'))
+            if routes:
+                self.model.objects.filter(pk__in=[pk for pk, area_id in routes]).update(
+                    is_active=is_active, archived_on=None if is_active else timezone.localdate()
+                )
+                routes_status_changed.send(sender=self.model, routes=routes, is_active=is_active)
+        return len(routes)
+    
+    def create_many(self, routes, batch_size=None):
+        """bulk_create() the given unsaved routes and notify listeners."""
+        created = self.bulk_create(routes, batch_size=batch_size)
+        if created:
+            routes_bulk_created.send(sender=self.model, routes=[(route.pk, route.area_id) for route in created])
+        return created
+
+
 class Route(models.Model):
     """
     Represents a climbing route within a specific area.
@@ -85,18 +138,57 @@ class Route(models.Model):
     area = models.ForeignKey(Area, on_delete=models.CASCADE, related_name='routes')
     setter_name = models.CharField(max_length=100)
     is_active = models.BooleanField(default=True)
+    archived_on = models.DateField(null=True, blank=True, editable=False)  # Moved to cold storage once old enough
+    send_count = models.PositiveIntegerField(default=0, editable=False)  # Maintained by project.counters
+    
+    objects = RouteQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            # Active/archived route lists, newest first
+            models.Index(fields=['is_active', 'date_set'], name='route_active_date_idx'),
+            # Routes of one area (area detail, archive by area)
+            models.Index(fields=['area', 'is_active', 'date_set'], name='route_area_active_date_idx'),
+            # Unfiltered route management list
+            models.Index(fields=['date_set'], name='route_date_set_idx'),
+            # Route pickers sorted by name
+            models.Index(fields=['name'], name='route_name_idx'),
+        ]
     
     def __str__(self):
         if self.name:
             return f"{self.name} ({self.grade})"
         return f"{self.color.title()} {self.grade}"
     
+    def save(self, *args, **kwargs):
+        """Date the archiving, which starts the route's way to cold storage."""
+        if self.is_active:
+            self.archived_on = None
+        elif self.archived_on is None:
+            self.archived_on = timezone.localdate()
+        super().save(*args, **kwargs)
+    
     def get_absolute_url(self):
         return reverse('project:route_detail', kwargs={'pk': self.pk})
     
     def completion_count(self):
         """Returns the number of times this route has been completed."""
-        return self.completions.count()
+        return self.send_count
+
+
+class CompletionQuerySet(models.QuerySet):
+    
+    def create_many(self, completions):
+        """
+        bulk_create() the given unsaved completions and notify listeners, in
+        one transaction. Load each completion's route first: the listeners
+        read its grade and area.
+        """
+        with transaction.atomic():
+            created = self.bulk_create(completions)
+            if created:
+                completions_bulk_created.send(sender=self.model, completions=created)
+        return created
 
 
 class Completion(models.Model):
@@ -113,11 +205,241 @@ class Completion(models.Model):
     difficulty_rating = models.IntegerField(choices=[(i, str(i)) for i in range(1, 6)])
     notes = models.TextField(blank=True)
     
+    objects = CompletionQuerySet.as_manager()
+    
     class Meta:
         unique_together = ['member', 'route']  # Prevent duplicate completions
+        indexes = [
+            # Recent completions and date range filters
+            models.Index(fields=['date_completed'], name='completion_date_idx'),
+            # Recent completions of one route
+            models.Index(fields=['route', 'date_completed'], name='completion_route_date_idx'),
+            # Recent completions of one member (profile)
+            models.Index(fields=['member', 'date_completed'], name='completion_member_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.member} - {self.route}"
     
+    def save(self, *args, **kwargs):
+        """Save inside a transaction so the send counters update with the row."""
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
     def get_absolute_url(self):
-        return reverse('project:route_detail', kwargs={'pk': self.route.pk})
\ No newline at end of file
+        return reverse('project:route_detail', kwargs={'pk': self.route.pk})
+
+class ColdRoute(models.Model):
+    """
+    A route moved to cold storage by project.cold_storage, long after it was
+    archived: the route's fields under its original id, plus totals of its
+    sends so listing it never reads them. The sends themselves are kept as
+    ColdCompletion rows; restoring the route moves both back.
+    """
+    id = models.BigIntegerField(primary_key=True)  # The route's id, reused when it is restored
+    area = models.ForeignKey(Area, on_delete=models.CASCADE, related_name='cold_routes')
+    name = models.CharField(max_length=100, blank=True)
+    grade = models.CharField(max_length=10, choices=Route.GRADE_CHOICES)
+    color = models.CharField(max_length=20, choices=Route.COLOR_CHOICES)
+    date_set = models.DateField()
+    setter_name = models.CharField(max_length=100)
+    archived_on = models.DateField()
+    frozen_at = models.DateTimeField(default=timezone.now)
+    send_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    first_send = models.DateField(null=True, blank=True)
+    last_send = models.DateField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            # Cold storage listing on the archived routes page, newest first
+            models.Index(fields=['area', 'archived_on'], name='cold_route_area_archived_idx'),
+            models.Index(fields=['archived_on'], name='cold_route_archived_idx'),
+        ]
+    
+    def __str__(self):
+        if self.name:
+            return f"{self.name} ({self.grade})"
+        return f"{self.color.title()} {self.grade}"
+    
+    @property
+    def average_rating(self):
+        return self.rating_sum / self.send_count if self.send_count else None
+
+
+class ColdCompletion(models.Model):
+    """
+    A send of a route in cold storage. Only the foreign key indexes remain:
+    restoring reads a route's sends, rebuilding totals reads a member's.
+    """
+    id = models.BigIntegerField(primary_key=True)  # The completion's id, reused when it is restored
+    member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='cold_completions')
+    route = models.ForeignKey(ColdRoute, on_delete=models.CASCADE, related_name='completions')
+    date_completed = models.DateField()
+    difficulty_rating = models.PositiveSmallIntegerField()
+    notes = models.TextField(blank=True)
+    
+    def __str__(self):
+        return f"{self.member} - {self.route}"
+
+
+class MemberStats(models.Model):
+    """
+    Precomputed climbing statistics for one member.
+    Kept up to date by project.stats whenever a completion is logged or removed,
+    so the profile page reads one row instead of aggregating completions.
+    """
+    member = models.OneToOneField(Member, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    first_send = models.DateField(null=True, blank=True)
+    last_send = models.DateField(null=True, blank=True)
+    grade_counts = models.JSONField(default=dict)  # {grade: sends}
+    area_counts = models.JSONField(default=dict)  # {area id: sends}
+    daily_sends = models.JSONField(default=dict)  # {ISO date: sends}, recent days only
+    
+    class Meta:
+        verbose_name_plural = 'member stats'
+    
+    def __str__(self):
+        return f"Stats for {self.member}"
+
+
+class RouteStats(models.Model):
+    """
+    Popularity and difficulty figures for one route, computed in one batch
+    for every route by the compute_route_stats command (see project.analytics).
+    """
+    SOFT = 'soft'
+    HARD = 'hard'
+    GRADE_FEEL_CHOICES = [
+        (SOFT, 'Soft for the grade'),
+        (HARD, 'Hard for the grade'),
+    ]
+    
+    route = models.OneToOneField(Route, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    sends = models.PositiveIntegerField(default=0)
+    sends_per_day = models.FloatField(default=0)  # Since date_set (until the last send, once archived)
+    rating_mean = models.FloatField(null=True, blank=True)  # Mean difficulty_rating
+    rating_variance = models.FloatField(null=True, blank=True)  # Population variance of difficulty_rating
+    grade_feel = models.CharField(max_length=4, choices=GRADE_FEEL_CHOICES, blank=True)
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        verbose_name_plural = 'route stats'
+    
+    def __str__(self):
+        return f"Stats for {self.route}"
+    
+    @property
+    def rating_stdev(self):
+        return self.rating_variance ** 0.5 if self.rating_variance is not None else None
+
+
+class AreaSetHistory(models.Model):
+    """
+    An area's active routes at the end of one day. Kept up to date by
+    project.set_history whenever routes are set, archived, restored, edited
+    or deleted; a day without changes has no row, so the state of the
+    latest earlier row carries forward.
+    """
+    area = models.ForeignKey(Area, on_delete=models.CASCADE, related_name='set_history')
+    day = models.DateField()
+    active_routes = models.PositiveIntegerField(default=0)
+    grade_counts = models.JSONField(default=dict)  # {grade: active routes}
+    oldest_set = models.DateField(null=True, blank=True)  # date_set of the oldest active route
+    routes_set = models.PositiveIntegerField(default=0)  # Routes set or restored that day
+    routes_archived = models.PositiveIntegerField(default=0)  # Routes archived or deleted that day
+    
+    class Meta:
+        verbose_name_plural = 'area set history'
+        constraints = [
+            # Also the index for an area's series and its latest row
+            models.UniqueConstraint(fields=['area', 'day'], name='unique_area_set_day'),
+        ]
+    
+    def __str__(self):
+        return f"{self.area} on {self.day}: {self.active_routes} active"
+
+
+class DashboardSnapshot(models.Model):
+    """
+    Gym-wide totals materialized by the rollup_dashboard command.
+    The dashboards read the latest snapshot instead of counting every table.
+    """
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    total_areas = models.PositiveIntegerField()
+    total_routes = models.PositiveIntegerField()
+    active_routes = models.PositiveIntegerField()
+    archived_routes = models.PositiveIntegerField()
+    total_members = models.PositiveIntegerField()
+    total_completions = models.PositiveIntegerField()
+    
+    class Meta:
+        get_latest_by = 'created_at'
+    
+    def __str__(self):
+        return f"Dashboard snapshot {self.created_at:%Y-%m-%d %H:%M}"
+
+
+class RollupBucket(models.Model):
+    """
+    One time bucket of a materialized activity series.
+    Written by the rollup_dashboard command; area is only set for per-area series.
+    """
+    SENDS_PER_DAY = 'sends_per_day'
+    ROUTES_SET_PER_WEEK = 'routes_set_per_week'
+    ACTIVE_MEMBERS_PER_MONTH = 'active_members_per_month'
+    SERIES_CHOICES = [
+        (SENDS_PER_DAY, 'Sends per day per area'),
+        (ROUTES_SET_PER_WEEK, 'Routes set per week'),
+        (ACTIVE_MEMBERS_PER_MONTH, 'Active members per month'),
+    ]
+    
+    series = models.CharField(max_length=30, choices=SERIES_CHOICES)
+    bucket = models.DateField()  # First day of the day/week/month
+    area = models.ForeignKey(Area, on_delete=models.CASCADE, null=True, blank=True, related_name='rollups')
+    value = models.PositiveIntegerField()
+    
+    class Meta:
+        unique_together = ['series', 'bucket', 'area']
+        indexes = [
+            models.Index(fields=['series', 'bucket'], name='rollup_series_bucket_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_series_display()} {self.bucket}: {self.value}"
+
+
+class LeaderboardEntry(models.Model):
+    """
+    One member's standing for one period in one scope (the whole gym or an area).
+    Kept up to date by project.leaderboards whenever a completion is logged or
+    removed, so leaderboards read an index instead of grouping completions.
+    """
+    ALL_TIME = 'all'
+    GYM = 0
+    
+    member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    period = models.CharField(max_length=7)  # ALL_TIME or a month, 'YYYY-MM'
+    scope = models.PositiveIntegerField(default=GYM)  # GYM, or the area id
+    sends = models.PositiveIntegerField(default=0)
+    points = models.PositiveIntegerField(default=0)
+    top_grade = models.PositiveSmallIntegerField(default=0)  # 1 + index in the grade order
+    
+    class Meta:
+        verbose_name_plural = 'leaderboard entries'
+        constraints = [
+            models.UniqueConstraint(fields=['member', 'period', 'scope'], name='unique_leaderboard_entry'),
+        ]
+        indexes = [
+            # One index per board, in the board's ranking order
+            models.Index(fields=['period', 'scope', '-sends', 'member'], name='leaderboard_sends_idx'),
+            models.Index(fields=['period', 'scope', '-points', 'member'], name='leaderboard_points_idx'),
+            models.Index(fields=['period', 'scope', '-top_grade', '-points', 'member'], name='leaderboard_grade_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.member} {self.period}/{self.scope}: {self.sends} sends"
+    
+    @property
+    def hardest_grade(self):
+        return Route.GRADE_CHOICES[self.top_grade - 1][0] if self.top_grade else None
@@ -0,0 +1,192 @@
+"""
+project/pagination.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Keyset (cursor) pagination for the list views.
+Instead of OFFSET paging, each page starts right after the ordering key of
+the last row shown, so deep pages cost the same as the first one.
+"""
+
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+CURSOR_SALT = 'project.pagination'
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset on a unique ordering, e.g. ('-date_completed', '-id').
+    The last ordering field must be unique so every row has a distinct key.
+    With count_limit set, counting stops after that many rows and the count
+    is reported as approximate ("1000+") instead of scanning the whole set.
+    """
+
+    def __init__(self, queryset, ordering, per_page, count_limit=None):
+        self.queryset = queryset
+        self.ordering = list(ordering)
+        self.per_page = per_page
+        self.count_limit = count_limit
+        self.fields = [
+            queryset.model._meta.get_field(name.lstrip('-')) for name in self.ordering
+        ]
+
+    @cached_property
+    def _counted(self):
+        if self.count_limit is None:
+            return self.queryset.count()
+        return self.queryset.order_by()[:self.count_limit + 1].count()
+
+    @property
+    def count(self):
+        """Total number of rows, capped at count_limit when one is set."""
+        if self.count_limit is None:
+            return self._counted
+        return min(self._counted, self.count_limit)
+
+    @property
+    def count_is_approximate(self):
+        """True when there are more than count_limit rows."""
+        return self.count_limit is not None and self._counted > self.count_limit
+
+    def encode_cursor(self, direction, obj):
+        """
+        Build an opaque cursor pointing just past obj in the given direction.
+        obj may be a model instance or a values() dict holding the ordering fields.
+        """
+        key = []
+        for field in self.fields:
+            value = obj[field.attname] if isinstance(obj, dict) else getattr(obj, field.attname)
+            key.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return signing.dumps([direction] + key, salt=CURSOR_SALT, compress=True)
+
+    def decode_cursor(self, cursor):
+        """Return (direction, key) for a cursor, or None if it is missing or invalid."""
+        if not cursor:
+            return None
+        try:
+            direction, *raw_key = signing.loads(cursor, salt=CURSOR_SALT)
+            if direction not in ('next', 'prev') or len(raw_key) != len(self.fields):
+                return None
+            key = [field.to_python(value) for field, value in zip(self.fields, raw_key)]
+        except (signing.BadSignature, ValidationError, TypeError, ValueError):
+            return None
+        return direction, key
+
+    def _seek(self, key, forward):
+        """
+        Filter for rows strictly after (forward) or before key in the ordering.
+        The first field gets an inclusive range bound so the index can seek to it.
+        """
+        names = [name.lstrip('-') for name in self.ordering]
+        condition = Q()
+        for i, name in enumerate(names):
+            descending = self.ordering[i].startswith('-')
+            lookup = 'lt' if descending == forward else 'gt'
+            step = Q(**{f'{name}__{lookup}': key[i]})
+            for prev_name, prev_value in zip(names[:i], key[:i]):
+                step &= Q(**{prev_name: prev_value})
+            condition |= step
+        first_lookup = 'lte' if self.ordering[0].startswith('-') == forward else 'gte'
+        return Q(**{f'{names[0]}__{first_lookup}': key[0]}) & condition
+
+    def get_page(self, cursor=None):
+        """Return the page a cursor points to; an invalid cursor gives the first page."""
+        decoded = self.decode_cursor(cursor)
+        queryset = self.queryset.order_by(*self.ordering)
+
+        if decoded is None:
+            rows = list(queryset[:self.per_page + 1])
+            has_next, has_previous = len(rows) > self.per_page, False
+            rows = rows[:self.per_page]
+        elif decoded[0] == 'next':
+            rows = list(queryset.filter(self._seek(decoded[1], forward=True))[:self.per_page + 1])
+            has_next, has_previous = len(rows) > self.per_page, True
+            rows = rows[:self.per_page]
+        else:
+            reverse = [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering]
+            rows = list(
+                self.queryset.order_by(*reverse).filter(self._seek(decoded[1], forward=False))[:self.per_page + 1]
+            )
+            has_next, has_previous = True, len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+
+        return KeysetPage(rows, self, has_next and bool(rows), has_previous and bool(rows))
+
+
+class KeysetPage:
+    """One page of rows plus the cursors to its neighbours."""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.first_url = None
+        self.next_url = None
+        self.previous_url = None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @cached_property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self.paginator.encode_cursor('next', self.object_list[-1])
+
+    @cached_property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return self.paginator.encode_cursor('prev', self.object_list[0])
+
+    def link_to(self, request, cursor):
+        """Query string for the current request with only the cursor replaced."""
+        params = request.GET.copy()
+        params.pop('cursor', None)
+        if cursor:
+            params['cursor'] = cursor
+        return '?' + params.urlencode()
+
+
+def paginate(request, queryset, ordering, per_page, count_limit=None):
+    """
+    Paginate queryset for a function-based view.
+    Reads the cursor from ?cursor= and fills in the first/next/previous links.
+    """
+    paginator = KeysetPaginator(queryset, ordering, per_page, count_limit=count_limit)
+    page = paginator.get_page(request.GET.get('cursor'))
+    page.first_url = page.link_to(request, None)
+    page.next_url = page.link_to(request, page.next_cursor) if page.has_next() else None
+    page.previous_url = page.link_to(request, page.previous_cursor) if page.has_previous() else None
+    return page
+
+
+class KeysetPaginationMixin:
+    """
+    ListView mixin that swaps Django's OFFSET Paginator for keyset paging.
+    Set keyset_ordering and paginate_by on the view.
+    """
+    keyset_ordering = ('-id',)
+    count_limit = None
+
+    def paginate_queryset(self, queryset, page_size):
+        page = paginate(self.request, queryset, self.keyset_ordering, page_size, self.count_limit)
+        return page.paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,236 @@
+"""
+project/recommendations.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+"Routes for you": unsent active routes near a member's working grade, in
+the areas they climb.
+Two cached structures make a recommendation a pure in-memory lookup:
+- the route pool, every active route bucketed by (grade, area), newest
+  first, cached under POOL_SCOPE (bumped by project.signals when routes
+  are set, archived, edited or deleted);
+- one profile per member: sends and difficulty ratings per grade, sends
+  per area, the ids of sent routes as a sorted array (checked with bisect)
+  and the ranked candidate route ids.
+When a member logs a send, the signal updates their cached profile in
+place; the candidates are only re-ranked when the route pool changed or
+the member's working grade moved.
+"""
+
+from bisect import bisect_left
+from django.core.cache import cache
+from .caching import get_version, bump_version
+from .models import Route, Completion, ColdCompletion
+from .stats import GRADE_ORDER
+
+POOL_SCOPE = 'recommendation-pool'
+PROFILE_PREFIX = 'recommendations'
+CACHE_TIMEOUT = 60 * 60 * 24
+
+# Candidate route ids kept per member, and routes shown on a page
+CANDIDATE_LIMIT = 50
+DEFAULT_COUNT = 5
+
+# Sends at a grade before it counts as the member's working grade
+WORKING_GRADE_SENDS = 2
+
+# Average difficulty rating (1-5) at the working grade that means "ready for the next grade"
+EASY_RATING = 2.0
+
+# Grades either side of the target grade that are still suggested
+GRADE_WINDOW = 1
+
+
+def _pool_key():
+    return f'{POOL_SCOPE}:{get_version(POOL_SCOPE)}'
+
+
+def _build_pool():
+    """
+    {'routes': {id: (label, grade, area id, color)},
+     'buckets': {(grade index, area id): [ids, newest first]}}
+    """
+    routes = {}
+    buckets = {}
+    rows = Route.objects.filter(is_active=True).order_by('-date_set', '-id').values_list(
+        'id', 'name', 'grade', 'color', 'area_id'
+    )
+    for pk, name, grade, color, area_id in rows:
+        if grade not in GRADE_ORDER:
+            continue
+        label = f'{name} ({grade})' if name else f'{color.title()} {grade}'
+        routes[pk] = (label, grade, area_id, color)
+        buckets.setdefault((GRADE_ORDER.index(grade), area_id), []).append(pk)
+    return {'routes': routes, 'buckets': buckets}
+
+
+def get_pool():
+    key = _pool_key()
+    pool = cache.get(key)
+    if pool is None:
+        pool = _build_pool()
+        cache.set(key, pool, CACHE_TIMEOUT)
+    return pool
+
+
+def invalidate_pool():
+    bump_version(POOL_SCOPE)
+
+
+def _profile_key(member_id):
+    return f'{PROFILE_PREFIX}:{member_id}'
+
+
+def _empty_profile():
+    return {
+        'grades': {},  # {grade index: [sends, sum of difficulty ratings]}
+        'areas': {},  # {area id: sends}
+        'sent': [],  # Sorted ids of sent routes
+        'pool': None,  # Pool key the candidates were ranked against
+        'target': None,  # Grade index the candidates were ranked around
+        'candidates': [],
+    }
+
+
+def _add_send(profile, route_id, grade, area_id, rating):
+    index = GRADE_ORDER.index(grade) if grade in GRADE_ORDER else None
+    if index is not None:
+        sends, ratings = profile['grades'].get(index, [0, 0])
+        profile['grades'][index] = [sends + 1, ratings + rating]
+    profile['areas'][area_id] = profile['areas'].get(area_id, 0) + 1
+    position = bisect_left(profile['sent'], route_id)
+    if position == len(profile['sent']) or profile['sent'][position] != route_id:
+        profile['sent'].insert(position, route_id)
+
+
+def _build_profile(member_id):
+    profile = _empty_profile()
+    # Sends in cold storage still tell the member's grade
+    fields = ['route_id', 'route__grade', 'route__area_id', 'difficulty_rating']
+    rows = Completion.objects.filter(member_id=member_id).values_list(*fields).union(
+        ColdCompletion.objects.filter(member_id=member_id).values_list(*fields), all=True
+    )
+    for route_id, grade, area_id, rating in rows:
+        _add_send(profile, route_id, grade, area_id, rating)
+    return profile
+
+
+def has_sent(profile, route_id):
+    """Binary search of the sorted sent route ids."""
+    position = bisect_left(profile['sent'], route_id)
+    return position < len(profile['sent']) and profile['sent'][position] == route_id
+
+
+def target_grade(profile):
+    """
+    Grade index to suggest around. The working grade is the hardest grade
+    with WORKING_GRADE_SENDS sends (or the hardest sent); one grade harder
+    once its sends were rated easy on average. New members start at the bottom.
+    """
+    grades = profile['grades']
+    if not grades:
+        return 0
+    established = [index for index, (sends, ratings) in grades.items() if sends >= WORKING_GRADE_SENDS]
+    working = max(established or grades)
+    sends, ratings = grades[working]
+    if ratings / sends <= EASY_RATING:
+        return min(working + 1, len(GRADE_ORDER) - 1)
+    return working
+
+
+def rank_candidates(profile, pool, target):
+    """
+    Unsent routes within GRADE_WINDOW of target, closest grade first, then
+    the member's most-climbed areas, then newest. Areas the member never
+    climbed are only used when no climbed area has a route in the window.
+    """
+    areas = profile['areas']
+    pool_areas = {area_id for grade, area_id in pool['buckets']}
+    climbed = [area_id for area_id in pool_areas if area_id in areas]
+    low = max(target - GRADE_WINDOW, 0)
+    high = min(target + GRADE_WINDOW, len(GRADE_ORDER) - 1)
+    grades = sorted(range(low, high + 1), key=lambda index: (abs(index - target), -index))
+
+    for area_ids in (climbed, sorted(pool_areas - set(climbed))):
+        area_ids = sorted(area_ids, key=lambda area_id: -areas.get(area_id, 0))
+        candidates = []
+        for grade in grades:
+            for area_id in area_ids:
+                for route_id in pool['buckets'].get((grade, area_id), []):
+                    if not has_sent(profile, route_id):
+                        candidates.append(route_id)
+                        if len(candidates) >= CANDIDATE_LIMIT:
+                            return candidates
+        if candidates:
+            return candidates
+    return []
+
+
+def get_profile(member_id):
+    """The member's cached profile with its candidates ranked against the current pool."""
+    key = _profile_key(member_id)
+    profile = cache.get(key)
+    if profile is None:
+        profile = _build_profile(member_id)
+    pool_key = _pool_key()
+    target = target_grade(profile)
+    if profile['pool'] != pool_key or profile['target'] != target:
+        profile['candidates'] = rank_candidates(profile, get_pool(), target)
+        profile['pool'] = pool_key
+        profile['target'] = target
+        cache.set(key, profile, CACHE_TIMEOUT)
+    return profile
+
+
+def for_member(member, count=DEFAULT_COUNT, exclude=()):
+    """
+    Up to `count` recommended routes as dicts with id, label, grade, color
+    and area_id. Costs no queries once the pool and profile are cached.
+    """
+    if member is None:
+        return []
+    profile = get_profile(member.pk)
+    routes = get_pool()['routes']
+    suggestions = []
+    for route_id in profile['candidates']:
+        if route_id in exclude or route_id not in routes:
+            continue
+        label, grade, area_id, color = routes[route_id]
+        suggestions.append({'id': route_id, 'label': label, 'grade': grade, 'color': color, 'area_id': area_id})
+        if len(suggestions) >= count:
+            break
+    return suggestions
+
+
+def _route_of(completion):
+    """(grade, area id) of the completion's route, from the loaded route or the pool if possible."""
+    if Completion.route.is_cached(completion):
+        return completion.route.grade, completion.route.area_id
+    route = get_pool()['routes'].get(completion.route_id)
+    if route is not None:
+        return route[1], route[2]
+    return Route.objects.filter(pk=completion.route_id).values_list('grade', 'area_id').first()
+
+
+def record_send(completion):
+    """
+    Apply a newly logged completion to the member's cached profile, if
+    any: the route leaves their candidates, and a change of working grade
+    (or running short of candidates) has them re-ranked on the next read.
+    """
+    key = _profile_key(completion.member_id)
+    profile = cache.get(key)
+    if profile is None:
+        return
+    route = _route_of(completion)
+    if route is None:
+        return
+    _add_send(profile, completion.route_id, *route, completion.difficulty_rating)
+    profile['candidates'] = [pk for pk in profile['candidates'] if pk != completion.route_id]
+    if len(profile['candidates']) < DEFAULT_COUNT:
+        profile['pool'] = None
+    cache.set(key, profile, CACHE_TIMEOUT)
+
+
+def forget_member(member_id):
+    """Drop a member's profile (after a send was removed); it is rebuilt on the next read."""
+    cache.delete(_profile_key(member_id))
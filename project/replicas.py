@@ -0,0 +1,211 @@
+"""
+project/replicas.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Read-replica routing for the admin reporting and export views.
+Views wrapped in reads_from_replica (or CBVs with ReplicaReadMixin) run
+their reads against the "replica" database alias; everything else, and
+every write, stays on the primary. A view only reads from the replica when:
+- the request is a GET or HEAD;
+- the replica's snapshot is younger than settings.REPLICA_MAX_LAG;
+- the user has not written since the snapshot was taken (read-your-writes:
+  ReplicaPinMiddleware notes when each user last sent a write request).
+Locally the replica is a second SQLite file refreshed by the
+snapshot_replica command; a live replica of another database engine is
+treated as always current.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA = 'replica'
+
+# Apps whose models may be read from the replica; sessions and the like stay on the primary
+REPLICA_APPS = {'project', 'auth'}
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+PIN_PREFIX = 'replica-pin'
+
+# Database alias the current request reads from, when not the primary
+_read_alias = ContextVar('replica_read_alias', default=None)
+
+
+def configured():
+    return REPLICA in settings.DATABASES
+
+
+def stamp_path():
+    """File whose modification time is the start of the replica's last snapshot."""
+    return f"{settings.DATABASES[REPLICA]['NAME']}.stamp"
+
+
+def snapshot_time():
+    """When the replica's data was last copied from the primary, or None before the first snapshot."""
+    if settings.DATABASES[REPLICA]['ENGINE'] != 'django.db.backends.sqlite3':
+        return time.time()
+    try:
+        return os.path.getmtime(stamp_path())
+    except OSError:
+        return None
+
+
+def mark_snapshot(taken):
+    """Record a snapshot that started at `taken` (seconds since the epoch)."""
+    path = stamp_path()
+    with open(path, 'a'):
+        pass
+    os.utime(path, (taken, taken))
+
+
+def _pin_key(user_id):
+    return f'{PIN_PREFIX}:{user_id}'
+
+
+def pin_to_primary(user):
+    """Note that the user just wrote, so their reads skip any replica snapshot older than now."""
+    cache.set(_pin_key(user.pk), time.time(), settings.REPLICA_MAX_LAG)
+
+
+def replica_for(request):
+    """REPLICA when this request may read from it, otherwise None."""
+    if not configured() or request.method not in SAFE_METHODS:
+        return None
+    taken = snapshot_time()
+    if taken is None or time.time() - taken > settings.REPLICA_MAX_LAG:
+        return None
+    if request.user.is_authenticated:
+        written = cache.get(_pin_key(request.user.pk))
+        if written is not None and written >= taken:
+            return None
+    return REPLICA
+
+
+@contextmanager
+def on_primary():
+    """
+    Read from the primary inside a replica view. For data written to a
+    shared cache: built from a lagging replica, it would be served to
+    every reader under the current version.
+    """
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def _streamed_from(alias, chunks):
+    """Yield chunks, producing each one with reads routed to alias."""
+    chunks = iter(chunks)
+    while True:
+        token = _read_alias.set(alias)
+        try:
+            chunk = next(chunks, None)
+        finally:
+            _read_alias.reset(token)
+        if chunk is None:
+            return
+        yield chunk
+
+
+async def _astreamed_from(alias, chunks):
+    """_streamed_from() for the async iterator an ASGI response streams."""
+    while True:
+        token = _read_alias.set(alias)
+        try:
+            chunk = await anext(chunks, None)
+        finally:
+            _read_alias.reset(token)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def _read_from(alias, view, request, *args, **kwargs):
+    token = _read_alias.set(alias)
+    try:
+        response = view(request, *args, **kwargs)
+    finally:
+        _read_alias.reset(token)
+    if response.streaming:
+        # Streamed bodies are produced after the view returns
+        streamed_from = _astreamed_from if response.is_async else _streamed_from
+        response.streaming_content = streamed_from(alias, response.streaming_content)
+    return response
+
+
+def reads_from_replica(view):
+    """Run a read-only reporting view's queries against the replica when it is current enough."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        alias = replica_for(request)
+        if alias is None:
+            return view(request, *args, **kwargs)
+        return _read_from(alias, view, request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaReadMixin:
+    """reads_from_replica for class-based views."""
+
+    def dispatch(self, request, *args, **kwargs):
+        alias = replica_for(request)
+        if alias is None:
+            return super().dispatch(request, *args, **kwargs)
+        return _read_from(alias, super().dispatch, request, *args, **kwargs)
+
+
+class ReplicaRouter:
+    """Reads inside a replica view go to the replica; writes always go to the primary."""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in REPLICA_APPS:
+            return _read_alias.get()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # The replica holds the same rows as the primary
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema with its data, from the primary
+        return False if db == REPLICA else None
+
+
+class ReplicaPinMiddleware:
+    """Pin users to the primary after they send a write request. Goes after AuthenticationMiddleware."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        self.pin(request)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if request.method not in SAFE_METHODS:
+            await sync_to_async(self.pin)(request)
+        return response
+
+    def pin(self, request):
+        # After the response, so the pin is later than the write's commit
+        if request.method not in SAFE_METHODS and configured() and request.user.is_authenticated:
+            pin_to_primary(request.user)
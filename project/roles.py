@@ -0,0 +1,77 @@
+"""
+project/roles.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Resolve the logged-in user's Member row and admin role once per request.
+MemberBackend loads the member together with the user in one query, and
+GymRoleMiddleware exposes the result as request.member and
+request.is_gym_admin, so permission checks, views and templates share it.
+Under ASGI the lookup runs in a worker thread before the view, so async
+views can read request.user, request.member and request.is_gym_admin
+without touching the database.
+"""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from .models import Member
+
+
+def member_of(user):
+    """
+    The user's Member, or None. A missing member is cached on the user too,
+    so repeated checks never query again.
+    """
+    if not user.is_authenticated:
+        return None
+    try:
+        return user.member
+    except Member.DoesNotExist:
+        User.member.related.set_cached_value(user, None)
+        return None
+
+
+def is_gym_admin(user):
+    """Staff users and members flagged is_admin."""
+    if not user.is_authenticated:
+        return False
+    if user.is_staff:
+        return True
+    member = member_of(user)
+    return member is not None and member.is_admin
+
+
+class MemberBackend(ModelBackend):
+    """ModelBackend that loads the user's member in the same query as the user."""
+
+    def get_user(self, user_id):
+        try:
+            user = User._default_manager.select_related('member').get(pk=user_id)
+        except User.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+
+class GymRoleMiddleware:
+    """Set request.member and request.is_gym_admin. Goes after AuthenticationMiddleware."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self.resolve(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        await sync_to_async(self.resolve)(request)
+        return await self.get_response(request)
+
+    def resolve(self, request):
+        request.member = member_of(request.user)
+        request.is_gym_admin = is_gym_admin(request.user)
@@ -0,0 +1,152 @@
+"""
+project/rollups.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Dashboard snapshot and time-bucketed activity series.
+The rollup_dashboard command writes these tables; home_view and
+admin_dashboard_view read the latest snapshot while it is fresh enough.
+The a-prefixed functions are the same reads for async views.
+"""
+
+import asyncio
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+from .models import Member, Area, Route, Completion, DashboardSnapshot, RollupBucket
+
+# Days of history re-aggregated by an incremental rollup
+DEFAULT_ROLLUP_DAYS = 62
+
+# Totals stored on DashboardSnapshot
+SNAPSHOT_FIELDS = [
+    'total_areas', 'total_routes', 'active_routes',
+    'archived_routes', 'total_members', 'total_completions',
+]
+
+
+def _count_querysets():
+    """The queryset behind each dashboard total."""
+    return {
+        'total_areas': Area.objects.all(),
+        'total_routes': Route.objects.all(),
+        'active_routes': Route.objects.filter(is_active=True),
+        'archived_routes': Route.objects.filter(is_active=False),
+        'total_members': Member.objects.all(),
+        'total_completions': Completion.objects.all(),
+    }
+
+
+def live_counts():
+    """Count every dashboard total straight from the tables."""
+    return {field: queryset.count() for field, queryset in _count_querysets().items()}
+
+
+async def alive_counts():
+    """live_counts() with the counts awaited together."""
+    querysets = _count_querysets()
+    counts = await asyncio.gather(*(queryset.acount() for queryset in querysets.values()))
+    return dict(zip(querysets, counts))
+
+
+def take_snapshot():
+    """Materialize the current totals as a new DashboardSnapshot."""
+    return DashboardSnapshot.objects.create(**live_counts())
+
+
+def _fresh_snapshots():
+    """Snapshots younger than settings.DASHBOARD_SNAPSHOT_MAX_AGE seconds, newest first."""
+    max_age = timedelta(seconds=getattr(settings, 'DASHBOARD_SNAPSHOT_MAX_AGE', 15 * 60))
+    return DashboardSnapshot.objects.filter(
+        created_at__gte=timezone.now() - max_age
+    ).order_by('-created_at')
+
+
+def dashboard_counts():
+    """
+    Dashboard totals from the latest snapshot, or live counts when the
+    snapshot is older than settings.DASHBOARD_SNAPSHOT_MAX_AGE seconds.
+    """
+    snapshot = _fresh_snapshots().first()
+    if snapshot is None:
+        return live_counts()
+    return {field: getattr(snapshot, field) for field in SNAPSHOT_FIELDS}
+
+
+async def adashboard_counts():
+    """dashboard_counts() for async views."""
+    snapshot = await _fresh_snapshots().afirst()
+    if snapshot is None:
+        return await alive_counts()
+    return {field: getattr(snapshot, field) for field in SNAPSHOT_FIELDS}
+
+
+def _series_rows(since):
+    """Yield (series, bucket, area_id, value) for every bucket starting on or after since."""
+    day_start = since
+    week_start = since - timedelta(days=since.weekday())
+    month_start = since.replace(day=1)
+
+    sends = Completion.objects.filter(date_completed__gte=day_start).values(
+        'date_completed', 'route__area_id'
+    ).annotate(total=Count('id')).order_by()
+    for row in sends:
+        yield RollupBucket.SENDS_PER_DAY, row['date_completed'], row['route__area_id'], row['total']
+
+    routes_set = Route.objects.filter(date_set__gte=week_start).annotate(
+        week=TruncWeek('date_set')
+    ).values('week').annotate(total=Count('id')).order_by()
+    for row in routes_set:
+        yield RollupBucket.ROUTES_SET_PER_WEEK, row['week'], None, row['total']
+
+    active_members = Completion.objects.filter(date_completed__gte=month_start).annotate(
+        month=TruncMonth('date_completed')
+    ).values('month').annotate(total=Count('member', distinct=True)).order_by()
+    for row in active_members:
+        yield RollupBucket.ACTIVE_MEMBERS_PER_MONTH, row['month'], None, row['total']
+
+
+def rollup_series(days=DEFAULT_ROLLUP_DAYS):
+    """
+    Recompute the activity series for the last `days` days (None for all history).
+    Buckets in the window are replaced in one transaction; older buckets are kept.
+    Returns the number of buckets written.
+    """
+    if days is None:
+        first = Completion.objects.order_by('date_completed').values_list('date_completed', flat=True).first()
+        first_route = Route.objects.order_by('date_set').values_list('date_set', flat=True).first()
+        since = min(filter(None, [first, first_route]), default=timezone.localdate())
+    else:
+        since = timezone.localdate() - timedelta(days=days)
+
+    buckets = [
+        RollupBucket(series=series, bucket=bucket, area_id=area_id, value=value)
+        for series, bucket, area_id, value in _series_rows(since)
+    ]
+    with transaction.atomic():
+        RollupBucket.objects.filter(series=RollupBucket.SENDS_PER_DAY, bucket__gte=since).delete()
+        RollupBucket.objects.filter(
+            series=RollupBucket.ROUTES_SET_PER_WEEK, bucket__gte=since - timedelta(days=since.weekday())
+        ).delete()
+        RollupBucket.objects.filter(
+            series=RollupBucket.ACTIVE_MEMBERS_PER_MONTH, bucket__gte=since.replace(day=1)
+        ).delete()
+        RollupBucket.objects.bulk_create(buckets)
+    return len(buckets)
+
+
+def recent_series(series, count):
+    """The newest `count` buckets of a non-area series, oldest first."""
+    rows = RollupBucket.objects.filter(series=series).order_by('-bucket').values_list('bucket', 'value')[:count]
+    return list(reversed(rows))
+
+
+def recent_area_sends(days):
+    """Sends per area over the last `days` days, summed from the daily buckets."""
+    since = timezone.localdate() - timedelta(days=days)
+    return list(
+        RollupBucket.objects.filter(series=RollupBucket.SENDS_PER_DAY, bucket__gte=since)
+        .values('area__name').annotate(sends=Sum('value')).order_by('-sends')
+    )
@@ -0,0 +1,157 @@
+"""
+project/route_import.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Bulk route import/export for reset days.
+Rows are read one at a time from CSV, JSON or JSON Lines, validated in
+batches and inserted with bulk_create inside a single transaction. Invalid
+rows are reported with their row number instead of aborting the import.
+"""
+
+import csv
+import io
+import itertools
+import json
+from dataclasses import dataclass, field
+from django.db import transaction
+from .forms import RouteImportRowForm
+from .models import Area, Route
+from . import setters
+
+# Columns of an import/export file, in order
+COLUMNS = ['area', 'name', 'grade', 'color', 'date_set', 'setter_name']
+
+# Rows validated and inserted per bulk_create
+BATCH_SIZE = 500
+
+
+@dataclass
+class ImportResult:
+    """Outcome of one import run."""
+    created: int = 0
+    archived: int = 0
+    errors: list = field(default_factory=list)  # [(row number, message), ...]
+
+
+def read_rows(stream, file_format):
+    """
+    Yield dict rows from a text stream.
+    file_format is 'csv', 'json' (an array of objects) or 'jsonl' (one object per line).
+    """
+    if file_format == 'csv':
+        yield from csv.DictReader(stream)
+    elif file_format == 'json':
+        yield from json.load(stream)
+    elif file_format == 'jsonl':
+        for line in stream:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield line  # Reported as an invalid row
+    else:
+        raise ValueError(f'Unsupported import format "{file_format}".')
+
+
+def detect_format(filename):
+    """Guess the file format from its extension, defaulting to CSV."""
+    name = filename.lower()
+    if name.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    if name.endswith('.json'):
+        return 'json'
+    return 'csv'
+
+
+class RouteImporter:
+    """
+    Validate and insert route rows.
+    Areas are matched by name or id, setters against the admin setter roster;
+    both are loaded once per import.
+    """
+
+    def __init__(self, reset_area=False, batch_size=BATCH_SIZE):
+        self.reset_area = reset_area
+        self.batch_size = batch_size
+        self.areas = {}
+        for pk, name in Area.objects.values_list('pk', 'name'):
+            self.areas[name.lower()] = pk
+            self.areas[str(pk)] = pk
+        self.setters = set(setters.get_roster())
+        self.reset_done = set()
+        self.result = ImportResult()
+
+    def run(self, rows):
+        """Import an iterable of dict rows in one transaction and return the ImportResult."""
+        with transaction.atomic():
+            batch = []
+            for number, row in enumerate(rows, start=1):
+                batch.append((number, row))
+                if len(batch) >= self.batch_size:
+                    self._import_batch(batch)
+                    batch = []
+            if batch:
+                self._import_batch(batch)
+        return self.result
+
+    def _validate(self, number, row):
+        """Return an unsaved Route for a valid row, or record its errors and return None."""
+        if not isinstance(row, dict):
+            self.result.errors.append((number, 'Row is not a valid object.'))
+            return None
+
+        row = {key.strip(): (str(value).strip() if value is not None else '') for key, value in row.items() if key}
+        area_id = self.areas.get(row.get('area', '').lower())
+        form = RouteImportRowForm(data=row)
+        problems = []
+        if area_id is None:
+            problems.append(f"Unknown area \"{row.get('area', '')}\".")
+        if not form.is_valid():
+            for name, messages in form.errors.items():
+                problems.extend(f'{name}: {message}' for message in messages)
+        elif form.cleaned_data['setter_name'] not in self.setters:
+            problems.append(f"setter_name: \"{form.cleaned_data['setter_name']}\" is not a route setter.")
+
+        if problems:
+            self.result.errors.append((number, ' '.join(problems)))
+            return None
+        route = form.save(commit=False)
+        route.area_id = area_id
+        return route
+
+    def _import_batch(self, batch):
+        routes = [route for route in (self._validate(number, row) for number, row in batch) if route]
+
+        if self.reset_area:
+            new_areas = {route.area_id for route in routes} - self.reset_done
+            if new_areas:
+                self.result.archived += Route.objects.filter(area_id__in=new_areas).set_active(False)
+                self.reset_done |= new_areas
+
+        self.result.created += len(Route.objects.create_many(routes))
+
+
+def import_routes(stream, file_format='csv', reset_area=False):
+    """Import routes from a text stream. See RouteImporter."""
+    return RouteImporter(reset_area=reset_area).run(read_rows(stream, file_format))
+
+
+def export_rows(area_id=None, include_archived=False):
+    """
+    Yield CSV lines (header first) for routes in the import format,
+    so an export can be edited and imported again.
+    """
+    routes = Route.objects.all() if include_archived else Route.objects.filter(is_active=True)
+    if area_id:
+        routes = routes.filter(area_id=area_id)
+    rows = routes.order_by('area__name', 'grade', 'pk').values_list(
+        'area__name', 'name', 'grade', 'color', 'date_set', 'setter_name'
+    )
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in itertools.chain([COLUMNS], rows.iterator(chunk_size=BATCH_SIZE)):
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
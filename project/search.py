@@ -0,0 +1,209 @@
+"""
+project/search.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Ranked, prefix-matching search over members and routes.
+On SQLite the text lives in two FTS5 tables (created by migration 0006)
+and every word of the query matches as a prefix, ranked with bm25. The
+signals in project.signals keep the tables current and the
+rebuild_search_index command refills them. Databases without FTS5 fall
+back to prefix filters on the model tables, ordered by name. Searches read
+from the database the router picks for the model, so a replica-routed view
+ranks and loads its results on the replica.
+"""
+
+import re
+from django.db import connection, connections, router
+from django.db.models import Q
+from .models import Member, Route
+
+MEMBER_INDEX = 'project_member_search'
+ROUTE_INDEX = 'project_route_search'
+
+# Results returned by one search
+SEARCH_LIMIT = 100
+
+# Ids per DELETE/INSERT statement when reindexing
+INDEX_CHUNK_SIZE = 500
+
+# bm25() column weights, in table column order
+MEMBER_WEIGHTS = (10.0, 2.0, 5.0)  # name, email, number
+ROUTE_WEIGHTS = (10.0, 3.0, 3.0, 5.0, 2.0)  # name, setter, area, grade, color
+
+# Copy model rows into the indexes; a WHERE clause is appended when reindexing some rows
+MEMBER_ROWS_SQL = (
+    f"INSERT INTO {MEMBER_INDEX} (rowid, name, email, number) "
+    "SELECT id, first_name || ' ' || last_name, email, CAST(member_number AS TEXT) FROM project_member"
+)
+ROUTE_ROWS_SQL = (
+    f"INSERT INTO {ROUTE_INDEX} (rowid, name, setter, area, grade, color) "
+    "SELECT r.id, r.name, r.setter_name, a.name, r.grade, r.color "
+    "FROM project_route r JOIN project_area a ON a.id = r.area_id"
+)
+
+# Whether the current database has the FTS5 tables (reset after migrate)
+_fts_available = None
+
+
+def fts_available():
+    """True when the FTS5 index tables exist in the database."""
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = connection.vendor == 'sqlite' and MEMBER_INDEX in connection.introspection.table_names()
+    return _fts_available
+
+
+def reset_fts_check():
+    """Look for the index tables again (after migrations ran)."""
+    global _fts_available
+    _fts_available = None
+
+
+def query_words(query):
+    """Lowercase words of a search query; punctuation only separates them."""
+    return re.findall(r'[^\W_]+', query.lower())
+
+
+def match_expression(words):
+    """FTS5 MATCH string requiring every word as a prefix, e.g. '"sue"* "set"*'."""
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def _chunks(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), INDEX_CHUNK_SIZE):
+        yield ids[start:start + INDEX_CHUNK_SIZE]
+
+
+def _reindex(index, rows_sql, key_sql, ids):
+    """Replace the index rows of the given ids with fresh copies of the model rows."""
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        for chunk in _chunks(ids):
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f'DELETE FROM {index} WHERE rowid IN ({placeholders})', chunk)
+            cursor.execute(f'{rows_sql} WHERE {key_sql} IN ({placeholders})', chunk)
+
+
+def index_members(member_ids):
+    _reindex(MEMBER_INDEX, MEMBER_ROWS_SQL, 'id', member_ids)
+
+
+def index_routes(route_ids):
+    _reindex(ROUTE_INDEX, ROUTE_ROWS_SQL, 'r.id', route_ids)
+
+
+def index_area_routes(area_id):
+    """Reindex every route of an area, e.g. after the area was renamed."""
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {ROUTE_INDEX} WHERE rowid IN (SELECT id FROM project_route WHERE area_id = %s)',
+            [area_id],
+        )
+        cursor.execute(f'{ROUTE_ROWS_SQL} WHERE r.area_id = %s', [area_id])
+
+
+def remove_member(member_id):
+    _remove(MEMBER_INDEX, member_id)
+
+
+def remove_route(route_id):
+    _remove(ROUTE_INDEX, route_id)
+
+
+def _remove(index, pk):
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {index} WHERE rowid = %s', [pk])
+
+
+def rebuild():
+    """Refill both indexes from the model tables. Returns (members, routes) indexed."""
+    if not fts_available():
+        return 0, 0
+    counts = []
+    with connection.cursor() as cursor:
+        for index, rows_sql in ((MEMBER_INDEX, MEMBER_ROWS_SQL), (ROUTE_INDEX, ROUTE_ROWS_SQL)):
+            cursor.execute(f'DELETE FROM {index}')
+            cursor.execute(rows_sql)
+            counts.append(cursor.rowcount)
+            cursor.execute(f"INSERT INTO {index} ({index}) VALUES ('optimize')")
+    return tuple(counts)
+
+
+def _ranked_ids(model, sql, params):
+    with connections[router.db_for_read(model)].cursor() as cursor:
+        cursor.execute(sql, params)
+        return [pk for (pk,) in cursor.fetchall()]
+
+
+def _in_rank_order(queryset, ids):
+    objects = queryset.in_bulk(ids)
+    return [objects[pk] for pk in ids if pk in objects]
+
+
+def _prefix_filter(words, lookups):
+    """Every word must prefix-match at least one of the lookups."""
+    condition = Q()
+    for word in words:
+        any_field = Q()
+        for lookup in lookups:
+            any_field |= Q(**{f'{lookup}__istartswith': word})
+        condition &= any_field
+    return condition
+
+
+def search_members(query, limit=SEARCH_LIMIT):
+    """Members matching every word of query by name, email or member number, best first."""
+    words = query_words(query)
+    if not words:
+        return []
+    members = Member.objects.select_related('user')
+
+    if fts_available():
+        weights = ', '.join(str(weight) for weight in MEMBER_WEIGHTS)
+        ids = _ranked_ids(
+            Member,
+            f'SELECT rowid FROM {MEMBER_INDEX} WHERE {MEMBER_INDEX} MATCH %s '
+            f'ORDER BY bm25({MEMBER_INDEX}, {weights}) LIMIT %s',
+            [match_expression(words), limit],
+        )
+        return _in_rank_order(members, ids)
+
+    condition = Q()
+    for word in words:
+        # Whole numbers also match the member number exactly, using its unique index
+        word_matches = _prefix_filter([word], ['first_name', 'last_name', 'email'])
+        if word.isdigit():
+            word_matches |= Q(member_number=int(word))
+        condition &= word_matches
+    return list(members.filter(condition).order_by('first_name', 'last_name', 'id')[:limit])
+
+
+def search_routes(query, active_only=True, limit=SEARCH_LIMIT):
+    """Routes matching every word of query by name, setter, area, grade or color, best first."""
+    words = query_words(query)
+    if not words:
+        return []
+    routes = Route.objects.select_related('area')
+
+    if fts_available():
+        weights = ', '.join(str(weight) for weight in ROUTE_WEIGHTS)
+        active = 'AND r.is_active' if active_only else ''
+        ids = _ranked_ids(
+            Route,
+            f'SELECT {ROUTE_INDEX}.rowid FROM {ROUTE_INDEX} JOIN project_route r ON r.id = {ROUTE_INDEX}.rowid '
+            f'WHERE {ROUTE_INDEX} MATCH %s {active} '
+            f'ORDER BY bm25({ROUTE_INDEX}, {weights}), r.date_set DESC LIMIT %s',
+            [match_expression(words), limit],
+        )
+        return _in_rank_order(routes, ids)
+
+    if active_only:
+        routes = routes.filter(is_active=True)
+    condition = _prefix_filter(words, ['name', 'setter_name', 'area__name', 'grade', 'color'])
+    return list(routes.filter(condition).order_by('-date_set', '-id')[:limit])
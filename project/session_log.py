@@ -0,0 +1,85 @@
+"""
+project/session_log.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Session check-out: log every route a member sent in a session at once.
+log_session() reads the routes and the member's existing sends of them in
+one query each, then inserts the new completions with one bulk_create().
+The counters, stats and leaderboards follow through the
+completions_bulk_created signal, in a few statements for the whole session
+instead of a full completion save per route. Each route gets its own result,
+so a duplicate or archived route is reported without failing the others.
+"""
+
+from dataclasses import dataclass
+from .models import Route, Completion
+
+# Routes logged per session at most
+MAX_SENDS = 50
+
+RATINGS = [value for value, label in Completion._meta.get_field('difficulty_rating').choices]
+
+# Result statuses
+LOGGED = 'logged'
+DUPLICATE = 'duplicate'  # Already logged, before or earlier in the same session
+NOT_FOUND = 'not_found'  # No such route, or archived
+INVALID = 'invalid'  # No valid difficulty rating
+
+
+@dataclass
+class SessionSend:
+    """One route sent in the session, as submitted."""
+    route_id: int
+    difficulty_rating: int = None
+    notes: str = ''
+
+
+@dataclass
+class SendResult:
+    route_id: int
+    status: str
+    completion: Completion = None
+
+    def as_dict(self):
+        return {
+            'route_id': self.route_id,
+            'status': self.status,
+            'completion_id': self.completion.pk if self.completion else None,
+        }
+
+
+def log_session(member, sends, date_completed):
+    """
+    Log a member's sends of one session, all dated date_completed.
+    Returns a SendResult per send, in the order given. Runs in one
+    transaction: submit it through project.database.writes.
+    """
+    route_ids = {send.route_id for send in sends}
+    routes = Route.objects.filter(pk__in=route_ids, is_active=True).in_bulk()
+    sent = set(Completion.objects.filter(member=member, route_id__in=route_ids).values_list('route_id', flat=True))
+
+    results = []
+    completions = []
+    for send in sends:
+        route = routes.get(send.route_id)
+        if route is None:
+            results.append(SendResult(send.route_id, NOT_FOUND))
+        elif send.route_id in sent:
+            results.append(SendResult(send.route_id, DUPLICATE))
+        elif send.difficulty_rating not in RATINGS:
+            results.append(SendResult(send.route_id, INVALID))
+        else:
+            sent.add(send.route_id)
+            completion = Completion(
+                member=member,
+                route=route,
+                date_completed=date_completed,
+                difficulty_rating=send.difficulty_rating,
+                notes=send.notes,
+            )
+            completions.append(completion)
+            results.append(SendResult(send.route_id, LOGGED, completion))
+
+    if completions:
+        Completion.objects.create_many(completions)
+    return results
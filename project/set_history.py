@@ -0,0 +1,223 @@
+"""
+project/set_history.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Route-setting history per area and the reset planner built on it.
+Every route set, archived, restored, edited or deleted moves its area's
+AreaSetHistory row for today: active routes, grade mix and the set date of
+the oldest active route. The signals in project.signals apply each change,
+including bulk archive/restore and imports, which send their own signals.
+area_plans() ranks the areas for a reset from these rows alone.
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import F, Max, Min, OuterRef, Q, Subquery
+from django.utils import timezone
+from .models import Area, Route, AreaSetHistory
+from .stats import GRADE_ORDER
+
+# Route fields the history depends on
+SET_FIELDS = ['area_id', 'grade', 'date_set', 'is_active']
+
+# Stored for instances loaded without the set fields
+UNKNOWN = object()
+
+# A grade with no active route in an area weighs as much as this many days of staleness
+GAP_DAYS = 7
+
+# Weeks of active-route counts shown per area on the planner
+SERIES_WEEKS = 12
+
+
+def set_entry(route):
+    """
+    (area id, grade, date set) of an active route, None for an archived
+    one, or UNKNOWN when a set field was deferred and reading it would query.
+    """
+    if route.get_deferred_fields().intersection(SET_FIELDS):
+        return UNKNOWN
+    return (route.area_id, route.grade, route.date_set) if route.is_active else None
+
+
+def _today_entry(area_id, day):
+    """Today's row for an area, carrying forward its latest state; None for an area without history."""
+    entry = AreaSetHistory.objects.filter(area_id=area_id, day__lte=day).order_by('-day').first()
+    if entry is not None and entry.day != day:
+        entry.pk = None
+        entry.day = day
+        entry.routes_set = entry.routes_archived = 0
+    return entry
+
+
+def apply(area_id, added=(), removed=(), counted=True):
+    """
+    Move an area's history by routes that became active (added) or stopped
+    being active (removed), each given as (grade, date set). counted=False
+    for edits of a route that stays active, which are no setting activity.
+    Runs after the routes table changed, inside the transaction that changed it.
+    """
+    day = timezone.localdate()
+    entry = _today_entry(area_id, day)
+    if entry is None:
+        record_current([area_id])
+        return
+
+    counts = entry.grade_counts
+    for grade, date_set in added:
+        counts[grade] = counts.get(grade, 0) + 1
+        entry.active_routes += 1
+        entry.oldest_set = min(entry.oldest_set or date_set, date_set)
+    oldest_removed = False
+    for grade, date_set in removed:
+        counts[grade] = counts.get(grade, 0) - 1
+        if counts[grade] <= 0:
+            del counts[grade]
+        entry.active_routes = max(entry.active_routes - 1, 0)
+        oldest_removed = oldest_removed or entry.oldest_set is None or date_set <= entry.oldest_set
+    if oldest_removed:
+        # One read of the (area, is_active, date_set) index
+        entry.oldest_set = Route.objects.filter(area_id=area_id, is_active=True).aggregate(
+            oldest=Min('date_set')
+        )['oldest']
+    if counted:
+        entry.routes_set += len(added)
+        entry.routes_archived += len(removed)
+    entry.save()
+
+
+def route_changed(route, before, deleted=False):
+    """Apply a saved or deleted route, given its set_entry() from before the change."""
+    after = None if deleted else set_entry(route)
+    if before is UNKNOWN or after is UNKNOWN:
+        record_current([route.area_id])
+        return
+    if before == after:
+        return
+    if before and after and before[0] == after[0]:
+        # Edited in place: the grade or set date changed
+        apply(after[0], added=[after[1:]], removed=[before[1:]], counted=False)
+        return
+    if before:
+        apply(before[0], removed=[before[1:]])
+    if after:
+        apply(after[0], added=[after[1:]])
+
+
+def routes_changed(routes, is_active):
+    """Apply a bulk archive/restore or a bulk creation; routes is [(pk, area_id), ...]."""
+    changed = defaultdict(list)
+    rows = Route.objects.filter(pk__in=[pk for pk, area_id in routes], is_active=is_active)
+    for area_id, grade, date_set in rows.values_list('area_id', 'grade', 'date_set'):
+        changed[area_id].append((grade, date_set))
+    for area_id, entries in changed.items():
+        if is_active:
+            apply(area_id, added=entries)
+        else:
+            apply(area_id, removed=entries)
+
+
+def deleting_area(origin):
+    """Whether a delete started from an area (whose history goes with it)."""
+    return isinstance(origin, Area) or getattr(origin, 'model', None) is Area
+
+
+def record_current(area_ids=None):
+    """
+    Recompute today's row of the given areas (default: all) from the routes
+    table, keeping the day's activity counts. Used for areas without
+    history and after bulk loads that bypass the signals.
+    """
+    day = timezone.localdate()
+    areas = Area.objects.all() if area_ids is None else Area.objects.filter(pk__in=area_ids)
+    with transaction.atomic():
+        entries = {}
+        for area_id in areas.values_list('pk', flat=True):
+            entry = _today_entry(area_id, day) or AreaSetHistory(area_id=area_id, day=day)
+            entry.active_routes, entry.grade_counts, entry.oldest_set = 0, {}, None
+            entries[area_id] = entry
+        rows = Route.objects.filter(area_id__in=entries, is_active=True).values_list('area_id', 'grade', 'date_set')
+        for area_id, grade, date_set in rows:
+            entry = entries[area_id]
+            entry.active_routes += 1
+            entry.grade_counts[grade] = entry.grade_counts.get(grade, 0) + 1
+            entry.oldest_set = min(entry.oldest_set or date_set, date_set)
+        for entry in entries.values():
+            entry.save()
+    return len(entries)
+
+
+@dataclass
+class AreaPlan:
+    """One area's case for a reset."""
+    area: Area
+    entry: AreaSetHistory
+    oldest_age: int  # Days the oldest active route has been up
+    days_since_set: int = None  # Days since routes were last set here (None: not in the history)
+    gaps: list = field(default_factory=list)  # Grades without an active route
+    series: list = field(default_factory=list)  # [(week start, active routes)], oldest first
+
+    @property
+    def score(self):
+        return self.oldest_age + GAP_DAYS * len(self.gaps)
+
+
+def _weekly(rows, today, weeks):
+    """Active routes at the end of each of the last `weeks` weeks, from (day, count) rows oldest first."""
+    series = []
+    count = 0
+    rows = iter(rows)
+    row = next(rows, None)
+    for week in range(weeks - 1, -1, -1):
+        end = today - timedelta(days=7 * week)
+        while row is not None and row[0] <= end:
+            count = row[1]
+            row = next(rows, None)
+        series.append((end - timedelta(days=6), count))
+    return series
+
+
+def area_plans(today=None):
+    """
+    Areas in reset order, most due first: the age of the oldest active
+    route plus GAP_DAYS per grade with no active route. Three queries over
+    the history rows; the routes table is not read.
+    """
+    today = today or timezone.localdate()
+    latest_day = AreaSetHistory.objects.filter(area=OuterRef('area'), day__lte=today).order_by('-day').values('day')[:1]
+    entries = AreaSetHistory.objects.annotate(latest_day=Subquery(latest_day)).filter(
+        day=F('latest_day')
+    ).select_related('area')
+
+    last_set = dict(
+        AreaSetHistory.objects.filter(routes_set__gt=0, day__lte=today)
+        .values('area').annotate(last=Max('day')).values_list('area', 'last')
+    )
+
+    # The rows in the series window, plus the latest one before it, which carries into the window
+    window_start = today - timedelta(days=7 * (SERIES_WEEKS - 1))
+    before_window = AreaSetHistory.objects.filter(
+        area=OuterRef('area'), day__lte=window_start
+    ).order_by('-day').values('day')[:1]
+    rows = AreaSetHistory.objects.filter(
+        Q(day__gt=window_start) | Q(day__gte=Subquery(before_window)), day__lte=today
+    ).order_by('day')
+    counts = defaultdict(list)
+    for area_id, day, active_routes in rows.values_list('area_id', 'day', 'active_routes'):
+        counts[area_id].append((day, active_routes))
+
+    plans = []
+    for entry in entries:
+        last = last_set.get(entry.area_id)
+        plans.append(AreaPlan(
+            area=entry.area,
+            entry=entry,
+            oldest_age=(today - entry.oldest_set).days if entry.oldest_set else 0,
+            days_since_set=(today - last).days if last else None,
+            gaps=[grade for grade in GRADE_ORDER if not entry.grade_counts.get(grade)],
+            series=_weekly(counts[entry.area_id], today, SERIES_WEEKS),
+        ))
+    plans.sort(key=lambda plan: (-plan.score, plan.area.name))
+    return plans
@@ -0,0 +1,73 @@
+"""
+project/setters.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Cached roster of route setters (staff users and admin members).
+The roster is built with a single UNION query and cached under a version
+number (see project.caching). The signals in project.signals bump it only
+when someone joins or leaves the roster or a setter's name changes.
+"""
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Value
+from .caching import get_version, bump_version
+from .models import Member
+from .replicas import on_primary
+
+ROSTER_SCOPE = 'setter-roster'
+CACHE_TIMEOUT = 60 * 60 * 24
+
+# Fields that decide whether and how someone appears on the roster
+USER_ROSTER_FIELDS = ['is_staff', 'first_name', 'last_name', 'username']
+MEMBER_ROSTER_FIELDS = ['is_admin', 'first_name', 'last_name']
+
+# Stored for instances loaded without the roster fields
+UNKNOWN = object()
+
+
+def _setter_name(first_name, last_name, username):
+    """Display name of a setter; users without a full name go by their username."""
+    if first_name and last_name:
+        return f'{first_name} {last_name}'
+    return username
+
+
+def _build_roster():
+    staff = User.objects.filter(is_staff=True).values_list('first_name', 'last_name', 'username')
+    admins = Member.objects.filter(is_admin=True).values_list('first_name', 'last_name', Value(''))
+    names = {_setter_name(*row) for row in staff.union(admins, all=True)}
+    return sorted(names)
+
+
+def get_roster():
+    """Sorted, deduplicated setter names."""
+    key = f'{ROSTER_SCOPE}:{get_version(ROSTER_SCOPE)}'
+    roster = cache.get(key)
+    if roster is None:
+        with on_primary():  # Shared by every reader, so never built from a lagging replica
+            roster = _build_roster()
+        cache.set(key, roster, CACHE_TIMEOUT)
+    return roster
+
+
+def get_choices():
+    """(name, name) choices for a setter select."""
+    return [(name, name) for name in get_roster()]
+
+
+def invalidate():
+    bump_version(ROSTER_SCOPE)
+
+
+def roster_entry(instance):
+    """
+    The name instance contributes to the roster (None if it isn't a setter),
+    or UNKNOWN when a roster field was deferred and reading it would query.
+    """
+    fields = USER_ROSTER_FIELDS if isinstance(instance, User) else MEMBER_ROSTER_FIELDS
+    if instance.get_deferred_fields().intersection(fields):
+        return UNKNOWN
+    if isinstance(instance, User):
+        return _setter_name(instance.first_name, instance.last_name, instance.username) if instance.is_staff else None
+    return f'{instance.first_name} {instance.last_name}' if instance.is_admin else None
@@ -0,0 +1,429 @@
+"""
+project/signals.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Signal receivers that keep denormalized data in sync with the models.
+Connected in ProjectConfig.ready().
+"""
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_init, pre_save, post_save, post_delete, post_migrate
+from django.dispatch import receiver
+from .models import (
+    Member, Area, Route, Completion, ColdCompletion,
+    routes_status_changed, routes_bulk_created, routes_frozen, completions_bulk_created,
+)
+from .counters import (
+    UNKNOWN, adjust_send_counts, adjust_send_counts_many, as_completion, move_area_sends,
+    route_entry, send_entry, stored_route_entry, stored_send_entry,
+)
+from .caching import ROUTES_SCOPE, area_scope, route_scope, bump_version
+from .database import configure_connection
+from .instrumentation import install_query_recorder
+from . import cold_storage, filter_options, leaderboards, live_feed, recommendations, search, set_history, setters, stats
+
+
+def _count_send(completion, delta):
+    adjust_send_counts(completion.route_id, completion.member_id, delta)
+    stats.record_completion(completion, delta)
+    leaderboards.record_completion(completion, delta)
+
+
+@receiver(post_init, sender=Completion)
+def remember_send_entry(sender, instance, **kwargs):
+    """Note what the completion counts towards, to compare on save."""
+    instance._send_entry = send_entry(instance)
+
+
+@receiver(pre_save, sender=Completion)
+def load_send_entry(sender, instance, **kwargs):
+    """Read the stored values of an edited completion that was loaded with deferred fields."""
+    if instance._send_entry is UNKNOWN and not instance._state.adding:
+        instance._send_entry = stored_send_entry(instance.pk)
+
+
+@receiver(post_save, sender=Completion)
+def completion_saved(sender, instance, created, **kwargs):
+    """
+    Count a newly logged completion. An edit (e.g. in the Django admin)
+    that moves it to another member, route, date or rating uncounts the
+    old values and counts the new ones.
+    """
+    entry = send_entry(instance)
+    if created:
+        _count_send(instance, 1)
+    else:
+        if entry is UNKNOWN:
+            entry = stored_send_entry(instance.pk)
+        if instance._send_entry and entry != instance._send_entry:
+            _count_send(as_completion(instance._send_entry), -1)
+            _count_send(as_completion(entry), 1)
+    instance._send_entry = entry
+
+
+@receiver(completions_bulk_created, sender=Completion)
+def completions_created(sender, completions, **kwargs):
+    """Count completions logged together (a session check-out), in a few statements for all of them."""
+    adjust_send_counts_many(completions)
+    stats.record_completions(completions)
+    leaderboards.record_completions(completions)
+
+
+@receiver(post_delete, sender=Completion)
+def completion_deleted(sender, instance, **kwargs):
+    """
+    Uncount a deleted completion.
+    Also runs for cascade deletes (member, user, route or area removed),
+    inside the same transaction as the delete.
+    """
+    _count_send(instance, -1)
+
+
+@receiver(post_delete, sender=ColdCompletion)
+def cold_completion_deleted(sender, instance, **kwargs):
+    """Uncount a send in cold storage deleted with its member or area, as completion_deleted does."""
+    cold_storage.completion_removed(instance)
+
+
+@receiver(post_init, sender=Route)
+def remember_route_entry(sender, instance, **kwargs):
+    """Note the grade and area the route's sends count under, to compare on save."""
+    instance._route_entry = route_entry(instance)
+
+
+@receiver(pre_save, sender=Route)
+def load_route_entry(sender, instance, **kwargs):
+    """Read the stored grade and area of an edited route that was loaded with deferred fields."""
+    if instance._route_entry is UNKNOWN and not instance._state.adding:
+        instance._route_entry = stored_route_entry(instance.pk)
+
+
+@receiver(post_save, sender=Route)
+def route_sends_moved(sender, instance, created, **kwargs):
+    """
+    A route edited (e.g. in the Django admin) to another grade or area
+    takes its sends along: area counters, member stats and leaderboards,
+    and the recommendation profiles of the members who sent it.
+    """
+    before, entry = instance._route_entry, route_entry(instance)
+    if entry is UNKNOWN:
+        entry = stored_route_entry(instance.pk)
+    instance._route_entry = entry
+    if created or not before or before == entry:
+        return
+
+    if before[1] != entry[1]:
+        move_area_sends(instance.pk, before[1], entry[1])
+    stats.route_changed(instance.pk, before, entry)
+    leaderboards.route_changed(instance.pk, before, entry)
+
+    member_ids = list(Completion.objects.filter(route_id=instance.pk).values_list('member_id', flat=True))
+
+    def forget():
+        for member_id in member_ids:
+            recommendations.forget_member(member_id)
+    transaction.on_commit(forget)
+
+
+@receiver([post_save, post_delete], sender=Route)
+def route_options_changed(sender, **kwargs):
+    """Route labels appear in the completions route picker."""
+    filter_options.invalidate('route')
+
+
+@receiver(routes_bulk_created, sender=Route)
+@receiver(routes_frozen, sender=Route)
+def imported_route_options_changed(sender, **kwargs):
+    filter_options.invalidate('route')
+
+
+@receiver([post_save, post_delete], sender=Member)
+def member_options_changed(sender, **kwargs):
+    filter_options.invalidate('member')
+
+
+@receiver([post_save, post_delete], sender=Area)
+def area_options_changed(sender, **kwargs):
+    """Area names appear in both the area and the route picker."""
+    filter_options.invalidate('area')
+    filter_options.invalidate('route')
+
+
+# Page and fragment cache versions (project.caching)
+
+def _stored(completion):
+    """Stand-in with an edited completion's values before the edit, or the completion itself when they are not known."""
+    if completion._send_entry in (None, UNKNOWN):
+        return completion
+    return as_completion(completion._send_entry)
+
+
+def _completion_area_id(completion):
+    """Area of a completion's route, without a query when the route is already loaded."""
+    if Completion.route.is_cached(completion):
+        return completion.route.area_id
+    return Route.objects.filter(pk=completion.route_id).values_list('area_id', flat=True).first()
+
+
+@receiver(pre_save, sender=Completion)
+def edited_completion_pages_changed(sender, instance, **kwargs):
+    """An edit shows on the pages of the completion's route before it, which may not be the route after."""
+    if not instance._state.adding:
+        before = _stored(instance)
+        bump_version(ROUTES_SCOPE, route_scope(before.route_id), area_scope(_completion_area_id(before)))
+
+
+@receiver([post_save, post_delete], sender=Completion)
+def completion_pages_changed(sender, instance, **kwargs):
+    """A logged, edited or removed send changes the route's counts and recent completions."""
+    bump_version(ROUTES_SCOPE, route_scope(instance.route_id), area_scope(_completion_area_id(instance)))
+
+
+@receiver(completions_bulk_created, sender=Completion)
+def bulk_completion_pages_changed(sender, completions, **kwargs):
+    bump_version(
+        ROUTES_SCOPE,
+        *{route_scope(completion.route_id) for completion in completions},
+        *{area_scope(completion.route.area_id) for completion in completions},
+    )
+
+
+@receiver(pre_save, sender=Route)
+def moved_route_pages_changed(sender, instance, **kwargs):
+    """A route moved to another area leaves the pages of the area before it."""
+    before = instance._route_entry
+    if not instance._state.adding and before not in (None, UNKNOWN) and before[1] != instance.area_id:
+        bump_version(area_scope(before[1]))
+
+
+@receiver([post_save, post_delete], sender=Route)
+def route_pages_changed(sender, instance, **kwargs):
+    bump_version(ROUTES_SCOPE, route_scope(instance.pk), area_scope(instance.area_id))
+
+
+@receiver([post_save, post_delete], sender=Area)
+def area_pages_changed(sender, instance, **kwargs):
+    """Area names are shown on the area pages and on every route in the area."""
+    route_ids = Route.objects.filter(area=instance).values_list('pk', flat=True)
+    bump_version(ROUTES_SCOPE, area_scope(instance.pk), *[route_scope(pk) for pk in route_ids])
+
+
+@receiver(post_save, sender=Member)
+def member_pages_changed(sender, instance, created, **kwargs):
+    """Member names are shown with their sends, on route pages and in the API."""
+    if not created:
+        sends = list(Completion.objects.filter(member=instance).values_list('route_id', 'route__area_id').distinct())
+        bump_version(
+            ROUTES_SCOPE,
+            *{route_scope(route_id) for route_id, area_id in sends},
+            *{area_scope(area_id) for route_id, area_id in sends},
+        )
+
+
+@receiver(routes_bulk_created, sender=Route)
+@receiver(routes_status_changed, sender=Route)
+@receiver(routes_frozen, sender=Route)
+def bulk_route_pages_changed(sender, routes, **kwargs):
+    """Bulk archive/restore/import and cold storage skip post_save/post_delete, so they send their own signals."""
+    area_ids = {area_id for pk, area_id in routes}
+    bump_version(
+        ROUTES_SCOPE,
+        *[route_scope(pk) for pk, area_id in routes],
+        *[area_scope(area_id) for area_id in area_ids],
+    )
+
+
+# Area set history (project.set_history)
+
+@receiver(post_init, sender=Route)
+def remember_set_entry(sender, instance, **kwargs):
+    """Note how the route counts towards its area's history, to compare on save."""
+    instance._set_entry = set_history.set_entry(instance)
+
+
+@receiver(post_save, sender=Route)
+def route_set_history_saved(sender, instance, created, **kwargs):
+    set_history.route_changed(instance, None if created else instance._set_entry)
+    instance._set_entry = set_history.set_entry(instance)
+
+
+@receiver(post_delete, sender=Route)
+def route_set_history_deleted(sender, instance, origin=None, **kwargs):
+    if not set_history.deleting_area(origin):
+        set_history.route_changed(instance, instance._set_entry, deleted=True)
+
+
+@receiver(routes_bulk_created, sender=Route)
+def bulk_created_set_history(sender, routes, **kwargs):
+    set_history.routes_changed(routes, True)
+
+
+@receiver(routes_status_changed, sender=Route)
+def status_changed_set_history(sender, routes, is_active, **kwargs):
+    """Bulk archive/restore updates the rows with QuerySet.update(), so it sends its own signal."""
+    set_history.routes_changed(routes, is_active)
+
+
+@receiver(post_save, sender=Area)
+def area_set_history_started(sender, instance, created, **kwargs):
+    if created:
+        set_history.record_current([instance.pk])
+
+
+# Setter roster (project.setters)
+
+@receiver(post_init, sender=User)
+@receiver(post_init, sender=Member)
+def remember_roster_entry(sender, instance, **kwargs):
+    """Note how the instance appears on the setter roster, to compare on save."""
+    instance._roster_entry = setters.roster_entry(instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Member)
+def roster_entry_saved(sender, instance, created, **kwargs):
+    """Logins and profile edits leave the roster alone; only staff/admin and name changes count."""
+    entry = setters.roster_entry(instance)
+    previous = None if created else instance._roster_entry
+    if entry != previous or entry is setters.UNKNOWN:
+        setters.invalidate()
+    instance._roster_entry = entry
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Member)
+def roster_entry_deleted(sender, instance, **kwargs):
+    if instance._roster_entry is not None:
+        setters.invalidate()
+
+
+# Search index (project.search)
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    """
+    Apply the SQLite pragmas of the database profile, and let
+    RequestMetricsMiddleware count this connection's queries, whichever thread opened it.
+    """
+    configure_connection(connection)
+    install_query_recorder(connection)
+
+
+@receiver(post_migrate)
+def search_tables_migrated(sender, **kwargs):
+    search.reset_fts_check()
+
+
+@receiver(post_save, sender=Member)
+def member_search_changed(sender, instance, **kwargs):
+    search.index_members([instance.pk])
+
+
+@receiver(post_delete, sender=Member)
+def member_search_deleted(sender, instance, **kwargs):
+    search.remove_member(instance.pk)
+
+
+@receiver(post_save, sender=Route)
+def route_search_changed(sender, instance, **kwargs):
+    search.index_routes([instance.pk])
+
+
+@receiver(routes_bulk_created, sender=Route)
+def imported_routes_search_changed(sender, routes, **kwargs):
+    search.index_routes([pk for pk, area_id in routes])
+
+
+@receiver(post_delete, sender=Route)
+def route_search_deleted(sender, instance, **kwargs):
+    search.remove_route(instance.pk)
+
+
+@receiver(routes_frozen, sender=Route)
+def frozen_routes_search_removed(sender, routes, **kwargs):
+    for pk, area_id in routes:
+        search.remove_route(pk)
+
+
+@receiver(post_save, sender=Area)
+def area_search_changed(sender, instance, created, **kwargs):
+    """Route rows carry the area name."""
+    if not created:
+        search.index_area_routes(instance.pk)
+
+
+# Route recommendations (project.recommendations)
+
+@receiver(post_save, sender=Completion)
+def completion_recommended(sender, instance, created, **kwargs):
+    """The cached profile is shared between processes, so only change it once the send commits."""
+    if created:
+        transaction.on_commit(lambda: recommendations.record_send(instance))
+
+
+@receiver(pre_save, sender=Completion)
+def edited_completion_unrecommended(sender, instance, **kwargs):
+    """An edit can move the send to another member or rerate it: rebuild the profiles involved."""
+    if not instance._state.adding:
+        member_ids = {instance.member_id, _stored(instance).member_id}
+
+        def forget():
+            for member_id in member_ids:
+                recommendations.forget_member(member_id)
+        transaction.on_commit(forget)
+
+
+@receiver(completions_bulk_created, sender=Completion)
+def completions_recommended(sender, completions, **kwargs):
+    def record():
+        for completion in completions:
+            recommendations.record_send(completion)
+    transaction.on_commit(record)
+
+
+@receiver(post_delete, sender=Completion)
+def completion_unrecommended(sender, instance, **kwargs):
+    transaction.on_commit(lambda: recommendations.forget_member(instance.member_id))
+
+
+@receiver([post_save, post_delete], sender=Route)
+@receiver(routes_bulk_created, sender=Route)
+@receiver(routes_status_changed, sender=Route)
+def recommendation_pool_changed(sender, **kwargs):
+    recommendations.invalidate_pool()
+
+
+# Live feed (project.live_feed)
+
+def _publish_on_commit(event_type, data):
+    transaction.on_commit(lambda: live_feed.bus.publish(event_type, data))
+
+
+@receiver(post_save, sender=Completion)
+def completion_published(sender, instance, created, **kwargs):
+    if created:
+        _publish_on_commit(live_feed.SEND, live_feed.send_event(instance))
+
+
+@receiver(completions_bulk_created, sender=Completion)
+def completions_published(sender, completions, **kwargs):
+    for completion in completions:
+        _publish_on_commit(live_feed.SEND, live_feed.send_event(completion))
+
+
+@receiver(post_save, sender=Route)
+def route_published(sender, instance, created, **kwargs):
+    action = 'set' if created else 'updated'
+    _publish_on_commit(live_feed.ROUTES, live_feed.routes_event(action, [(instance.pk, instance.area_id)]))
+
+
+@receiver(routes_bulk_created, sender=Route)
+def imported_routes_published(sender, routes, **kwargs):
+    _publish_on_commit(live_feed.ROUTES, live_feed.routes_event('set', routes))
+
+
+@receiver(routes_status_changed, sender=Route)
+def route_status_published(sender, routes, is_active, **kwargs):
+    _publish_on_commit(live_feed.ROUTES, live_feed.routes_event('restored' if is_active else 'archived', routes))
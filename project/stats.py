@@ -0,0 +1,194 @@
+"""
+project/stats.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Per-member climbing statistics.
+MemberStats rows are updated incrementally as completions are logged or
+removed, and rebuilt from scratch by the rebuild_member_stats command.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+from .models import Route, Completion, ColdCompletion, MemberStats
+from . import filter_options
+
+# Grades from easiest to hardest, as listed on Route
+GRADE_ORDER = [grade for grade, label in Route.GRADE_CHOICES]
+
+# Days of per-day send counts kept for the "sends this month" figure
+RECENT_WINDOW_DAYS = 30
+
+
+def _recent_cutoff():
+    return timezone.localdate() - timedelta(days=RECENT_WINDOW_DAYS)
+
+
+def _bump(counts, key, delta):
+    """Add delta to counts[key], dropping keys that reach zero."""
+    key = str(key)
+    value = counts.get(key, 0) + delta
+    if value > 0:
+        counts[key] = value
+    else:
+        counts.pop(key, None)
+
+
+def rebuild_member_stats(member):
+    """Recompute a member's stats from their completions, including those in cold storage, and save them."""
+    cutoff = _recent_cutoff()
+    stats = MemberStats(member=member)
+    fields = ['date_completed', 'route__grade', 'route__area_id']
+    rows = Completion.objects.filter(member=member).values_list(*fields).union(
+        ColdCompletion.objects.filter(member=member).values_list(*fields), all=True
+    )
+    for date_completed, grade, area_id in rows:
+        _bump(stats.grade_counts, grade, 1)
+        _bump(stats.area_counts, area_id, 1)
+        if date_completed >= cutoff:
+            _bump(stats.daily_sends, date_completed.isoformat(), 1)
+        if stats.first_send is None or date_completed < stats.first_send:
+            stats.first_send = date_completed
+        if stats.last_send is None or date_completed > stats.last_send:
+            stats.last_send = date_completed
+    stats.save()
+    return stats
+
+
+def get_member_stats(member):
+    """Return a member's stats row, building it on first use."""
+    try:
+        return MemberStats.objects.get(member=member)
+    except MemberStats.DoesNotExist:
+        return rebuild_member_stats(member)
+
+
+def _count(stats, grade, area_id, date_completed, delta, cutoff):
+    """Apply one send to the per-grade, per-area and recent daily counts."""
+    _bump(stats.grade_counts, grade, delta)
+    _bump(stats.area_counts, area_id, delta)
+    stats.daily_sends = {
+        day: count for day, count in stats.daily_sends.items() if day >= cutoff.isoformat()
+    }
+    if date_completed >= cutoff:
+        _bump(stats.daily_sends, date_completed.isoformat(), delta)
+
+
+def record_completion(completion, delta, route=None):
+    """
+    Apply one logged (delta=1) or removed (delta=-1) completion to the member's stats.
+    route is the (grade, area id) of the completion's route, read from Route
+    when not given (pass it for a send in cold storage).
+    Runs inside the transaction that saves or deletes the completion.
+    """
+    if route is None:
+        route = Route.objects.filter(pk=completion.route_id).values_list('grade', 'area_id').first()
+    if route is None:
+        return
+    grade, area_id = route
+
+    with transaction.atomic():
+        stats = MemberStats.objects.select_for_update().filter(member_id=completion.member_id).first()
+        if stats is None:
+            # Nothing to undo, or the first send: build from scratch (includes this completion)
+            if delta > 0:
+                rebuild_member_stats(completion.member)
+            return
+
+        date_completed = completion.date_completed
+        _count(stats, grade, area_id, date_completed, delta, _recent_cutoff())
+
+        if delta > 0:
+            stats.first_send = min(filter(None, [stats.first_send, date_completed]))
+            stats.last_send = max(filter(None, [stats.last_send, date_completed]))
+        elif date_completed in (stats.first_send, stats.last_send):
+            spans = [
+                model.objects.filter(member_id=completion.member_id).aggregate(
+                    first=Min('date_completed'), last=Max('date_completed')
+                )
+                for model in (Completion, ColdCompletion)
+            ]
+            stats.first_send = min(filter(None, [span['first'] for span in spans]), default=None)
+            stats.last_send = max(filter(None, [span['last'] for span in spans]), default=None)
+
+        stats.save()
+
+
+def record_completions(completions):
+    """
+    Apply completions created together (CompletionQuerySet.create_many())
+    to their members' stats, with one read and one write per member.
+    Each completion's route must be loaded.
+    """
+    by_member = defaultdict(list)
+    for completion in completions:
+        by_member[completion.member_id].append(completion)
+    cutoff = _recent_cutoff()
+
+    with transaction.atomic():
+        stats_rows = MemberStats.objects.select_for_update().in_bulk(list(by_member))
+        for member_id, sends in by_member.items():
+            stats = stats_rows.get(member_id)
+            if stats is None:
+                # The first sends: build from scratch (includes these completions)
+                rebuild_member_stats(sends[0].member)
+                continue
+            for completion in sends:
+                _count(stats, completion.route.grade, completion.route.area_id, completion.date_completed, 1, cutoff)
+                stats.first_send = min(filter(None, [stats.first_send, completion.date_completed]))
+                stats.last_send = max(filter(None, [stats.last_send, completion.date_completed]))
+            stats.save()
+
+
+def route_changed(route_id, before, after):
+    """
+    Move the sends of a route edited to another grade or area from before,
+    its (grade, area id) before the edit, to after, in the stats of every
+    member who sent it. Members without stats yet build them on first use.
+    """
+    sends = Completion.objects.filter(route_id=route_id)
+    cutoff = _recent_cutoff()
+
+    with transaction.atomic():
+        stats_rows = list(MemberStats.objects.select_for_update().filter(member_id__in=sends.values('member_id')))
+        sent_on = dict(sends.values_list('member_id', 'date_completed'))
+        for stats in stats_rows:
+            _count(stats, *before, sent_on[stats.member_id], -1, cutoff)
+            _count(stats, *after, sent_on[stats.member_id], 1, cutoff)
+        MemberStats.objects.bulk_update(stats_rows, ['grade_counts', 'area_counts', 'daily_sends'], batch_size=500)
+
+
+def member_summary(member):
+    """Template context for the profile page statistics."""
+    stats = get_member_stats(member)
+    total = member.send_count
+    cutoff = _recent_cutoff().isoformat()
+
+    grades = [(grade, stats.grade_counts[grade]) for grade in GRADE_ORDER if grade in stats.grade_counts]
+    widest = max([count for grade, count in grades], default=0)
+    # Hardest grade on top, bar width relative to the most-sent grade
+    pyramid = [(grade, count, round(100 * count / widest)) for grade, count in reversed(grades)]
+
+    area_names = dict(filter_options.get_options('area'))
+    areas = sorted(
+        ((area_names.get(int(area_id), 'Unknown area'), count) for area_id, count in stats.area_counts.items()),
+        key=lambda item: -item[1],
+    )
+
+    sends_per_week = 0
+    if stats.first_send and total:
+        weeks = max((timezone.localdate() - stats.first_send).days / 7, 1)
+        sends_per_week = round(total / weeks, 1)
+
+    return {
+        'total_completions': total,
+        'unique_routes': total,  # A member can log each route only once
+        'recent_activity_count': sum(count for day, count in stats.daily_sends.items() if day >= cutoff),
+        'grade_counts': dict(grades),
+        'grade_pyramid': pyramid,
+        'highest_grade': grades[-1][0] if grades else None,
+        'sends_per_week': sends_per_week,
+        'areas_climbed': areas,
+    }
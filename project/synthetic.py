@@ -0,0 +1,169 @@
+"""
+project/synthetic.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Deterministic synthetic gym data for benchmarks.
+The same seed and counts always produce the same areas, routes, members and
+completions. Sends per member follow a long-tailed (log-normal) distribution
+and members mostly send routes at or below their own grade, like a real gym.
+"""
+
+import math
+import random
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from .caching import ROUTES_SCOPE, bump_version
+from .counters import rebuild_send_counts
+from .models import Member, Area, Route, Completion
+from .rollups import rollup_series, take_snapshot
+from .stats import GRADE_ORDER, rebuild_member_stats
+from . import filter_options, leaderboards, recommendations, search, set_history
+
+# Rows per bulk_create
+BATCH_SIZE = 1000
+
+# Relative number of routes set at each grade, easiest first
+GRADE_WEIGHTS = [6, 10, 10, 9, 7, 5, 3]
+
+FIRST_NAMES = [
+    'Alex', 'Bea', 'Cal', 'Dana', 'Eli', 'Fran', 'Gus', 'Hana', 'Ivo', 'Jo',
+    'Kai', 'Lena', 'Milo', 'Nia', 'Omar', 'Pia', 'Quin', 'Rosa', 'Sam', 'Tess',
+]
+LAST_NAMES = [
+    'Adams', 'Brooks', 'Chen', 'Diaz', 'Evans', 'Fischer', 'Garcia', 'Hughes',
+    'Ito', 'Jensen', 'Khan', 'Lopez', 'Moreau', 'Novak', 'Okafor', 'Patel',
+]
+SETTERS = ['Sue Setter', 'Rob Bolt', 'Kim Crimp', 'Lou Jug']
+AREA_NAMES = ['The Dugout', 'The Gray Monster', 'The Warning Track', 'The Bullpen']
+
+
+@dataclass
+class DatasetSpec:
+    """Counts and seed describing one synthetic dataset."""
+    seed: int = 1
+    areas: int = 4
+    active_routes: int = 200
+    archived_routes: int = 800
+    members: int = 500
+    mean_sends: float = 30.0  # Mean completions per member
+    days: int = 365  # History covered by route set dates
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def _area_name(index):
+    if index < len(AREA_NAMES):
+        return AREA_NAMES[index]
+    return f'Area {index + 1}'
+
+
+def _sends_for_member(rng, mean):
+    """Long-tailed number of sends: most members log a few, a handful log hundreds."""
+    sigma = 1.0
+    mu = math.log(mean) - sigma ** 2 / 2
+    return int(rng.lognormvariate(mu, sigma))
+
+
+@transaction.atomic
+def generate(spec):
+    """
+    Insert the dataset described by spec and bring every derived table
+    (send counters, member stats, leaderboards, area set history, dashboard
+    rollups, search index) up to date.
+    Returns the number of rows created per model.
+    """
+    rng = random.Random(spec.seed)
+    today = timezone.localdate()
+
+    areas = Area.objects.bulk_create([
+        Area(name=_area_name(i), description=f'Synthetic area {i + 1}') for i in range(spec.areas)
+    ])
+
+    routes = []
+    total_routes = spec.active_routes + spec.archived_routes
+    for i in range(total_routes):
+        is_active = i >= spec.archived_routes  # Archived routes are the older ones
+        age = rng.randint(0, 42) if is_active else rng.randint(43, max(spec.days, 43))
+        routes.append(Route(
+            name=f'Problem {i + 1}' if rng.random() < 0.7 else '',
+            grade=rng.choices(GRADE_ORDER, weights=GRADE_WEIGHTS)[0],
+            color=rng.choice(Route.COLOR_CHOICES)[0],
+            date_set=today - timedelta(days=age),
+            area=rng.choice(areas),
+            setter_name=rng.choice(SETTERS),
+            is_active=is_active,
+            archived_on=None if is_active else min(today - timedelta(days=age) + timedelta(days=42), today),
+        ))
+    routes = Route.objects.bulk_create(routes, batch_size=BATCH_SIZE)
+
+    first_number = (Member.objects.aggregate(top=Max('member_number'))['top'] or 0) + 1
+    members = Member.objects.bulk_create([
+        Member(
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=rng.choice(LAST_NAMES),
+            member_number=first_number + i,
+            email=f'member{first_number + i}@example.com',
+        )
+        for i in range(spec.members)
+    ], batch_size=BATCH_SIZE)
+
+    # Each member climbs up to a personal grade, occasionally one above it
+    routes_by_level = [
+        [route for route in routes if GRADE_ORDER.index(route.grade) <= level]
+        for level in range(len(GRADE_ORDER))
+    ]
+    completions = []
+    for member in members:
+        level = min(int(rng.triangular(0, len(GRADE_ORDER), 2)), len(GRADE_ORDER) - 1)
+        candidates = routes_by_level[min(level + 1, len(GRADE_ORDER) - 1)]
+        count = min(_sends_for_member(rng, spec.mean_sends), len(candidates))
+        for route in rng.sample(candidates, count):
+            window = max((today - route.date_set).days, 0)
+            if not route.is_active:
+                window = min(window, 42)  # Archived routes were up for about six weeks
+            completions.append(Completion(
+                member=member,
+                route=route,
+                date_completed=route.date_set + timedelta(days=rng.randint(0, window)),
+                difficulty_rating=rng.randint(1, 5),
+            ))
+    Completion.objects.bulk_create(completions, batch_size=BATCH_SIZE)
+
+    # bulk_create skips the signals that maintain the derived data
+    rebuild_send_counts()
+    for member in members:
+        rebuild_member_stats(member)
+    leaderboards.rebuild()
+    set_history.record_current()
+    take_snapshot()
+    rollup_series(None)
+    search.rebuild()
+    transaction.on_commit(_invalidate_caches)
+
+    return {
+        'areas': len(areas),
+        'routes': len(routes),
+        'members': len(members),
+        'completions': len(completions),
+    }
+
+
+def _invalidate_caches():
+    bump_version(ROUTES_SCOPE)
+    recommendations.invalidate_pool()
+    for kind in ('route', 'member', 'area'):
+        filter_options.invalidate(kind)
+
+
+def clear():
+    """Delete every area, route, member and completion (and the members' users)."""
+    with transaction.atomic():
+        User.objects.filter(member__isnull=False, is_staff=False, is_superuser=False).delete()
+        Member.objects.all().delete()
+        Area.objects.all().delete()
+    _invalidate_caches()
@@ -0,0 +1,22 @@
+"""
+project/test_runner.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Test runner that enforces settings.VIEW_BUDGETS.
+"""
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class BudgetTestRunner(DiscoverRunner):
+    """DiscoverRunner that makes any request over its view budget fail the test."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._enforce_view_budgets = settings.ENFORCE_VIEW_BUDGETS
+        settings.ENFORCE_VIEW_BUDGETS = True
+
+    def teardown_test_environment(self, **kwargs):
+        settings.ENFORCE_VIEW_BUDGETS = self._enforce_view_budgets
+        super().teardown_test_environment(**kwargs)
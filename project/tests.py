@@ -1,3 +1,1368 @@
-from django.test import TestCase
+"""
+project/tests.py
+Author: Michele Bilko (mbilko@bu.edu)
+Central Rock Gym Route Tracking System
+Tests for the Central Rock Gym route tracking application.
+"""
+
+import io
+import json
+import re
+import threading
+import time
+import unittest
+from unittest import mock
+from datetime import date, timedelta
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from .counters import find_drift
+from .database import WriteQueue, configure_connection
+from .forms import RouteForm
+from .models import Member, Area, Route, Completion, MemberStats, LeaderboardEntry, RouteStats, AreaSetHistory, ColdRoute, ColdCompletion
+from .instrumentation import BudgetExceeded
+from .pagination import KeysetPaginator
+from .route_import import export_rows, import_routes
+from .stats import member_summary, rebuild_member_stats
+from .synthetic import DatasetSpec, clear, generate
+from . import analytics, cold_storage, filter_options, session_log, replicas, set_history, leaderboards, live_feed, recommendations, search, setters
+
+
+# Tables that grow with the gym; a full scan of any of these is a regression
+HOT_TABLES = ['project_route', 'project_completion', 'project_member']
+
+# "SCAN <table>" with no "USING ... INDEX" means SQLite reads every row
+FULL_SCAN = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite specific')
+class QueryPlanTests(TestCase):
+    """
+    Run every hot view through the test client, then EXPLAIN QUERY PLAN each
+    SELECT it issued and fail if a hot table is read with a full table scan.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.area = Area.objects.create(name='The Dugout')
+        today = date.today()
+        cls.routes = [
+            Route.objects.create(
+                grade=grade, color='red', date_set=today - timedelta(days=i),
+                area=cls.area, setter_name='Setter', is_active=i % 3 != 0,
+            )
+            for i, (grade, _) in enumerate(Route.GRADE_CHOICES)
+        ]
+        cls.user = User.objects.create_user('admin', 'admin@example.com', 'pw', is_staff=True)
+        cls.member = Member.objects.create(
+            user=cls.user, first_name='Ada', last_name='Admin',
+            member_number=1, email='admin@example.com', is_admin=True,
+        )
+        for route in cls.routes:
+            Completion.objects.create(
+                member=cls.member, route=route, date_completed=today, difficulty_rating=3,
+            )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def capture_selects(self, url):
+        """Request url and return the (sql, params) of every SELECT it ran."""
+        statements = []
+
+        def recorder(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith('SELECT'):
+                statements.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(recorder):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return statements
+
+    def full_scans(self, sql, params):
+        """Return the hot tables a statement reads with a full table scan."""
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = [row[-1] for row in cursor.fetchall()]
+        scans = []
+        for detail in plan:
+            match = FULL_SCAN.match(detail)
+            if match and match.group(1) in HOT_TABLES:
+                scans.append(detail)
+        return scans
+
+    def assertNoFullScans(self, url):
+        for sql, params in self.capture_selects(url):
+            scans = self.full_scans(sql, params)
+            self.assertFalse(scans, f'{url} ran a full table scan ({", ".join(scans)}):\n{sql}')
+
+    def test_home(self):
+        self.assertNoFullScans(reverse('project:home'))
+
+    def test_area_list(self):
+        self.assertNoFullScans(reverse('project:area_list'))
+
+    def test_area_detail(self):
+        self.assertNoFullScans(reverse('project:area_detail', kwargs={'pk': self.area.pk}))
+
+    def test_route_list(self):
+        self.assertNoFullScans(reverse('project:route_list'))
+
+    def test_route_detail(self):
+        self.assertNoFullScans(reverse('project:route_detail', kwargs={'pk': self.routes[0].pk}))
+
+    def test_profile(self):
+        self.assertNoFullScans(reverse('project:profile'))
+
+    def test_member_list(self):
+        self.assertNoFullScans(reverse('project:member_list'))
+
+    def test_admin_dashboard(self):
+        self.assertNoFullScans(reverse('project:admin_dashboard'))
+
+    def test_admin_members(self):
+        self.assertNoFullScans(reverse('project:admin_members'))
+
+    def test_manage_routes(self):
+        url = reverse('project:manage_routes')
+        for filter_type in ['all', 'active', 'archived']:
+            self.assertNoFullScans(f'{url}?filter={filter_type}')
+
+    def test_archived_routes(self):
+        url = reverse('project:archived_routes')
+        self.assertNoFullScans(url)
+        self.assertNoFullScans(f'{url}?area={self.area.pk}')
+
+    def test_cursor_pages(self):
+        """Seeking past a cursor must use the same indexes as the first page."""
+        completion = Completion.objects.order_by('id').first()
+        cursor = KeysetPaginator(Completion.objects.all(), ('-date_completed', '-id'), 20).encode_cursor(
+            'next', completion
+        )
+        self.assertNoFullScans(f"{reverse('project:admin_completions')}?date_range=all&cursor={cursor}")
+        cursor = KeysetPaginator(Route.objects.all(), ('-date_set', '-id'), 20).encode_cursor('prev', self.routes[1])
+        self.assertNoFullScans(f"{reverse('project:route_list')}?cursor={cursor}")
+        self.assertNoFullScans(f"{reverse('project:manage_routes')}?filter=all&cursor={cursor}")
+
+    def test_admin_completions(self):
+        url = reverse('project:admin_completions')
+        self.assertNoFullScans(url)
+        self.assertNoFullScans(f'{url}?date_range=all')
+        self.assertNoFullScans(f'{url}?route={self.routes[1].pk}&date_range=all')
+        self.assertNoFullScans(f'{url}?member={self.member.pk}')
+        self.assertNoFullScans(f'{url}?area={self.area.pk}')
+
+
+class KeysetPaginatorTests(TestCase):
+    """Walk keyset pages forwards and backwards over rows with tied sort keys."""
+
+    @classmethod
+    def setUpTestData(cls):
+        area = Area.objects.create(name='The Bullpen')
+        today = date.today()
+        for i in range(25):
+            Route.objects.create(
+                grade='V1', color='blue', date_set=today - timedelta(days=i // 4),
+                area=area, setter_name='Setter',
+            )
+        cls.queryset = Route.objects.all()
+        cls.expected = list(cls.queryset.order_by('-date_set', '-id').values_list('pk', flat=True))
+
+    def test_forward_and_back(self):
+        paginator = KeysetPaginator(self.queryset, ('-date_set', '-id'), per_page=10)
+        pages = [paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        self.assertEqual([route.pk for page in pages for route in page], self.expected)
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertFalse(pages[0].has_previous())
+
+        back = paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual([route.pk for route in back], self.expected[10:20])
+        first = paginator.get_page(back.previous_cursor)
+        self.assertEqual([route.pk for route in first], self.expected[:10])
+        self.assertFalse(first.has_previous())
+
+    def test_invalid_cursor_gives_first_page(self):
+        paginator = KeysetPaginator(self.queryset, ('-date_set', '-id'), per_page=10)
+        page = paginator.get_page('not-a-cursor')
+        self.assertEqual([route.pk for route in page], self.expected[:10])
+
+    def test_approximate_count(self):
+        paginator = KeysetPaginator(self.queryset, ('-date_set', '-id'), per_page=10, count_limit=20)
+        self.assertEqual(paginator.count, 20)
+        self.assertTrue(paginator.count_is_approximate)
+
+    def test_list_pages_cap_their_count(self):
+        """The "Showing 24 of N" footer never counts a whole table."""
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('project:route_list'))
+        self.assertContains(response, 'Showing 24 of 25')
+        counts = [query['sql'] for query in queries if 'COUNT(' in query['sql']]
+        self.assertTrue(counts)
+        self.assertTrue(all('LIMIT' in sql for sql in counts), counts)
+
+
+class FilterOptionsTests(TestCase):
+    """Cached dropdown options and the typeahead endpoint."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.area = Area.objects.create(name='The Gray Monster')
+        cls.route = Route.objects.create(
+            grade='V2', color='green', date_set=date.today(), area=cls.area, setter_name='Setter',
+        )
+        cls.user = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+        Member.objects.create(first_name='Zoe', last_name='Climber', member_number=7, email='z@example.com')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_options_are_cached_until_a_model_changes(self):
+        self.assertIn((self.route.pk, 'Green Route (V2) - The Gray Monster'), filter_options.get_options('route'))
+        with self.assertNumQueries(0):
+            filter_options.get_options('route')
+        self.area.name = 'The Warning Track'
+        self.area.save()
+        self.assertIn((self.route.pk, 'Green Route (V2) - The Warning Track'), filter_options.get_options('route'))
+
+    def test_typeahead(self):
+        self.client.force_login(self.user)
+        url = reverse('project:admin_filter_options', kwargs={'kind': 'member'})
+        results = self.client.get(url, {'q': 'zo'}).json()['results']
+        self.assertEqual([result['label'] for result in results], ['Zoe Climber (#7)'])
+        self.assertEqual(self.client.get(url, {'q': 'nobody'}).json()['results'], [])
+        missing = reverse('project:admin_filter_options', kwargs={'kind': 'user'})
+        self.assertEqual(self.client.get(missing).status_code, 404)
+
+
+class MemberStatsTests(TestCase):
+    """Incremental MemberStats updates must match a rebuild from scratch."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.area = Area.objects.create(name='The Warning Track')
+        cls.routes = [
+            Route.objects.create(grade=grade, color='pink', date_set=date.today(), area=cls.area, setter_name='Setter')
+            for grade in ['V0', 'V3', 'V3', 'V5']
+        ]
+        cls.member = Member.objects.create(first_name='Sam', last_name='Sender', member_number=42, email='s@example.com')
+
+    def assertMatchesRebuild(self):
+        stats = MemberStats.objects.get(member=self.member)
+        fresh = rebuild_member_stats(self.member)
+        for field in ['first_send', 'last_send', 'grade_counts', 'area_counts', 'daily_sends']:
+            self.assertEqual(getattr(stats, field), getattr(fresh, field), field)
+
+    def test_incremental_updates(self):
+        today = date.today()
+        completions = [
+            Completion.objects.create(
+                member=self.member, route=route, date_completed=today - timedelta(days=20 * i), difficulty_rating=2,
+            )
+            for i, route in enumerate(self.routes)
+        ]
+        self.assertMatchesRebuild()
+        completions[0].delete()
+        completions[-1].delete()
+        self.assertMatchesRebuild()
+
+        self.member.refresh_from_db()
+        summary = member_summary(self.member)
+        self.assertEqual(summary['total_completions'], 2)
+        self.assertEqual(summary['highest_grade'], 'V3')
+        self.assertEqual(summary['grade_counts'], {'V3': 2})
+        self.assertEqual(summary['recent_activity_count'], 1)
+
+    def test_edited_completion(self):
+        """Moving a send to another route (e.g. in the Django admin) moves its counts with it."""
+        first, last = self.routes[0], self.routes[-1]
+        completion = Completion.objects.create(member=self.member, route=first, date_completed=date.today(), difficulty_rating=2)
+        completion.route = last
+        completion.date_completed = date.today() - timedelta(days=40)
+        completion.save()
+        self.assertEqual(
+            list(Route.objects.filter(pk__in=[first.pk, last.pk]).order_by('pk').values_list('send_count', flat=True)), [0, 1]
+        )
+        self.assertEqual(find_drift(), [])
+        self.assertMatchesRebuild()
+        board = sorted(LeaderboardEntry.objects.values_list('period', 'scope', 'sends', 'points', 'top_grade'))
+        leaderboards.rebuild()
+        self.assertEqual(sorted(LeaderboardEntry.objects.values_list('period', 'scope', 'sends', 'points', 'top_grade')), board)
+
+        # Loaded without the send fields, the stored values are read before saving
+        deferred = Completion.objects.only('pk').get(pk=completion.pk)
+        deferred.route_id = first.pk
+        deferred.save()
+        self.assertEqual(Route.objects.get(pk=first.pk).send_count, 1)
+        self.assertEqual(find_drift(), [])
+        self.assertMatchesRebuild()
+
+
+    def test_edited_route(self):
+        """Moving a route to another grade or area (e.g. in the Django admin) moves its sends' counts with it."""
+        other = Area.objects.create(name='The Bullpen')
+        for route in self.routes[1:3]:
+            Completion.objects.create(member=self.member, route=route, date_completed=date.today(), difficulty_rating=2)
+        route = Route.objects.get(pk=self.routes[1].pk)
+        route.area = other
+        route.grade = 'V6'
+        route.save()
+        self.assertEqual([Area.objects.get(pk=pk).send_count for pk in (self.area.pk, other.pk)], [1, 1])
+        self.assertEqual(find_drift(), [])
+        self.assertMatchesRebuild()
+        board = sorted(LeaderboardEntry.objects.values_list('period', 'scope', 'sends', 'points', 'top_grade'))
+        leaderboards.rebuild()
+        self.assertEqual(sorted(LeaderboardEntry.objects.values_list('period', 'scope', 'sends', 'points', 'top_grade')), board)
+
+        # Loaded without the grade and area, the stored values are read before saving
+        deferred = Route.objects.only('pk').get(pk=route.pk)
+        deferred.area_id = self.area.pk
+        deferred.save()
+        self.assertEqual(Area.objects.get(pk=self.area.pk).send_count, 2)
+        self.assertEqual(find_drift(), [])
+        self.assertMatchesRebuild()
+
+
+class SendCounterTests(TestCase):
+    """The send counters follow sends logged, refused and deleted through the views, and can be checked and rebuilt."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+        cls.user = User.objects.create_user('sam', 's@example.com', 'pw')
+        cls.member = Member.objects.create(user=cls.user, first_name='Sam', last_name='Sender', member_number=42, email='s@example.com')
+        cls.area = Area.objects.create(name='The Warning Track')
+        cls.route = Route.objects.create(grade='V3', color='pink', date_set=date.today(), area=cls.area, setter_name='Setter')
+
+    def counts(self):
+        return [model.objects.get(pk=obj.pk).send_count for model, obj in [(Route, self.route), (Member, self.member), (Area, self.area)]]
+
+    def test_logged_and_duplicate_sends(self):
+        self.client.force_login(self.user)
+        url = reverse('project:route_detail', args=[self.route.pk])
+        response = self.client.post(url, {'date_completed': date.today(), 'difficulty_rating': 3})
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+        self.assertEqual(self.counts(), [1, 1, 1])
+
+        # The refused duplicate rolls back its counter updates with it
+        response = self.client.post(url, {'date_completed': date.today(), 'difficulty_rating': 4})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Completion.objects.count(), 1)
+        self.assertEqual(self.counts(), [1, 1, 1])
+        self.assertEqual(find_drift(), [])
+
+    def test_member_delete_cascades(self):
+        Completion.objects.create(member=self.member, route=self.route, date_completed=date.today(), difficulty_rating=3)
+        self.client.force_login(self.staff)
+        response = self.client.post(reverse('project:delete_member', args=[self.member.pk]), {'confirm': 'DELETE'})
+        self.assertRedirects(response, reverse('project:admin_members'), fetch_redirect_response=False)
+        self.assertFalse(Member.objects.filter(pk=self.member.pk).exists() or User.objects.filter(pk=self.user.pk).exists())
+        self.assertEqual(
+            [Route.objects.get(pk=self.route.pk).send_count, Area.objects.get(pk=self.area.pk).send_count], [0, 0]
+        )
+        self.assertFalse(LeaderboardEntry.objects.exists())
+        self.assertEqual(find_drift(), [])
+
+    def test_rebuild_command(self):
+        Completion.objects.create(member=self.member, route=self.route, date_completed=date.today(), difficulty_rating=3)
+        Route.objects.filter(pk=self.route.pk).update(send_count=5)
+
+        out = io.StringIO()
+        with self.assertRaisesMessage(CommandError, '1 counter(s) out of sync'):
+            call_command('rebuild_counters', '--check', stdout=out)
+        self.assertIn(f'Route {self.route.pk}: stored 5, actual 1', out.getvalue())
+
+        call_command('rebuild_counters', stdout=io.StringIO())
+        self.assertEqual(self.counts(), [1, 1, 1])
+        out = io.StringIO()
+        call_command('rebuild_counters', '--check', stdout=out)
+        self.assertIn('All send counters are in sync.', out.getvalue())
+
+
+class PageCacheTests(TestCase):
+    """Cached public pages must change as soon as their data does."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.area = Area.objects.create(name='The Dugout')
+        cls.route = Route.objects.create(
+            name='Green Monster', grade='V4', color='green', date_set=date.today(), area=cls.area, setter_name='Setter',
+        )
+        cls.member = Member.objects.create(first_name='Ann', last_name='Onymous', member_number=3, email='a@example.com')
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_pages_are_cached(self):
+        url = reverse('project:route_list')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertContains(self.client.get(url), 'Green Monster')
+
+    def test_new_send_invalidates_route_pages(self):
+        detail = reverse('project:route_detail', kwargs={'pk': self.route.pk})
+        self.assertContains(self.client.get(reverse('project:route_list')), '<strong>Sends:</strong> 0')
+        self.client.get(detail)
+        Completion.objects.create(member=self.member, route=self.route, date_completed=date.today(), difficulty_rating=4)
+        self.assertContains(self.client.get(reverse('project:route_list')), '<strong>Sends:</strong> 1')
+        self.assertContains(self.client.get(detail), 'Ann Onymous')
+
+    def test_bulk_archive_invalidates_area_pages(self):
+        url = reverse('project:area_detail', kwargs={'pk': self.area.pk})
+        self.assertContains(self.client.get(url), 'Green Monster')
+        self.client.force_login(self.staff)
+        self.client.post(reverse('project:bulk_archive_routes'), {'action': 'archive_area', 'area_id': self.area.pk})
+        self.client.logout()
+        self.assertNotContains(self.client.get(url), 'Green Monster')
+
+
+class RouteImportTests(TestCase):
+    """Route set imports insert valid rows in bulk and report the rest."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.area = Area.objects.create(name='The Dugout')
+        cls.old_route = Route.objects.create(
+            name='Old Problem', grade='V2', color='red', date_set=date.today(), area=cls.area, setter_name='Sue Setter',
+        )
+        User.objects.create_user('sue', 'sue@example.com', 'pw', is_staff=True, first_name='Sue', last_name='Setter')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_reset_area_import(self):
+        today = date.today().isoformat()
+        csv_file = io.StringIO(
+            'area,name,grade,color,date_set,setter_name\n'
+            f'The Dugout,New One,V3,blue,{today},Sue Setter\n'
+            f'{self.area.pk},New Two,V5,green,{today},Sue Setter\n'
+            f'Nowhere,Lost,V1,pink,{today},Sue Setter\n'
+            f'The Dugout,Bad Grade,V99,pink,{today},Sue Setter\n'
+            f'The Dugout,Stranger,V1,pink,{today},Nobody\n'
+        )
+        with self.assertNumQueries(18):  # 7 of them move the area's set history
+            result = import_routes(csv_file, reset_area=True)
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual(result.archived, 1)
+        self.assertEqual([number for number, message in result.errors], [3, 4, 5])
+        self.old_route.refresh_from_db()
+        self.assertFalse(self.old_route.is_active)
+        self.assertEqual(
+            sorted(Route.objects.filter(is_active=True).values_list('name', flat=True)), ['New One', 'New Two'],
+        )
+
+    def test_export_round_trip(self):
+        lines = list(export_rows())
+        self.assertEqual(lines[0].strip(), 'area,name,grade,color,date_set,setter_name')
+        result = import_routes(io.StringIO(''.join(lines)), reset_area=True)
+        self.assertEqual((result.created, result.archived, result.errors), (1, 1, []))
+
+
+class CompletionExportTests(TestCase):
+    """The completion export streams the same rows the admin filters select."""
+
+    @classmethod
+    def setUpTestData(cls):
+        dugout = Area.objects.create(name='The Dugout')
+        bullpen = Area.objects.create(name='The Bullpen')
+        cls.member = Member.objects.create(first_name='Ann', last_name='Onymous', member_number=3, email='a@example.com')
+        for i, area in enumerate([dugout, dugout, bullpen]):
+            route = Route.objects.create(
+                name=f'Route {i}', grade='V2', color='red', date_set=date.today(), area=area, setter_name='Setter',
+            )
+            Completion.objects.create(
+                member=cls.member, route=route, date_completed=date.today() - timedelta(days=100 * i), difficulty_rating=3,
+            )
+        cls.dugout = dugout
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+
+    def export(self, **params):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('project:export_completions'), params)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode().splitlines()
+
+    def test_csv_applies_filters(self):
+        lines = self.export(area=self.dugout.pk, date_range='all')
+        self.assertTrue(lines[0].startswith('completion_id,date_completed'))
+        self.assertEqual([line.split(',')[9] for line in lines[1:]], ['Route 1', 'Route 0'])
+        self.assertEqual(len(self.export()), 2)  # Header and the last 30 days
+
+    def test_ndjson(self):
+        rows = [json.loads(line) for line in self.export(format='ndjson', date_range='all')]
+        self.assertEqual([row['area_name'] for row in rows], ['The Bullpen', 'The Dugout', 'The Dugout'])
+        self.assertEqual(rows[0]['member_number'], 3)
+
+    def test_invalid_filters(self):
+        """Filters are checked before the download starts, so a bad one is a 400 rather than a truncated file."""
+        self.client.force_login(self.staff)
+        for params in [{'date_range': 'abc'}, {'route': 'x'}, {'member': '1.5'}, {'area': '-1'}]:
+            response = self.client.get(reverse('project:export_completions'), params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertFalse(response.streaming)
+            self.assertIn('Invalid', response.json()['error'])
+        self.assertEqual(self.client.get(reverse('project:admin_completions'), {'date_range': 'abc'}).status_code, 400)
+
+
+class ApiTests(TestCase):
+    """The JSON API serves values() rows and answers unchanged polls with 304."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.area = Area.objects.create(name='The Dugout')
+        cls.route = Route.objects.create(
+            name='Green Monster', grade='V4', color='green', date_set=date.today(), area=cls.area, setter_name='Setter',
+        )
+        cls.member = Member.objects.create(first_name='Ann', last_name='Onymous', member_number=3, email='a@example.com')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_field_selection_and_compact(self):
+        url = reverse('project:api_route_list')
+        data = self.client.get(url, {'fields': 'name,area_name'}).json()
+        self.assertEqual(data['results'], [{'name': 'Green Monster', 'area_name': 'The Dugout'}])
+        data = self.client.get(url, {'fields': 'id,grade', 'compact': '1'}).json()
+        self.assertEqual(data['fields'], ['id', 'grade'])
+        self.assertEqual(data['results'], [[self.route.pk, 'V4']])
+        self.assertEqual(self.client.get(url, {'fields': 'password'}).status_code, 400)
+
+    def test_conditional_get(self):
+        url = reverse('project:api_route_detail', kwargs={'pk': self.route.pk})
+        response = self.client.get(url)
+        self.assertEqual(response.json()['recent_completions'], [])
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Completion.objects.create(member=self.member, route=self.route, date_completed=date.today(), difficulty_rating=4)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['send_count'], 1)
+        self.assertEqual(response.json()['recent_completions'][0]['member_first_name'], 'Ann')
+
+    def test_completions_for_members_only(self):
+        url = reverse('project:api_completion_list')
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+        Completion.objects.create(member=self.member, route=self.route, date_completed=date.today(), difficulty_rating=4)
+        user = User.objects.create_user('ann', 'a@example.com', 'pw')
+        self.client.force_login(user)
+        response = self.client.get(url)
+        self.assertEqual(response.json()['results'][0]['member_first_name'], 'Ann')
+        self.assertIn('private', response['Cache-Control'])
+
+        # A renamed member is a change to every list showing their sends
+        self.member.first_name = 'Anne'
+        self.member.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['member_first_name'], 'Anne')
+
+
+class RequestMetricsTests(TestCase):
+    """Every response is measured, and views over budget fail under the test runner."""
+
+    @classmethod
+    def setUpTestData(cls):
+        area = Area.objects.create(name='The Dugout')
+        Route.objects.create(grade='V1', color='red', date_set=date.today(), area=area, setter_name='Setter')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing(self):
+        response = self.client.get(reverse('project:route_list'))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+, total;dur=[\d.]+$')
+
+    def test_budget_overrun_fails(self):
+        budgets = {'project:route_list': {'queries': 0}}
+        with self.settings(VIEW_BUDGETS=budgets, ENFORCE_VIEW_BUDGETS=True):
+            with self.assertLogs('project.performance', 'WARNING') as logs:
+                with self.assertRaisesMessage(BudgetExceeded, 'project:route_list (GET /routes/) over budget: queries 1 > 0'):
+                    self.client.get(reverse('project:route_list'))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record['view'], record['over_budget']), ('project:route_list', ['queries 1 > 0']))
+
+
+class SyntheticDataTests(TestCase):
+    """The synthetic dataset is reproducible and leaves no derived data stale."""
+
+    def test_generate(self):
+        spec = DatasetSpec(seed=3, areas=2, active_routes=10, archived_routes=20, members=15, mean_sends=4)
+        created = generate(spec)
+        self.assertEqual(created['routes'], 30)
+        self.assertEqual(Route.objects.filter(is_active=False).count(), 20)
+        self.assertEqual(Completion.objects.count(), created['completions'])
+        self.assertEqual(find_drift(), [])
+        self.assertEqual(MemberStats.objects.count(), 15)
+
+        first = list(Completion.objects.order_by('pk').values_list('member__member_number', 'route__name', 'date_completed'))
+        clear()
+        generate(spec)
+        second = list(Completion.objects.order_by('pk').values_list('member__member_number', 'route__name', 'date_completed'))
+        self.assertEqual(first, second)
+
+
+class SetterRosterTests(TestCase):
+    """The setter roster is cached and rebuilt only when a setter changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('sue', 'sue@example.com', 'pw', is_staff=True, first_name='Sue', last_name='Setter')
+        User.objects.create_user('rob', 'rob@example.com', 'pw', is_staff=True)
+        cls.member = Member.objects.create(first_name='Sue', last_name='Setter', member_number=1, email='s@example.com', is_admin=True)
+        Member.objects.create(first_name='Kim', last_name='Crimp', member_number=2, email='k@example.com', is_admin=True)
+        Member.objects.create(first_name='Not', last_name='Setter', member_number=3, email='n@example.com')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_roster(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(setters.get_roster(), ['Kim Crimp', 'Sue Setter', 'rob'])
+        with self.assertNumQueries(0):
+            RouteForm()
+
+    def test_invalidation(self):
+        setters.get_roster()
+        self.staff.last_login = timezone.now()
+        self.staff.save(update_fields=['last_login'])
+        self.member.email = 'sue@example.com'
+        self.member.save()
+        with self.assertNumQueries(0):
+            setters.get_roster()
+
+        self.member.is_admin = False
+        self.member.save()
+        self.staff.first_name = 'Susan'
+        self.staff.save()
+        self.assertEqual(setters.get_roster(), ['Kim Crimp', 'Susan Setter', 'rob'])
+
+
+class GymRoleTests(TestCase):
+    """The member and admin role are resolved with the user, once per request."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+        cls.user = User.objects.create_user('ada', 'ada@example.com', 'pw')
+        Member.objects.create(user=cls.user, first_name='Ada', last_name='Admin', member_number=1, email='a@example.com', is_admin=True)
+
+    def test_member_admin_can_see_member_list(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('project:member_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.wsgi_request.member.first_name, 'Ada')
+        self.assertTrue(response.wsgi_request.is_gym_admin)
+
+    def test_missing_member_is_not_looked_up_again(self):
+        self.client.force_login(self.staff)
+        # Session and user (with its member joined), then the page itself
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('project:admin_filter_options', kwargs={'kind': 'area'}))
+        self.assertIsNone(response.wsgi_request.member)
+
+
+class SearchTests(TestCase):
+    """Member and route search is ranked, prefix-matching and kept current by signals."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dugout = Area.objects.create(name='The Dugout')
+        cls.crimpy = Route.objects.create(
+            name='Crimp City', grade='V4', color='blue', date_set=date.today(), area=cls.dugout, setter_name='Sue Setter',
+        )
+        cls.slab = Route.objects.create(
+            name='Slab Story', grade='V1', color='green', date_set=date.today(), area=cls.dugout, setter_name='Crimpson Rob',
+        )
+        cls.sam = Member.objects.create(first_name='Sam', last_name='Sender', member_number=1042, email='sam@example.com')
+        Member.objects.create(first_name='Samantha', last_name='Stone', member_number=7, email='st@example.com')
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+
+    def test_route_search(self):
+        self.assertEqual(search.search_routes('crimp'), [self.crimpy, self.slab])  # Name outranks setter
+        self.assertEqual(search.search_routes('dug v1'), [self.slab])
+        self.slab.is_active = False
+        self.slab.save()
+        self.assertEqual(search.search_routes('dug v1'), [])
+        self.assertEqual(search.search_routes('dug v1', active_only=False), [self.slab])
+
+    def test_index_follows_changes(self):
+        self.dugout.name = 'The Bullpen'
+        self.dugout.save()
+        self.assertEqual(len(search.search_routes('bull')), 2)
+        self.sam.delete()
+        self.assertEqual([m.first_name for m in search.search_members('sam')], ['Samantha'])
+
+    def test_prefix_fallback_without_fts(self):
+        with mock.patch.object(search, 'fts_available', return_value=False):
+            self.assertEqual(search.search_routes('crimp'), [self.slab, self.crimpy])  # Newest first
+            self.assertEqual(search.search_members('1042'), [self.sam])
+            self.assertEqual(len(search.search_members('sam')), 2)
+
+    def test_admin_member_search(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('project:admin_members'), {'search': '104'})
+        self.assertEqual(list(response.context['members']), [self.sam])
+        response = self.client.get(reverse('project:route_search'), {'q': 'slab'})
+        self.assertContains(response, 'Slab Story')
+
+
+class AsyncViewTests(TestCase):
+    """The async public pages work under ASGI, with their queries still measured."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ann', 'ann@example.com', 'pw')
+        cls.member = Member.objects.create(user=cls.user, first_name='Ann', last_name='Climber', member_number=1, email='a@example.com')
+        cls.area = Area.objects.create(name='The Dugout')
+        cls.route = Route.objects.create(grade='V2', color='red', date_set=date.today(), area=cls.area, setter_name='Setter')
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_public_pages(self):
+        for url in [
+            reverse('project:home'),
+            reverse('project:area_list'),
+            reverse('project:area_detail', args=[self.area.pk]),
+            reverse('project:route_detail', args=[self.route.pk]),
+        ]:
+            response = await self.async_client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertRegex(response['Server-Timing'], r'desc="[1-9]\d* queries"')
+        response = await self.async_client.get(reverse('project:area_detail', args=[self.area.pk + 100]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_member_pages(self):
+        response = await self.async_client.get(reverse('project:profile'))
+        self.assertRedirects(response, f"{reverse('project:login')}?next={reverse('project:profile')}", fetch_redirect_response=False)
+
+        await sync_to_async(self.async_client.force_login)(self.user)
+        url = reverse('project:route_detail', args=[self.route.pk])
+        response = await self.async_client.post(url, {'date_completed': date.today(), 'difficulty_rating': 4})
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+        self.assertEqual(await Completion.objects.filter(member=self.member).acount(), 1)
+
+        response = await self.async_client.get(url)
+        self.assertTrue(response.context['user_has_completed'])
+        response = await self.async_client.get(reverse('project:profile'))
+        self.assertEqual(response.context['total_completions'], 1)
+
+
+class LiveFeedTests(TestCase):
+    """Committed sends and route changes reach live feed clients through the event bus."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = Member.objects.create(first_name='Ann', last_name='Climber', member_number=1, email='a@example.com')
+        cls.area = Area.objects.create(name='The Dugout')
+        cls.route = Route.objects.create(name='Slab', grade='V2', color='red', date_set=date.today(), area=cls.area, setter_name='Setter')
+
+    def log_send(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Completion.objects.create(member=self.member, route=self.route, date_completed=date.today(), difficulty_rating=3)
+
+    def test_published_after_commit(self):
+        start = live_feed.bus.last_id
+        with self.captureOnCommitCallbacks() as callbacks:
+            Completion.objects.create(member=self.member, route=self.route, date_completed=date.today(), difficulty_rating=3)
+            Route.objects.filter(pk=self.route.pk).set_active(False)
+        self.assertEqual(live_feed.bus.since(start), [])
+
+        for callback in callbacks:
+            callback()
+        send, archived = live_feed.bus.since(start)
+        self.assertEqual((send.type, send.data['member'], send.data['route']), ('send', 'Ann Climber', 'Slab (V2)'))
+        self.assertEqual(archived.data, {'action': 'archived', 'routes': [{'id': self.route.pk, 'area_id': self.area.pk}]})
+
+    def test_wsgi_response_carries_missed_events(self):
+        response = self.client.get(reverse('project:live_feed'))
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertNotIn('event:', body)
+        last_id = re.search(r'^id: (\d+)$', body, re.M).group(1)
+
+        self.log_send()
+        response = self.client.get(reverse('project:live_feed'), HTTP_LAST_EVENT_ID=last_id)
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('event: send\n', body)
+        self.assertIn('"member": "Ann Climber"', body)
+
+    async def test_asgi_stream(self):
+        response = await self.async_client.get(reverse('project:live_feed'))
+        stream = response.streaming_content
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+        self.assertTrue((await anext(stream)).startswith(b'id:'))
+
+        await sync_to_async(self.log_send)()
+        event = await anext(stream)
+        self.assertTrue(event.startswith(b'id: '))
+        self.assertIn(b'event: send\n', event)
+        await stream.aclose()
+
+
+class LeaderboardTests(TestCase):
+    """Leaderboard entries follow every logged and removed send and match a full rebuild."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dugout = Area.objects.create(name='The Dugout')
+        cls.bullpen = Area.objects.create(name='The Bullpen')
+        cls.easy = Route.objects.create(grade='V1', color='red', date_set=date(2026, 1, 1), area=cls.dugout, setter_name='Setter')
+        cls.hard = Route.objects.create(grade='V5', color='blue', date_set=date(2026, 1, 1), area=cls.bullpen, setter_name='Setter')
+        cls.other = Route.objects.create(grade='V1', color='green', date_set=date(2026, 1, 1), area=cls.dugout, setter_name='Setter')
+        cls.ann, cls.bob, cls.cat = [
+            Member.objects.create(first_name=name, last_name='Climber', member_number=i, email=f'{name}@example.com')
+            for i, name in enumerate(['Ann', 'Bob', 'Cat'], start=1)
+        ]
+
+    def send(self, member, route, day=date(2026, 3, 5)):
+        return Completion.objects.create(member=member, route=route, date_completed=day, difficulty_rating=3)
+
+    def entries(self):
+        return sorted(LeaderboardEntry.objects.values_list('member_id', 'period', 'scope', 'sends', 'points', 'top_grade'))
+
+    def test_rankings(self):
+        self.send(self.ann, self.easy)
+        self.send(self.ann, self.other, day=date(2026, 2, 1))
+        self.send(self.bob, self.hard)
+        self.send(self.cat, self.easy)
+        self.send(self.cat, self.other)
+
+        sends = leaderboards.top('sends')
+        self.assertEqual([(rank, entry.member.first_name) for rank, entry in sends], [(1, 'Ann'), (1, 'Cat'), (3, 'Bob')])
+        self.assertEqual([entry.member for rank, entry in leaderboards.top('grade')][0], self.bob)
+        self.assertEqual(leaderboards.rank_of(self.cat, 'points')[0], 2)
+
+        # March only: Ann's February send doesn't count
+        self.assertEqual(leaderboards.rank_of(self.ann, 'sends', period='2026-03')[0], 2)
+        self.assertIsNone(leaderboards.rank_of(self.bob, 'sends', scope=self.dugout.pk))
+
+        with self.assertNumQueries(2):
+            leaderboards.rank_of(self.ann, 'grade', scope=self.dugout.pk)
+
+    def test_removals_match_rebuild(self):
+        self.send(self.ann, self.easy)
+        hard = self.send(self.ann, self.hard)
+        self.send(self.bob, self.other)
+        hard.delete()
+        self.bob.delete()
+
+        ann = LeaderboardEntry.objects.get(member=self.ann, period='all', scope=LeaderboardEntry.GYM)
+        self.assertEqual((ann.sends, ann.hardest_grade), (1, 'V1'))
+        self.assertFalse(LeaderboardEntry.objects.filter(scope=self.bullpen.pk).exists())
+
+        incremental = self.entries()
+        leaderboards.rebuild()
+        self.assertEqual(self.entries(), incremental)
+
+    def test_view(self):
+        user = User.objects.create_user('ann', 'ann@example.com', 'pw')
+        self.ann.user = user
+        self.ann.save()
+        self.send(self.ann, self.hard)
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('project:leaderboards'), {'board': 'grade', 'period': 'all', 'area': self.bullpen.pk})
+        self.assertContains(response, 'Your rank:</strong> #1')
+        self.assertContains(response, 'Hardest grade:</strong> V5')
+
+
+class RecommendationTests(TestCase):
+    """Suggestions sit around the member's working grade, skip sent routes and stay current from cache."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dugout = Area.objects.create(name='The Dugout')
+        cls.bullpen = Area.objects.create(name='The Bullpen')
+        cls.user = User.objects.create_user('ann', 'ann@example.com', 'pw')
+        cls.member = Member.objects.create(user=cls.user, first_name='Ann', last_name='Climber', member_number=1, email='a@example.com')
+        cls.routes = {}
+        for name, grade, area, day in [
+            ('Sent one', 'V1', cls.dugout, 1), ('Sent two', 'V1', cls.dugout, 2),
+            ('Next up', 'V2', cls.dugout, 3), ('Newer next', 'V2', cls.dugout, 4), ('Same grade', 'V1', cls.dugout, 5),
+            ('Other area', 'V2', cls.bullpen, 6), ('Too hard', 'V5', cls.dugout, 7),
+        ]:
+            cls.routes[name] = Route.objects.create(
+                name=name, grade=grade, color='red', date_set=date(2026, 1, day), area=area, setter_name='Setter'
+            )
+        for name in ['Sent one', 'Sent two']:
+            Completion.objects.create(member=cls.member, route=cls.routes[name], date_completed=date(2026, 2, 1), difficulty_rating=1)
+
+    def setUp(self):
+        cache.clear()
+
+    def names(self, **kwargs):
+        return [route['label'] for route in recommendations.for_member(self.member, **kwargs)]
+
+    def test_suggestions(self):
+        # Easy V1 sends: aim at V2, then V1 and V3, only in the area climbed so far
+        self.assertEqual(self.names(), ['Newer next (V2)', 'Next up (V2)', 'Same grade (V1)'])
+        with self.assertNumQueries(0):  # The pool and profile are cached
+            self.assertEqual(self.names(exclude={self.routes['Newer next'].pk}), ['Next up (V2)', 'Same grade (V1)'])
+
+    def test_kept_current(self):
+        self.names()
+        with self.captureOnCommitCallbacks(execute=True):
+            Completion.objects.create(member=self.member, route=self.routes['Newer next'], date_completed=date(2026, 2, 2), difficulty_rating=4)
+        self.assertEqual(self.names(), ['Next up (V2)', 'Same grade (V1)'])
+
+        self.routes['Next up'].is_active = False
+        self.routes['Next up'].save()
+        Route.objects.create(name='Fresh', grade='V2', color='blue', date_set=date(2026, 3, 1), area=self.dugout, setter_name='Setter')
+        self.assertEqual(self.names(), ['Fresh (V2)', 'Same grade (V1)'])
+
+    def test_pages(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('project:profile'))
+        self.assertContains(response, 'Routes for You')
+        response = self.client.get(reverse('project:route_detail', args=[self.routes['Next up'].pk]))
+        self.assertEqual([route['label'] for route in response.context['recommendations']], ['Newer next (V2)', 'Same grade (V1)'])
+
+
+class RouteStatsTests(TestCase):
+    """The batch stats match the completions, flag routes against their grade peers and show on the route pages."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dugout = Area.objects.create(name='The Dugout')
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+        members = [
+            Member.objects.create(first_name=f'M{i}', last_name='Climber', member_number=i, email=f'm{i}@example.com')
+            for i in range(3)
+        ]
+        cls.routes = {}
+        for name, ratings in [('Soft', [1, 1, 2]), ('Even', [3, 3, 3]), ('Hard', [5, 5, 4]), ('Unrated', [])]:
+            route = Route.objects.create(
+                name=name, grade='V3', color='red', date_set=date(2026, 3, 1), area=cls.dugout, setter_name='Setter'
+            )
+            for member, rating in zip(members, ratings):
+                Completion.objects.create(member=member, route=route, date_completed=date(2026, 3, 2), difficulty_rating=rating)
+            cls.routes[name] = route
+
+    def test_compute(self):
+        self.assertEqual(analytics.compute_route_stats(today=date(2026, 3, 10)), 4)
+        stats = {route_stats.route.name: route_stats for route_stats in RouteStats.objects.select_related('route')}
+        hard = stats['Hard']
+        self.assertEqual(hard.sends, 3)
+        self.assertAlmostEqual(hard.sends_per_day, 0.3)  # Ten days since it was set
+        self.assertAlmostEqual(hard.rating_mean, 14 / 3)
+        self.assertAlmostEqual(hard.rating_variance, 2 / 9)
+        self.assertEqual({name: route_stats.grade_feel for name, route_stats in stats.items()}, {
+            'Soft': RouteStats.SOFT, 'Even': '', 'Hard': RouteStats.HARD, 'Unrated': '',
+        })
+        self.assertEqual(stats['Unrated'].sends, 0)
+        self.assertIsNone(stats['Unrated'].rating_mean)
+
+        # Recomputing replaces the rows
+        analytics.compute_route_stats(today=date(2026, 3, 10))
+        self.assertEqual(RouteStats.objects.count(), 4)
+
+    def test_pages(self):
+        analytics.compute_route_stats(today=date(2026, 3, 10))
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('project:manage_routes'))
+        self.assertContains(response, 'Hard for the grade')
+        self.assertContains(response, 'Soft for the grade')
+        response = self.client.get(reverse('project:route_detail', args=[self.routes['Hard'].pk]))
+        self.assertContains(response, 'Route Stats')
+        self.assertContains(response, '4.7 / 5')
+
+
+class DatabaseTuningTests(TestCase):
+    """The production pragmas reach new connections, and the write queue coalesces concurrent writes."""
+
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -4000, 'busy_timeout': 1234})
+    def test_pragmas(self):
+        configure_connection(connection)
+        with connection.cursor() as cursor:
+            self.assertEqual(cursor.execute('PRAGMA cache_size').fetchone()[0], -4000)
+            self.assertEqual(cursor.execute('PRAGMA busy_timeout').fetchone()[0], 1234)
+
+    def submit_in_threads(self, queue, funcs):
+        """Submit each func from its own thread; returns {index: result or exception}."""
+        outcomes = {}
+
+        def submit(index, func):
+            try:
+                outcomes[index] = queue.submit(func)
+            except Exception as error:
+                outcomes[index] = error
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=submit, args=(index, func)) for index, func in enumerate(funcs)]
+        for thread in threads:
+            thread.start()
+        return threads, outcomes
+
+    def test_group_commit(self):
+        queue = WriteQueue()
+        committing = threading.Event()
+        release = threading.Event()
+
+        def slow():
+            committing.set()
+            release.wait(5)
+            return 'first'
+
+        def fail():
+            raise IntegrityError('duplicate')
+
+        # Three writes queue up behind one being committed...
+        first, outcomes = self.submit_in_threads(queue, [slow])
+        self.assertTrue(committing.wait(5))
+        rest, rest_outcomes = self.submit_in_threads(queue, [threading.get_ident, fail, threading.get_ident])
+        for i in range(500):
+            if queue.pending == 3:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(queue.pending, 3)
+        release.set()
+        for thread in first + rest:
+            thread.join(5)
+
+        # ...and are then committed together by one thread; the failure only raises in its own
+        self.assertEqual(outcomes[0], 'first')
+        self.assertIsInstance(rest_outcomes[1], IntegrityError)
+        self.assertEqual(rest_outcomes[0], rest_outcomes[2])
+
+    def test_inside_transaction(self):
+        # Already in a transaction (as every TestCase is): run in place
+        self.assertEqual(WriteQueue().submit(threading.get_ident), threading.get_ident())
+
+
+class ReplicaTests(TransactionTestCase):
+    """
+    Reporting views read from a current replica, except right after the user's own writes.
+    The test replica mirrors the test database through a second connection, which only
+    sees committed rows, hence TransactionTestCase.
+    """
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+        dugout = Area.objects.create(name='The Dugout')
+        self.route = Route.objects.create(grade='V1', color='red', date_set=date(2026, 1, 1), area=dugout, setter_name='Setter')
+        self.client.force_login(self.staff)
+
+    def read_queries(self, url):
+        """(replica queries, primary queries) of one GET."""
+        with CaptureQueriesContext(connections['replica']) as replica, CaptureQueriesContext(connection) as primary:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(replica), len(primary)
+
+    def test_routing(self):
+        url = reverse('project:archived_routes')
+        with mock.patch.object(replicas, 'snapshot_time', return_value=None):
+            self.assertEqual(self.read_queries(url)[0], 0)  # No snapshot yet
+
+        with mock.patch.object(replicas, 'snapshot_time', return_value=time.time() - 60):
+            self.assertGreater(self.read_queries(url)[0], 0)
+
+            # Writes stay on the primary and pin the writer to it
+            self.client.post(reverse('project:bulk_archive_routes'), {'action': 'archive_selected', 'route_ids': [self.route.pk]})
+            self.assertEqual(self.read_queries(url)[0], 0)
+            self.assertFalse(Route.objects.get(pk=self.route.pk).is_active)
+
+        with mock.patch.object(replicas, 'snapshot_time', return_value=time.time() - settings.REPLICA_MAX_LAG - 1):
+            cache.clear()
+            self.assertEqual(self.read_queries(url)[0], 0)  # Too stale
+
+    def test_streamed_export(self):
+        with mock.patch.object(replicas, 'snapshot_time', return_value=time.time() - 60):
+            with CaptureQueriesContext(connections['replica']) as replica:
+                response = self.client.get(reverse('project:export_routes'))
+                body = b''.join(response.streaming_content)
+        self.assertIn(b'V1', body)
+        self.assertGreater(len(replica), 0)
+
+    def test_async_streamed_export(self):
+        """Under ASGI the export streams from an async iterator, still produced on the replica."""
+        async def download():
+            await sync_to_async(self.async_client.force_login)(self.staff)
+            response = await self.async_client.get(reverse('project:export_routes'))
+            self.assertTrue(response.is_async)
+            return b''.join([chunk async for chunk in response.streaming_content])
+
+        with mock.patch.object(replicas, 'snapshot_time', return_value=time.time() - 60):
+            with CaptureQueriesContext(connections['replica']) as replica:
+                body = async_to_sync(download)()
+        self.assertIn(b'V1', body)
+        self.assertGreater(len(replica), 0)
+
+    def test_search_on_replica(self):
+        """A replica-routed view ranks search results on the replica, where it loads them from."""
+        search.fts_available()
+
+        def report(request):
+            self.assertEqual(search.search_routes('red'), [self.route])
+            return mock.Mock(streaming=False)
+
+        with CaptureQueriesContext(connections['replica']) as replica, CaptureQueriesContext(connection) as primary:
+            replicas._read_from(replicas.REPLICA, report, mock.Mock(method='GET'))
+        self.assertEqual((len(replica), len(primary)), (2, 0))
+
+    def test_shared_cache_built_on_primary(self):
+        """Option lists cached during a replica read come from the primary, so no stale list outlives the lag."""
+        def report(request):
+            filter_options.get_options('route')
+            return mock.Mock(streaming=False)
+
+        with CaptureQueriesContext(connections['replica']) as replica:
+            replicas._read_from(replicas.REPLICA, report, mock.Mock(method='GET'))
+        self.assertEqual(len(replica), 0)
+        self.assertEqual(filter_options.get_options('route'), [(self.route.pk, 'Red Route (V1) - The Dugout')])
+
+
+class SetHistoryTests(TestCase):
+    """Each area's set history follows every route change, and the planner ranks areas from it alone."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+        cls.dugout = Area.objects.create(name='The Dugout')
+        cls.bullpen = Area.objects.create(name='The Bullpen')
+
+    def setUp(self):
+        self.today = timezone.localdate()
+
+    def route(self, area, grade, days_ago):
+        return Route.objects.create(
+            grade=grade, color='red', date_set=self.today - timedelta(days=days_ago), area=area, setter_name='Setter'
+        )
+
+    def today_entry(self, area):
+        return AreaSetHistory.objects.get(area=area, day=self.today)
+
+    def test_follows_route_changes(self):
+        old = self.route(self.dugout, 'V1', 60)
+        new = self.route(self.dugout, 'V3', 5)
+        entry = self.today_entry(self.dugout)
+        self.assertEqual((entry.active_routes, entry.grade_counts, entry.oldest_set), (2, {'V1': 1, 'V3': 1}, old.date_set))
+        self.assertEqual(entry.routes_set, 2)
+
+        # Bulk archive goes through QuerySet.update(); the oldest route moves on
+        Route.objects.filter(pk=old.pk).set_active(False)
+        entry = self.today_entry(self.dugout)
+        self.assertEqual((entry.active_routes, entry.grade_counts, entry.oldest_set), (1, {'V3': 1}, new.date_set))
+        self.assertEqual(entry.routes_archived, 1)
+
+        # Regrading in place is no setting activity; moving areas is
+        new.grade = 'V4'
+        new.save()
+        entry = self.today_entry(self.dugout)
+        self.assertEqual((entry.grade_counts, entry.routes_set), ({'V4': 1}, 2))
+        new.area = self.bullpen
+        new.save()
+        self.assertEqual(self.today_entry(self.dugout).active_routes, 0)
+        self.assertEqual(self.today_entry(self.bullpen).grade_counts, {'V4': 1})
+
+        new.delete()
+        self.assertEqual(self.today_entry(self.bullpen).active_routes, 0)
+        self.dugout.delete()  # Its history goes with it
+        self.assertFalse(AreaSetHistory.objects.filter(area_id=self.dugout.pk).exists())
+
+    def test_carries_forward(self):
+        self.route(self.dugout, 'V1', 30)
+        AreaSetHistory.objects.filter(area=self.dugout).update(day=self.today - timedelta(days=10))
+        self.route(self.dugout, 'V2', 0)
+        days = AreaSetHistory.objects.filter(area=self.dugout).order_by('day').values_list('day', 'active_routes', 'routes_set')
+        self.assertEqual(list(days), [(self.today - timedelta(days=10), 1, 1), (self.today, 2, 1)])
+
+    def test_planner(self):
+        for grade in ['VB', 'V0', 'V1', 'V2', 'V3', 'V4', 'V5']:
+            self.route(self.bullpen, grade, 20)
+        self.route(self.dugout, 'V1', 10)  # Fresher, but missing six grades
+        with self.assertNumQueries(3):
+            plans = set_history.area_plans()
+        self.assertEqual([plan.area for plan in plans], [self.dugout, self.bullpen])
+        self.assertEqual(plans[0].gaps, ['VB', 'V0', 'V2', 'V3', 'V4', 'V5'])
+        self.assertEqual((plans[0].score, plans[1].score), (10 + 6 * set_history.GAP_DAYS, 20))
+        self.assertEqual(plans[1].series[-1][1], 7)
+        self.assertEqual(plans[1].days_since_set, 0)
+
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('project:reset_planner'))
+        self.assertContains(response, 'Missing:</strong> VB, V0, V2, V3, V4, V5')
+
+
+class ColdStorageTests(TestCase):
+    """Long-archived routes move to cold storage with their sends, still counted, and come back intact."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+        cls.area = Area.objects.create(name='The Cave')
+        cls.member = Member.objects.create(first_name='Al', last_name='Crux', member_number=1, email='al@example.com')
+        today = timezone.localdate()
+        cls.old = Route.objects.create(
+            name='Relic', grade='V4', color='blue', date_set=today - timedelta(days=400), area=cls.area, setter_name='Setter'
+        )
+        cls.recent = Route.objects.create(grade='V2', color='red', date_set=today - timedelta(days=30), area=cls.area, setter_name='Setter')
+        cls.active = Route.objects.create(grade='V1', color='green', date_set=today, area=cls.area, setter_name='Setter')
+        for route, days_ago, rating in [(cls.old, 390, 2), (cls.recent, 20, 3), (cls.active, 0, 4)]:
+            Completion.objects.create(
+                member=cls.member, route=route, date_completed=today - timedelta(days=days_ago), difficulty_rating=rating
+            )
+        Route.objects.filter(pk__in=[cls.old.pk, cls.recent.pk]).set_active(False)
+        Route.objects.filter(pk=cls.old.pk).update(archived_on=today - timedelta(days=365))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_archiving_is_dated(self):
+        self.assertEqual(Route.objects.get(pk=self.recent.pk).archived_on, timezone.localdate())
+        self.active.is_active = False
+        self.active.save()
+        self.assertEqual(self.active.archived_on, timezone.localdate())
+        Route.objects.filter(pk=self.recent.pk).set_active(True)
+        self.assertIsNone(Route.objects.get(pk=self.recent.pk).archived_on)
+
+    def test_freeze_and_thaw(self):
+        stats = rebuild_member_stats(self.member)
+        board = sorted(LeaderboardEntry.objects.values_list('period', 'scope', 'sends', 'points', 'top_grade'))
+
+        self.assertEqual(cold_storage.freeze(), 1)
+        self.assertFalse(Route.objects.filter(pk=self.old.pk).exists())
+        self.assertEqual(Completion.objects.filter(member=self.member).count(), 2)
+        cold = ColdRoute.objects.get(pk=self.old.pk)
+        self.assertEqual((cold.name, cold.send_count, cold.average_rating), ('Relic', 1, 2))
+        self.assertEqual(ColdCompletion.objects.get().route, cold)
+
+        # Moving sends is not removing them: totals and their rebuilds still count the frozen send
+        self.assertEqual(Member.objects.get(pk=self.member.pk).send_count, 3)
+        self.assertEqual(find_drift(), [])
+        rebuilt = rebuild_member_stats(self.member)
+        self.assertEqual((rebuilt.grade_counts, rebuilt.first_send), (stats.grade_counts, stats.first_send))
+        leaderboards.rebuild()
+        self.assertEqual(sorted(LeaderboardEntry.objects.values_list('period', 'scope', 'sends', 'points', 'top_grade')), board)
+
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('project:archived_routes'))
+        self.assertContains(response, 'Relic')
+        self.assertEqual(response.context['total_cold'], 1)
+
+        self.client.post(reverse('project:bulk_archive_routes'), {'action': 'thaw_selected', 'cold_route_ids': [self.old.pk]})
+        route = Route.objects.get(pk=self.old.pk)
+        self.assertEqual((route.name, route.is_active, route.send_count), ('Relic', True, 1))
+        self.assertEqual(route.completions.get().difficulty_rating, 2)
+        self.assertFalse(ColdRoute.objects.exists() or ColdCompletion.objects.exists())
+        self.assertEqual(find_drift(), [])
+
+    def board(self):
+        return sorted(LeaderboardEntry.objects.values_list('member_id', 'period', 'scope', 'sends', 'points', 'top_grade'))
+
+    def test_member_delete_uncounts(self):
+        cold_storage.freeze()
+        self.member.delete()
+        self.assertEqual(Area.objects.get(pk=self.area.pk).send_count, 0)
+        self.assertEqual(ColdRoute.objects.get(pk=self.old.pk).send_count, 0)
+        self.assertFalse(LeaderboardEntry.objects.exists())
+
+    def test_area_delete_uncounts(self):
+        other = Area.objects.create(name='The Slab')
+        Completion.objects.create(
+            member=self.member, date_completed=timezone.localdate(), difficulty_rating=3,
+            route=Route.objects.create(grade='V0', color='pink', date_set=timezone.localdate(), area=other, setter_name='Setter'),
+        )
+        rebuild_member_stats(self.member)
+        cold_storage.freeze()
+        self.area.delete()
+
+        self.assertEqual(Member.objects.get(pk=self.member.pk).send_count, 1)
+        stats = MemberStats.objects.get(member=self.member)
+        self.assertEqual((stats.grade_counts, stats.area_counts), ({'V0': 1}, {str(other.pk): 1}))
+        self.assertEqual(stats.first_send, timezone.localdate())
+        gym = LeaderboardEntry.objects.get(member=self.member, period=leaderboards.ALL_TIME, scope=leaderboards.GYM)
+        self.assertEqual((gym.sends, gym.top_grade), (1, leaderboards.grade_rank('V0')))
+        board = self.board()
+        leaderboards.rebuild()
+        self.assertEqual(self.board(), board)
+
+
+class SessionLogTests(TestCase):
+    """A session check-out logs many sends at once, with the same side effects as logging them one by one."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('climber', 'c@example.com', 'pw')
+        cls.member = Member.objects.create(user=cls.user, first_name='Cy', last_name='Crimp', member_number=1, email='c@example.com')
+        cls.area = Area.objects.create(name='The Cave')
+        cls.routes = [
+            Route.objects.create(grade=grade, color='red', date_set=date(2024, 1, 1), area=cls.area, setter_name='Setter')
+            for grade in ['V1', 'V2', 'V3']
+        ]
+        cls.archived = Route.objects.create(grade='V4', color='blue', date_set=date(2024, 1, 1), area=cls.area, setter_name='Setter', is_active=False)
+        Completion.objects.create(member=cls.member, route=cls.routes[0], date_completed=date(2024, 1, 2), difficulty_rating=3)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_json_session(self):
+        first, second, third = self.routes
+        sends = [
+            {'route_id': first.pk, 'difficulty_rating': 2},  # Logged before
+            {'route_id': second.pk, 'difficulty_rating': 4, 'notes': 'Heel hook'},
+            {'route_id': second.pk, 'difficulty_rating': 4},  # Twice in the session
+            {'route_id': third.pk, 'difficulty_rating': 9},
+            {'route_id': self.archived.pk, 'difficulty_rating': 3},
+        ]
+        response = self.client.post(
+            reverse('project:log_session'), json.dumps({'date_completed': '2024-02-01', 'sends': sends}),
+            content_type='application/json',
+        )
+        data = response.json()
+        self.assertEqual(data['logged'], 1)
+        self.assertEqual(
+            [result['status'] for result in data['results']],
+            [session_log.DUPLICATE, session_log.LOGGED, session_log.DUPLICATE, session_log.INVALID, session_log.NOT_FOUND],
+        )
+        completion = Completion.objects.get(pk=data['results'][1]['completion_id'])
+        self.assertEqual((completion.route, completion.date_completed, completion.notes), (second, date(2024, 2, 1), 'Heel hook'))
+
+        # Counters, stats and leaderboards match a one-by-one rebuild
+        self.assertEqual(find_drift(), [])
+        stats = MemberStats.objects.get(member=self.member)
+        self.assertEqual((stats.grade_counts, stats.last_send), ({'V1': 1, 'V2': 1}, date(2024, 2, 1)))
+        board = sorted(LeaderboardEntry.objects.values_list('period', 'scope', 'sends', 'points', 'top_grade'))
+        leaderboards.rebuild()
+        self.assertEqual(sorted(LeaderboardEntry.objects.values_list('period', 'scope', 'sends', 'points', 'top_grade')), board)
+
+    def test_form_session(self):
+        first, second, third = self.routes
+        with self.assertNumQueries(settings.VIEW_BUDGETS['project:log_session']['queries']):
+            response = self.client.get(reverse('project:log_session'))
+        self.assertEqual(response.context['request'].member, self.member)
+        self.assertEqual([route.sent for route in response.context['routes']], [True, False, False])
+
+        ids = [second.pk, third.pk]
+        with self.assertNumQueries(16):  # The same for any number of routes; one at a time is 17 each
+            response = self.client.post(reverse('project:log_session'), {
+                'route_ids': ids, f'rating_{second.pk}': '3', f'rating_{third.pk}': '5',
+            })
+        self.assertContains(response, 'Logged 2 completions.')
+        self.assertEqual(set(self.member.completions.values_list('route_id', flat=True)), {first.pk, *ids})
+        self.assertEqual(Member.objects.get(pk=self.member.pk).send_count, 3)
+
+        response = self.client.post(reverse('project:log_session'), {'route_ids': ['x']})
+        self.assertContains(response, 'Malformed session.')
 
-# Create your tests here.
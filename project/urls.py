@@ -8,13 +8,14 @@ UPDATED: Added archive functionality
 
 from django.urls import path
 from django.contrib.auth.views import LoginView, LogoutView
-from . import views
+from . import api, views
 
 app_name = 'project'
 
 urlpatterns = [
     # Home page
     path('', views.home_view, name='home'),
+    path('feed/recent/', views.live_feed_view, name='live_feed'),
     
     # Authentication URLs - Use custom views
     path('login/', views.login_view, name='login'),
@@ -24,15 +25,20 @@ urlpatterns = [
     # Admin URLs
     path('admin-dashboard/', views.admin_dashboard_view, name='admin_dashboard'),
     path('admin/add-route/', views.add_route_view, name='add_route'),
+    path('admin/import-routes/', views.import_routes_view, name='import_routes'),
+    path('admin/export-routes/', views.export_routes_view, name='export_routes'),
     path('admin/manage-routes/', views.manage_routes_view, name='manage_routes'),
     path('admin/route/<int:pk>/toggle-status/', views.toggle_route_status, name='toggle_route_status'),
     path('admin/completions/', views.admin_completions_view, name='admin_completions'),
+    path('admin/completions/export/', views.export_completions_view, name='export_completions'),
+    path('admin/completions/options/<str:kind>/', views.admin_filter_options_view, name='admin_filter_options'),
     path('admin/members/', views.admin_members_view, name='admin_members'),
     path('admin/members/<int:pk>/delete/', views.delete_member_view, name='delete_member'),
     
     # NEW: Archive functionality
     path('admin/archived-routes/', views.archived_routes_view, name='archived_routes'),
     path('admin/bulk-archive/', views.bulk_archive_routes, name='bulk_archive_routes'),
+    path('admin/reset-planner/', views.reset_planner_view, name='reset_planner'),
     
     # Area URLs
     path('areas/', views.AreaListView.as_view(), name='area_list'),
@@ -40,10 +46,19 @@ urlpatterns = [
     
     # Route URLs
     path('routes/', views.RouteListView.as_view(), name='route_list'),
+    path('routes/search/', views.route_search_view, name='route_search'),
+    path('routes/log-session/', views.log_session_view, name='log_session'),
+    path('leaderboards/', views.leaderboard_view, name='leaderboards'),
     path('routes/<int:pk>/', views.RouteDetailView.as_view(), name='route_detail'),
     
     # Member URLs
     path('members/', views.MemberListView.as_view(), name='member_list'),
     path('profile/', views.profile_view, name='profile'),
     path('profile/edit/', views.edit_profile_view, name='edit_profile'),
+    
+    # Read-only JSON API
+    path('api/v1/areas/', api.area_list, name='api_area_list'),
+    path('api/v1/routes/', api.route_list, name='api_route_list'),
+    path('api/v1/routes/<int:pk>/', api.route_detail, name='api_route_detail'),
+    path('api/v1/completions/', api.completion_list, name='api_completion_list'),
 ]
\ No newline at end of file
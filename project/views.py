@@ -4,32 +4,157 @@ Author: Michele Bilko (mbilko@bu.edu)
 Central Rock Gym Route Tracking System
 Views for handling web requests and user interactions.
 UPDATED: Added archive functionality and bulk operations
+The read-heavy public pages (home, areas, route detail, profile) are async
+views; see central_rock_tracker/asgi.py for serving them under ASGI.
 """
 
+import asyncio
+import json
+import re
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
-from django.views.generic import ListView, DetailView, CreateView
+from django.views.generic import ListView, CreateView
 from django.contrib.auth import login, authenticate
+from django.contrib.auth.views import redirect_to_login
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib import messages
-from django.db.models import Count, Q
+from django.db import IntegrityError
+from django.db.models import Count, Exists, OuterRef, Q
 from django.contrib.auth.forms import AuthenticationForm
 from django.utils import timezone
-from datetime import datetime, timedelta
-from django.http import JsonResponse
-from .models import Member, Area, Route, Completion
-from .forms import CustomUserCreationForm, RouteForm, RouteStatusForm, CompletionForm, ProfileEditForm
+from django.utils.dateparse import parse_date
+from datetime import datetime
+from django.http import Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.views import View
+import io
+from .models import Member, Area, Route, Completion, ColdRoute, RollupBucket
+from .forms import CustomUserCreationForm, RouteForm, RouteStatusForm, CompletionForm, ProfileEditForm, RouteImportForm
+from .pagination import KeysetPaginationMixin, paginate
+from . import cold_storage, filter_options, leaderboards, live_feed, recommendations, search, session_log, set_history
+from .stats import member_summary
+from .rollups import adashboard_counts, dashboard_counts, recent_area_sends, recent_series
+from .database import writes
+from .replicas import ReplicaReadMixin, reads_from_replica
+from .caching import AsyncVersionedPageCacheMixin, VersionedPageCacheMixin, area_scope, route_scope
+from .roles import is_gym_admin
+from .route_import import detect_format, export_rows, import_routes
+from .completion_export import filter_completions, parse_filters, export_rows as export_completion_rows
+
+# Page sizes for the keyset-paginated lists
+ROUTES_PER_PAGE = 24
+MEMBERS_PER_PAGE = 50
+ADMIN_ROUTES_PER_PAGE = 50
+COLD_ROUTES_SHOWN = 50  # Most recently archived routes listed from cold storage
+COMPLETIONS_PER_PAGE = 20
+
+# Entries shown on a leaderboard
+LEADERBOARD_SIZE = 25
+
+# Stop counting a paginated list after this many rows ("1000+")
+LIST_COUNT_LIMIT = 1000
+
+# Live feed: seconds between keep-alive comments, seconds before a stream
+# ends (the browser reconnects), and the reconnect delay in milliseconds
+FEED_HEARTBEAT_SECONDS = 15
+FEED_STREAM_SECONDS = 5 * 60
+FEED_RETRY_MS = 3000
+
+# Content types of the completion export formats
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+async def _produced_in_thread(chunks):
+    """Produce a sync iterator's chunks one at a time in the worker thread."""
+    chunks = iter(chunks)
+    produce = sync_to_async(next)
+    while (chunk := await produce(chunks, None)) is not None:
+        yield chunk
+
+
+def streamed_download(request, chunks, content_type):
+    """
+    A StreamingHttpResponse for a download built by a sync iterator. An ASGI
+    server reads a sync iterator whole before sending any of it, so under
+    ASGI the chunks are produced as they are sent instead.
+    """
+    if 'wsgi.version' not in request.META:
+        chunks = _produced_in_thread(chunks)
+    return StreamingHttpResponse(chunks, content_type=content_type)
+
+
+async def alist(queryset):
+    """Evaluate a queryset with the async ORM."""
+    return [obj async for obj in queryset]
 
 
-def home_view(request):
+async def arender(request, template_name, context):
+    """render() from an async view; templates render in a worker thread."""
+    return await sync_to_async(render)(request, template_name, context)
+
+
+async def home_view(request):
     """Simple home page view."""
+    counts, recent_completions = await asyncio.gather(
+        adashboard_counts(),
+        alist(Completion.objects.select_related('member', 'route').order_by('-date_completed')[:5]),
+    )
     context = {
-        'total_areas': Area.objects.count(),
-        'total_routes': Route.objects.filter(is_active=True).count(),
-        'total_members': Member.objects.count(),
-        'recent_completions': Completion.objects.select_related('member', 'route').order_by('-date_completed')[:5],
+        'total_areas': counts['total_areas'],
+        'total_routes': counts['active_routes'],
+        'total_members': counts['total_members'],
+        'recent_completions': recent_completions,
     }
-    return render(request, 'project/home.html', context)
+    return await arender(request, 'project/home.html', context)
+
+
+def _last_event_id(request):
+    """The Last-Event-ID a reconnecting EventSource sends, or None."""
+    try:
+        return int(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        return None
+
+
+async def _event_stream(last_id):
+    """Events after last_id, then new ones as they are published, with keep-alives."""
+    subscription = live_feed.bus.subscribe(last_id)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + FEED_STREAM_SECONDS
+    try:
+        yield f'retry: {FEED_RETRY_MS}\n'
+        yield f'id: {live_feed.bus.last_id if last_id is None else last_id}\n\n'
+        while loop.time() < deadline:
+            event = await subscription.get(FEED_HEARTBEAT_SECONDS)
+            yield event.encode() if event is not None else ': keep-alive\n\n'
+    finally:
+        subscription.close()
+
+
+async def live_feed_view(request):
+    """
+    Server-Sent Events stream of new sends and route changes, for lobby
+    screens. Under WSGI a stream would hold a worker thread, so the response
+    only carries the events since Last-Event-ID and the browser polls the
+    bus (not the database) every FEED_RETRY_MS.
+    """
+    last_id = _last_event_id(request)
+    if 'wsgi.version' in request.META:
+        newest = live_feed.bus.last_id
+        events = live_feed.bus.since(last_id) if last_id is not None else []
+        content = [f'retry: {FEED_RETRY_MS}\n', f'id: {newest}\n\n']
+        content += [event.encode() for event in events]
+    else:
+        content = _event_stream(last_id)
+    
+    response = StreamingHttpResponse(content, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx buffering the stream
+    return response
 
 
 def login_view(request):
@@ -79,46 +204,43 @@ def register_view(request):
 
 def is_admin(user):
     """Helper function to check if user is admin/staff."""
-    return user.is_authenticated and (user.is_staff or hasattr(user, 'member') and user.member.is_admin)
+    return is_gym_admin(user)
 
 
 @user_passes_test(is_admin)
 def admin_dashboard_view(request):
     """Admin dashboard with statistics."""
-    total_routes = Route.objects.count()
-    active_routes = Route.objects.filter(is_active=True).count()
-    archived_routes = Route.objects.filter(is_active=False).count()
+    counts = dashboard_counts()
     recent_completions = Completion.objects.select_related('member', 'route').order_by('-date_completed')[:10]
     
     context = {
-        'total_routes': total_routes,
-        'active_routes': active_routes,
-        'archived_routes': archived_routes,
+        'total_routes': counts['total_routes'],
+        'active_routes': counts['active_routes'],
+        'archived_routes': counts['archived_routes'],
         'recent_completions': recent_completions,
+        # Activity trends from the rollup_dashboard series
+        'area_sends_week': recent_area_sends(7),
+        'routes_set_per_week': recent_series(RollupBucket.ROUTES_SET_PER_WEEK, 8),
+        'active_members_per_month': recent_series(RollupBucket.ACTIVE_MEMBERS_PER_MONTH, 6),
     }
     return render(request, 'project/admin_dashboard.html', context)
 
 
 @user_passes_test(is_admin)
+@reads_from_replica
 def admin_members_view(request):
     """Admin view to manage members with delete functionality."""
     search_query = request.GET.get('search', '')
     
-    members = Member.objects.select_related('user').order_by('first_name', 'last_name')
-    
     if search_query:
-        members = members.filter(
-            Q(first_name__icontains=search_query) |
-            Q(last_name__icontains=search_query) |
-            Q(email__icontains=search_query) |
-            Q(member_number__icontains=search_query)
-        )
-    
-    # Add completion counts for each member
-    members = members.annotate(completion_count=Count('completions'))
+        # Ranked full-text results, best match first (one page of up to search.SEARCH_LIMIT)
+        members_page = search.search_members(search_query)
+    else:
+        members = Member.objects.select_related('user')
+        members_page = paginate(request, members, ('first_name', 'last_name', 'id'), MEMBERS_PER_PAGE, LIST_COUNT_LIMIT)
     
     context = {
-        'members': members,
+        'members': members_page,
         'search_query': search_query,
         'total_members': Member.objects.count(),
     }
@@ -148,7 +270,7 @@ def delete_member_view(request, pk):
             messages.error(request, 'Deletion cancelled. You must type "DELETE" to confirm.')
     
     # Get member statistics for confirmation
-    completion_count = member.completions.count()
+    completion_count = member.send_count
     
     context = {
         'member': member,
@@ -186,6 +308,50 @@ def add_route_view(request):
     return render(request, 'project/add_route.html', context)
 
 
+@user_passes_test(is_admin)
+def import_routes_view(request):
+    """Admin view to upload a whole route set at once (reset days)."""
+    result = None
+    
+    if request.method == 'POST':
+        form = RouteImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig')
+            try:
+                result = import_routes(
+                    stream,
+                    file_format=detect_format(upload.name),
+                    reset_area=form.cleaned_data['reset_area'],
+                )
+            except (ValueError, UnicodeDecodeError) as e:
+                messages.error(request, f'Could not read the import file: {e}')
+            else:
+                messages.success(request, f'Imported {result.created} route(s), archived {result.archived}.')
+    else:
+        form = RouteImportForm()
+    
+    context = {
+        'form': form,
+        'result': result,
+        'areas': Area.objects.all().order_by('name'),
+    }
+    
+    return render(request, 'project/import_routes.html', context)
+
+
+@user_passes_test(is_admin)
+@reads_from_replica
+def export_routes_view(request):
+    """Download routes as CSV in the import format."""
+    area_id = request.GET.get('area') or None
+    include_archived = request.GET.get('archived') == '1'
+    
+    response = streamed_download(request, export_rows(area_id, include_archived), 'text/csv')
+    response['Content-Disposition'] = 'attachment; filename="routes.csv"'
+    return response
+
+
 @user_passes_test(is_admin)
 def manage_routes_view(request):
     """Admin view to manage existing routes with bulk operations."""
@@ -198,7 +364,8 @@ def manage_routes_view(request):
     else:
         routes = Route.objects.all()
     
-    routes = routes.select_related('area').order_by('-date_set')
+    # Stats come from the nightly compute_route_stats batch, joined in the same query
+    routes = paginate(request, routes.select_related('area', 'stats'), ('-date_set', '-id'), ADMIN_ROUTES_PER_PAGE, LIST_COUNT_LIMIT)
     
     # Get all areas with active route counts for the "Archive by Area" dropdown
     all_areas = Area.objects.annotate(
@@ -230,17 +397,20 @@ def toggle_route_status(request, pk):
 
 
 @user_passes_test(is_admin)
+@reads_from_replica
 def archived_routes_view(request):
     """
     NEW: View all archived routes with filtering by area.
     """
     area_filter = request.GET.get('area', '')
     
-    archived_routes = Route.objects.filter(is_active=False).select_related('area').order_by('-date_set')
+    archived_routes = Route.objects.filter(is_active=False).select_related('area')
     
     if area_filter:
         archived_routes = archived_routes.filter(area__id=area_filter)
     
+    archived_page = paginate(request, archived_routes, ('-date_set', '-id'), ADMIN_ROUTES_PER_PAGE, LIST_COUNT_LIMIT)
+    
     # Get all areas for the filter dropdown
     areas = Area.objects.all().order_by('name')
     
@@ -249,12 +419,20 @@ def archived_routes_view(request):
         count=Count('id')
     ).order_by('area__name')
     
+    # Routes archived long ago are in cold storage (project.cold_storage)
+    cold_routes = ColdRoute.objects.select_related('area')
+    if area_filter:
+        cold_routes = cold_routes.filter(area__id=area_filter)
+    
     context = {
-        'archived_routes': archived_routes,
+        'archived_routes': archived_page,
         'areas': areas,
         'selected_area': area_filter,
         'total_archived': archived_routes.count(),
         'area_counts': area_counts,
+        'cold_routes': cold_routes.order_by('-archived_on', '-id')[:COLD_ROUTES_SHOWN],
+        'total_cold': cold_routes.count(),
+        'cold_storage_days': settings.COLD_STORAGE_DAYS,
     }
     
     return render(request, 'project/archived_routes.html', context)
@@ -269,28 +447,28 @@ def bulk_archive_routes(request):
         action = request.POST.get('action')
         area_id = request.POST.get('area_id')
         route_ids = request.POST.getlist('route_ids')
+        cold_route_ids = request.POST.getlist('cold_route_ids')
         
         if action == 'archive_area' and area_id:
             # Archive all active routes in a specific area
             area = get_object_or_404(Area, pk=area_id)
-            routes = Route.objects.filter(area=area, is_active=True)
-            count = routes.count()
-            routes.update(is_active=False)
+            count = writes.submit(Route.objects.filter(area=area).set_active, False)
             messages.success(request, f'Archived {count} route(s) in {area.name}.')
             
         elif action == 'archive_selected' and route_ids:
             # Archive specific selected routes
-            routes = Route.objects.filter(pk__in=route_ids, is_active=True)
-            count = routes.count()
-            routes.update(is_active=False)
+            count = writes.submit(Route.objects.filter(pk__in=route_ids).set_active, False)
             messages.success(request, f'Archived {count} selected route(s).')
             
         elif action == 'restore_selected' and route_ids:
             # Restore specific selected routes
-            routes = Route.objects.filter(pk__in=route_ids, is_active=False)
-            count = routes.count()
-            routes.update(is_active=True)
+            count = writes.submit(Route.objects.filter(pk__in=route_ids).set_active, True)
             messages.success(request, f'Restored {count} selected route(s).')
+            
+        elif action == 'thaw_selected' and cold_route_ids:
+            # Bring routes back from cold storage, active again
+            count = writes.submit(cold_storage.thaw, cold_route_ids)
+            messages.success(request, f'Restored {count} route(s) from cold storage.')
         
         return redirect(request.META.get('HTTP_REFERER', 'project:admin_dashboard'))
     
@@ -298,71 +476,232 @@ def bulk_archive_routes(request):
 
 
 @user_passes_test(is_admin)
+def reset_planner_view(request):
+    """Areas ranked for the next reset by staleness and grade gaps, from the area set history."""
+    context = {
+        'plans': set_history.area_plans(),
+        'gap_days': set_history.GAP_DAYS,
+    }
+    
+    return render(request, 'project/reset_planner.html', context)
+
+
+@user_passes_test(is_admin)
+@reads_from_replica
 def admin_completions_view(request):
     """Admin view to see all completions with filtering."""
-    from django.core.paginator import Paginator
-    
     # Get filter parameters
     route_filter = request.GET.get('route', '')
     member_filter = request.GET.get('member', '')
     area_filter = request.GET.get('area', '')
     date_range = request.GET.get('date_range', '30')
     
-    # Base queryset
-    completions = Completion.objects.select_related('member', 'route', 'route__area').order_by('-date_completed')
+    try:
+        filters = parse_filters(route=route_filter, member=member_filter, area=area_filter, date_range=date_range)
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
     
-    # Apply filters
-    if route_filter:
-        completions = completions.filter(route__id=route_filter)
+    # Base queryset with filters applied
+    completions = filter_completions(Completion.objects.select_related('member', 'route', 'route__area'), **filters)
     
-    if member_filter:
-        completions = completions.filter(member__id=member_filter)
-    
-    if area_filter:
-        completions = completions.filter(route__area__id=area_filter)
-    
-    if date_range != 'all':
-        days = int(date_range)
-        cutoff_date = timezone.now().date() - timedelta(days=days)
-        completions = completions.filter(date_completed__gte=cutoff_date)
-    
-    # Pagination
-    paginator = Paginator(completions, 20)
-    page_number = request.GET.get('page')
-    completions_page = paginator.get_page(page_number)
-    
-    # Get all options for filters
-    all_routes = Route.objects.all().order_by('name')
-    all_members = Member.objects.all().order_by('first_name', 'last_name')
-    all_areas = Area.objects.all().order_by('name')
+    # Keyset pagination with a capped count
+    completions_page = paginate(
+        request, completions, ('-date_completed', '-id'), COMPLETIONS_PER_PAGE,
+        count_limit=LIST_COUNT_LIMIT,
+    )
     
+    # Areas are few enough to embed; route and member pickers load on demand
     context = {
         'completions': completions_page,
-        'all_routes': all_routes,
-        'all_members': all_members,
-        'all_areas': all_areas,
+        'area_options': filter_options.get_options('area'),
+        'selected_route_label': filter_options.get_label('route', route_filter),
+        'selected_member_label': filter_options.get_label('member', member_filter),
         'current_filters': {
             'route': route_filter,
             'member': member_filter,
             'area': area_filter,
             'date_range': date_range,
         },
-        'total_completions': completions.count(),
+        'total_completions': completions_page.paginator.count,
+        'total_is_approximate': completions_page.paginator.count_is_approximate,
     }
     
     return render(request, 'project/admin_completions.html', context)
 
 
+@user_passes_test(is_admin)
+@reads_from_replica
+def export_completions_view(request):
+    """Stream the completions matching the admin_completions_view filters as CSV or NDJSON."""
+    file_format = request.GET.get('format', 'csv')
+    if file_format not in EXPORT_CONTENT_TYPES:
+        return JsonResponse({'error': f'Unknown export format "{file_format}".'}, status=400)
+    
+    # Validated before streaming starts: a bad filter can't fail halfway through the download
+    try:
+        filters = parse_filters(
+            route=request.GET.get('route', ''),
+            member=request.GET.get('member', ''),
+            area=request.GET.get('area', ''),
+            date_range=request.GET.get('date_range', '30'),
+        )
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    
+    rows = export_completion_rows(file_format, **filters)
+    response = streamed_download(request, rows, EXPORT_CONTENT_TYPES[file_format])
+    response['Content-Disposition'] = f'attachment; filename="completions.{file_format}"'
+    return response
+
+
+@user_passes_test(is_admin)
+def admin_filter_options_view(request, kind):
+    """JSON typeahead for the route and member pickers on the completions page."""
+    if kind not in ('route', 'member', 'area'):
+        return JsonResponse({'error': f'Unknown option list "{kind}".'}, status=404)
+    
+    options = filter_options.search_options(kind, request.GET.get('q', ''))
+    return JsonResponse({'results': [{'id': pk, 'label': label} for pk, label in options]})
+
+
+def route_search_view(request):
+    """Route finder: ranked prefix search over name, setter, area, grade and color."""
+    query = request.GET.get('q', '')
+    include_archived = request.GET.get('archived') == '1' and is_admin(request.user)
+    
+    context = {
+        'query': query,
+        'include_archived': include_archived,
+        'routes': search.search_routes(query, active_only=not include_archived) if query else [],
+    }
+    
+    return render(request, 'project/route_search.html', context)
+
+
+def _session_sends(request):
+    """
+    (date completed, [SessionSend]) from a session check-out: a JSON body
+    {"date_completed": ..., "sends": [{"route_id", "difficulty_rating", "notes"}]}
+    or the form's route_ids with a rating_<route id> each. Raises ValueError when malformed.
+    """
+    try:
+        if request.content_type == 'application/json':
+            data = json.loads(request.body)
+            sends = [
+                session_log.SessionSend(int(send['route_id']), send.get('difficulty_rating'), str(send.get('notes') or ''))
+                for send in data.get('sends', [])
+            ]
+            day = data.get('date_completed')
+        else:
+            sends = []
+            for route_id in request.POST.getlist('route_ids'):
+                rating = request.POST.get(f'rating_{route_id}', '')
+                sends.append(session_log.SessionSend(int(route_id), int(rating) if rating.isdigit() else None))
+            day = request.POST.get('date_completed')
+        date_completed = parse_date(day) if day else timezone.localdate()
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise ValueError('Malformed session.')
+    
+    if date_completed is None:
+        raise ValueError(f'Invalid date "{day}".')
+    if len(sends) > session_log.MAX_SENDS:
+        raise ValueError(f'At most {session_log.MAX_SENDS} routes per session.')
+    return date_completed, sends
+
+
+def log_session_view(request):
+    """
+    Session check-out: log every route sent in a session in one post.
+    Form posts show the page again with a result per route; JSON posts
+    (kiosks, the mobile app) get the results as JSON.
+    """
+    wants_json = request.content_type == 'application/json'
+    if request.member is None:
+        if wants_json:
+            return JsonResponse({'error': 'You must be logged in to log completions.'}, status=403)
+        messages.error(request, 'You must be logged in to log completions.')
+        return redirect('project:login')
+    
+    results = []
+    error = None
+    if request.method == 'POST':
+        try:
+            date_completed, sends = _session_sends(request)
+            # One transaction for the whole session, queued with any other writes (project.database)
+            results = writes.submit(session_log.log_session, request.member, sends, date_completed)
+        except ValueError as invalid:
+            if wants_json:
+                return JsonResponse({'error': str(invalid)}, status=400)
+            error = str(invalid)
+        except IntegrityError:
+            # Another request logged one of these routes at the same moment
+            if wants_json:
+                return JsonResponse({'error': 'Some of these routes were just logged; try again.'}, status=409)
+            error = 'Some of these routes were just logged; please try again.'
+        
+        if wants_json:
+            logged = sum(result.status == session_log.LOGGED for result in results)
+            return JsonResponse({'logged': logged, 'results': [result.as_dict() for result in results]})
+    
+    # Active routes, marking the ones the member has already sent
+    routes = Route.objects.filter(is_active=True).select_related('area').annotate(
+        sent=Exists(Completion.objects.filter(member=request.member, route=OuterRef('pk')))
+    ).order_by('area__name', 'grade', 'id')
+    routes_by_id = {route.pk: route for route in routes}
+    
+    context = {
+        'routes': routes,
+        'results': [(result, routes_by_id.get(result.route_id)) for result in results],
+        'logged': sum(result.status == session_log.LOGGED for result in results),
+        'error': error,
+        'ratings': session_log.RATINGS,
+        'today': timezone.localdate(),
+    }
+    
+    return render(request, 'project/log_session.html', context)
+
+
+def leaderboard_view(request):
+    """Monthly and all-time leaderboards, gym-wide or for one area, with the viewer's own rank."""
+    board = request.GET.get('board', 'sends')
+    if board not in leaderboards.BOARDS:
+        board = 'sends'
+    
+    current_month = leaderboards.month_of(timezone.localdate())
+    period = request.GET.get('period', current_month)
+    if period != leaderboards.ALL_TIME and not re.fullmatch(r'\d{4}-\d{2}', period):
+        period = current_month
+    
+    areas = filter_options.get_options('area')
+    try:
+        scope = int(request.GET.get('area', leaderboards.GYM))
+    except ValueError:
+        scope = leaderboards.GYM
+    if scope not in dict(areas):
+        scope = leaderboards.GYM
+    
+    context = {
+        'boards': [(name, label) for name, (label, fields) in leaderboards.BOARDS.items()],
+        'board': board,
+        'period': period,
+        'current_month': current_month,
+        'areas': areas,
+        'scope': scope,
+        'standings': leaderboards.top(board, period, scope, limit=LEADERBOARD_SIZE),
+        'my_rank': leaderboards.rank_of(request.member, board, period, scope) if request.member else None,
+    }
+    
+    return render(request, 'project/leaderboard.html', context)
+
+
 # Class-based views
 
-class AreaListView(ListView):
+class AreaListView(AsyncVersionedPageCacheMixin, View):
     """
     Display list of all climbing areas with route counts.
     Areas are displayed in a specific order: The Dugout, The Gray Monster, The Warning Track, The Bullpen
     """
-    model = Area
     template_name = 'project/area_list.html'
-    context_object_name = 'areas'
     
     def get_queryset(self):
         """Add route count annotation and order areas in specific sequence."""
@@ -381,100 +720,139 @@ class AreaListView(ListView):
             route_count=Count('routes', filter=Q(routes__is_active=True)),
             custom_order=ordering
         ).order_by('custom_order', 'name')
+    
+    async def get_context_data(self, **kwargs):
+        # Left lazy: the grid is a cached fragment, so most renders never query
+        kwargs['areas'] = self.get_queryset()
+        return await super().get_context_data(**kwargs)
 
 
-class AreaDetailView(DetailView):
+class AreaDetailView(AsyncVersionedPageCacheMixin, View):
     """Display detailed view of a specific area with its routes."""
-    model = Area
     template_name = 'project/area_detail.html'
-    context_object_name = 'area'
-    
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        # Only show active routes with completion counts
-        context['routes'] = self.object.routes.filter(is_active=True).annotate(
-            completion_count=Count('completions')
-        ).order_by('-date_set')
-        context['total_completions'] = Completion.objects.filter(
-            route__area=self.object
-        ).count()
+    
+    def get_cache_scopes(self):
+        return [area_scope(self.kwargs['pk'])]
+    
+    async def get_context_data(self, **kwargs):
+        try:
+            area = await Area.objects.aget(pk=self.kwargs['pk'])
+        except Area.DoesNotExist:
+            raise Http404('No area found matching the query')
+        context = await super().get_context_data(**kwargs)
+        context['area'] = area
+        # Admin controls carry CSRF tokens, so admins never get the cached fragment
+        context['can_manage'] = self.request.is_gym_admin
+        # Only show active routes (left lazy for the cached fragment); send counts are stored on each row
+        context['routes'] = area.routes.filter(is_active=True).order_by('-date_set')
+        context['total_completions'] = area.send_count
         return context
 
 
-class RouteListView(ListView):
+class RouteListView(VersionedPageCacheMixin, KeysetPaginationMixin, ListView):
     """Display list of all active routes."""
     model = Route
     template_name = 'project/route_list.html'
     context_object_name = 'routes'
+    paginate_by = ROUTES_PER_PAGE
+    keyset_ordering = ('-date_set', '-id')
+    count_limit = LIST_COUNT_LIMIT
     
     def get_queryset(self):
         """Only show active routes."""
-        return Route.objects.filter(is_active=True).select_related('area').order_by('-date_set')
+        return Route.objects.filter(is_active=True).select_related('area')
 
 
-class RouteDetailView(DetailView):
+class RouteDetailView(AsyncVersionedPageCacheMixin, View):
     """Display detailed view of a specific route with completion form."""
-    model = Route
     template_name = 'project/route_detail.html'
-    context_object_name = 'route'
     
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        
-        # Get recent completions
-        context['completions'] = self.object.completions.select_related('member').order_by('-date_completed')[:10]
+    def get_cache_scopes(self):
+        return [route_scope(self.kwargs['pk'])]
+    
+    async def get_route(self):
+        try:
+            return await Route.objects.select_related('stats').aget(pk=self.kwargs['pk'])
+        except Route.DoesNotExist:
+            raise Http404('No route found matching the query')
+    
+    async def get_user_completion(self):
+        """The current member's completion of this route, or None."""
+        try:
+            return await Completion.objects.aget(member=self.request.member, route_id=self.kwargs['pk'])
+        except Completion.DoesNotExist:
+            return None
+    
+    async def get_context_data(self, **kwargs):
+        context = await super().get_context_data(**kwargs)
         
-        # Check if current user has completed this route
-        if self.request.user.is_authenticated and hasattr(self.request.user, 'member'):
-            try:
-                context['user_completion'] = Completion.objects.get(
-                    member=self.request.user.member,
-                    route=self.object
-                )
-                context['user_has_completed'] = True
-            except Completion.DoesNotExist:
-                context['user_has_completed'] = False
+        # Check if current user has completed this route, while the route loads
+        if self.request.member is not None:
+            route, user_completion, context['recommendations'] = await asyncio.gather(
+                self.get_route(),
+                self.get_user_completion(),
+                sync_to_async(recommendations.for_member)(self.request.member, exclude={int(self.kwargs['pk'])}),
+            )
+            context['user_has_completed'] = user_completion is not None
+            if user_completion is not None:
+                context['user_completion'] = user_completion
+            else:
                 context['form'] = CompletionForm()
+        else:
+            route = await self.get_route()
+        context['route'] = route
+        
+        # Recent completions, left lazy for the cached route_info fragment
+        context['completions'] = route.completions.select_related('member').order_by('-date_completed')[:10]
         
         return context
     
-    def post(self, request, *args, **kwargs):
+    async def post(self, request, *args, **kwargs):
         """Handle completion form submission."""
-        self.object = self.get_object()
+        response = await sync_to_async(self.log_completion)(request)
+        if response is not None:
+            return response
+        return await self.get(request, *args, **kwargs)
+    
+    def log_completion(self, request):
+        """Save a submitted completion. Returns a redirect, or None to show the page again."""
+        route = get_object_or_404(Route, pk=self.kwargs['pk'])
         
-        if not request.user.is_authenticated or not hasattr(request.user, 'member'):
+        if request.member is None:
             messages.error(request, 'You must be logged in to log completions.')
             return redirect('project:login')
         
         form = CompletionForm(request.POST)
         if form.is_valid():
             completion = form.save(commit=False)
-            completion.member = request.user.member
-            completion.route = self.object
+            completion.member = request.member
+            completion.route = route
             try:
-                completion.save()
-                messages.success(request, f'Successfully logged completion of {self.object}!')
-                return redirect('project:route_detail', pk=self.object.pk)
-            except:
+                # Committed with any other sends arriving at the same moment (project.database);
+                # each runs in its own savepoint, so the counters roll back with a duplicate
+                writes.submit(completion.save)
+                messages.success(request, f'Successfully logged completion of {route}!')
+                return redirect('project:route_detail', pk=route.pk)
+            except IntegrityError:
                 messages.error(request, 'You have already logged this route.')
         
-        return self.get(request, *args, **kwargs)
+        return None
 
 
-class MemberListView(UserPassesTestMixin, ListView):
+class MemberListView(UserPassesTestMixin, ReplicaReadMixin, KeysetPaginationMixin, ListView):
     """
     Display list of all members - ADMIN ONLY.
     """
     model = Member
     template_name = 'project/member_list.html'
     context_object_name = 'members'
+    paginate_by = MEMBERS_PER_PAGE
+    keyset_ordering = ('first_name', 'last_name', 'id')
+    count_limit = LIST_COUNT_LIMIT
     
     def test_func(self):
         """Only allow admin/staff users."""
-        return self.request.user.is_authenticated and (
-            self.request.user.is_staff or 
-            (hasattr(self.request.user, 'member') and self.request.user.member.is_admin)
-        )
+        return self.request.is_gym_admin
     
     def handle_no_permission(self):
         """Redirect non-admin users with message."""
@@ -482,59 +860,41 @@ class MemberListView(UserPassesTestMixin, ListView):
         return redirect('project:home')
 
 
-@login_required
-def profile_view(request):
+async def profile_view(request):
     """Display user's profile and climbing statistics."""
-    if not hasattr(request.user, 'member'):
+    # login_required only wraps sync views on this Django version
+    if not request.user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    
+    member = request.member
+    if member is None:
         messages.error(request, 'No member profile found.')
         return redirect('project:home')
     
-    member = request.user.member
-    
-    # Get completions
-    completions = member.completions.select_related('route', 'route__area').order_by('-date_completed')[:10]
-    
-    # Calculate statistics
-    total_completions = member.completions.count()
-    unique_routes = member.completions.values('route').distinct().count()
-    
-    # Recent activity (last 30 days)
-    thirty_days_ago = timezone.now().date() - timedelta(days=30)
-    recent_activity_count = member.completions.filter(date_completed__gte=thirty_days_ago).count()
-    
-    # Grade distribution
-    grade_counts = member.completions.values('route__grade').annotate(
-        count=Count('id')
-    ).order_by('route__grade')
-    grade_counts = {item['route__grade']: item['count'] for item in grade_counts}
-    
-    # Areas climbed
-    areas_climbed = member.completions.values('route__area__name').annotate(
-        count=Count('id')
-    ).order_by('-count')
-    
+    # Recent completions, the statistics from the member's precomputed MemberStats row and route suggestions
+    completions, summary, suggestions = await asyncio.gather(
+        alist(member.completions.select_related('route', 'route__area').order_by('-date_completed')[:10]),
+        sync_to_async(member_summary)(member),
+        sync_to_async(recommendations.for_member)(member),
+    )
     context = {
         'member': member,
         'completions': completions,
-        'total_completions': total_completions,
-        'unique_routes': unique_routes,
-        'recent_activity_count': recent_activity_count,
-        'grade_counts': grade_counts,
-        'areas_climbed': areas_climbed,
+        'recommendations': suggestions,
+        **summary,
     }
     
-    return render(request, 'project/profile.html', context)
+    return await arender(request, 'project/profile.html', context)
 
 
 @login_required
 def edit_profile_view(request):
     """Allow users to edit their profile."""
-    if not hasattr(request.user, 'member'):
+    member = request.member
+    if member is None:
         messages.error(request, 'No member profile found.')
         return redirect('project:home')
     
-    member = request.user.member
-    
     if request.method == 'POST':
         form = ProfileEditForm(request.POST, instance=member, user=request.user)
         if form.is_valid():